@@ -0,0 +1,108 @@
+"""Benchmark `get_products_by_ids` throughput with fixed and adaptive batch sizes, for a heavy
+schema (large documents the server takes a while to build) and a light one.
+
+Usage: PYTHONPATH=. python benchmarks/bench_batch_sizing.py [--ids 1000] [--max-concurrency 8]
+"""
+# Standard Modules
+import argparse
+import json
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# Local Modules
+from cofactr.batch_sizing import BatchSizer
+from cofactr.graph import GraphAPI
+from standin import Reply, StandInServer, default_handler
+
+HEAVY_SCHEMA = "price-solver-v11"
+
+
+def make_handler(heavy_product_bytes: int):
+    """Make a handler that pads each product of the heavy schema to the given size."""
+
+    padding = "x" * heavy_product_bytes
+
+    def handler(
+        method: str, target: str, headers: Dict[str, str], body: bytes
+    ) -> Reply:
+        params = parse_qs(urlsplit(target).query)
+
+        if params.get("schema") != [HEAVY_SCHEMA]:
+            return default_handler(method, target, headers, body)
+
+        ids = json.loads(params["filtering"][0])[0]["value"]
+        data = {"data": [{"id": id_, "padding": padding} for id_ in ids]}
+
+        return 200, {"content-type": "application/json"}, json.dumps(data).encode()
+
+    return handler
+
+
+def run(
+    server: StandInServer,
+    ids: int,
+    schema: str,
+    fields: Optional[str],
+    max_concurrency: int,
+    batch_sizer: Optional[BatchSizer],
+):
+    """Time fetching products by ID, after a first call that lets the batch sizer learn."""
+
+    with GraphAPI(protocol="http", host=server.host, batch_sizer=batch_sizer) as graph:
+
+        def fetch():
+            return graph.get_products_by_ids(
+                ids=[f"CC{i:010}" for i in range(ids)],
+                schema=schema,
+                fields=fields,
+                max_concurrency=max_concurrency,
+            )
+
+        fetch()
+        server.reset()
+
+        start = time.perf_counter()
+        fetch()
+        elapsed = time.perf_counter() - start
+
+    return {
+        "schema": schema,
+        "adaptive": batch_sizer is not None,
+        "requests": server.requests,
+        "ids_per_second": round(ids / elapsed),
+    }
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ids", type=int, default=1000)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--heavy-product-bytes", type=int, default=20_000)
+    parser.add_argument("--response-delay", type=float, default=0.02)
+    parser.add_argument("--response-delay-per-megabyte", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with StandInServer(
+        response_delay=args.response_delay,
+        response_delay_per_megabyte=args.response_delay_per_megabyte,
+        handler=make_handler(args.heavy_product_bytes),
+    ) as server:
+        for schema, fields in [(HEAVY_SCHEMA, None), ("internal", "id,deprecated_ids")]:
+            for batch_sizer in [None, BatchSizer()]:
+                print(
+                    run(
+                        server,
+                        ids=args.ids,
+                        schema=schema,
+                        fields=fields,
+                        max_concurrency=args.max_concurrency,
+                        batch_sizer=batch_sizer,
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
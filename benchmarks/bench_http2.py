@@ -0,0 +1,77 @@
+"""Benchmark HTTP/1.1 against multiplexed HTTP/2 for concurrent single-product reads.
+
+Usage: PYTHONPATH=. python benchmarks/bench_http2.py [--requests 400] [--concurrency 50]
+"""
+# Standard Modules
+import argparse
+import asyncio
+from statistics import median, quantiles
+import time
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.concurrency import gather_concurrently
+from standin import StandInServer
+
+
+async def run(
+    server: StandInServer, client: httpx.AsyncClient, requests: int, concurrency: int
+):
+    """Issue concurrent `get_product` calls and report connection count and latency."""
+
+    server.reset()
+    latencies = []
+
+    async with AsyncGraphAPI(protocol="http", host=server.host, client=client) as graph:
+
+        async def get_product(i: int):
+            start = time.perf_counter()
+            await graph.get_product(id=f"ID{i}", schema="internal")
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await gather_concurrently(
+            get_product, range(requests), max_concurrency=concurrency
+        )
+        elapsed = time.perf_counter() - start
+
+    await client.aclose()
+
+    return {
+        "protocol": server.protocols[0],
+        "connections": server.connections,
+        "elapsed_s": round(elapsed, 3),
+        "p50_ms": round(median(latencies) * 1000, 1),
+        "p99_ms": round(quantiles(latencies, n=100)[98] * 1000, 1),
+    }
+
+
+async def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--handshake-delay", type=float, default=0.05)
+    parser.add_argument("--response-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    with StandInServer(
+        handshake_delay=args.handshake_delay, response_delay=args.response_delay
+    ) as server:
+        for client in [
+            httpx.AsyncClient(limits=limits),
+            # Cleartext HTTP/2 requires prior knowledge, so HTTP/1.1 is disabled here. Against
+            # the real API, `http2=True` negotiates HTTP/2 over TLS via ALPN.
+            httpx.AsyncClient(limits=limits, http1=False, http2=True),
+        ]:
+            print(await run(server, client, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""Benchmark `get_products_by_ids` with IDs in GET filter URLs and in `/batch/products/` POSTs.
+
+Usage: PYTHONPATH=. python benchmarks/bench_id_lookup.py [--ids 5000] [--response-delay 0.05]
+"""
+# Standard Modules
+import argparse
+import time
+
+# Local Modules
+from cofactr.graph import GraphAPI, IdLookupMethod
+from standin import StandInServer
+
+
+def run(server: StandInServer, ids: int, lookup_method: IdLookupMethod):
+    """Time looking up products by ID."""
+
+    with GraphAPI(protocol="http", host=server.host) as graph:
+        graph.check_health()
+        server.reset()
+
+        start = time.perf_counter()
+        products = graph.get_products_by_ids(
+            ids=[f"CC{i:010}" for i in range(ids)],
+            schema="internal",
+            lookup_method=lookup_method,
+        )
+        elapsed = time.perf_counter() - start
+
+    return {
+        "lookup_method": lookup_method.value,
+        "products": len(products),
+        "requests": server.requests,
+        "ms": round(elapsed * 1000, 1),
+    }
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ids", type=int, default=5000)
+    parser.add_argument("--response-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StandInServer(response_delay=args.response_delay) as server:
+        for lookup_method in IdLookupMethod:
+            print(run(server, args.ids, lookup_method))
+
+
+if __name__ == "__main__":
+    main()
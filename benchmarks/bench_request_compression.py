@@ -0,0 +1,69 @@
+"""Benchmark gzip-compressed request bodies for large batch POSTs on a slow uplink.
+
+Usage: PYTHONPATH=. python benchmarks/bench_request_compression.py [--uplink-kbps 1000]
+"""
+# Standard Modules
+import argparse
+import json
+import time
+from typing import Dict, List
+
+# Local Modules
+from cofactr.graph import GraphAPI
+from standin import Reply, StandInServer, default_handler
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uplink-kbps", type=float, default=1000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--custom-ids", type=int, default=20_000)
+    args = parser.parse_args()
+
+    received: List[Dict] = []
+
+    def handler(
+        method: str, target: str, headers: Dict[str, str], body: bytes
+    ) -> Reply:
+        if method == "POST":
+            received.append(json.loads(body))
+
+        return default_handler(method, target, headers, body)
+
+    queries = [f"RC0603FR-07{i}KL" for i in range(args.queries)]
+    id_to_custom_id = {f"CCV{i:09d}": f"ACME-{i:06d}" for i in range(args.custom_ids)}
+
+    with StandInServer(
+        upload_bytes_per_second=args.uplink_kbps * 1000 / 8, handler=handler
+    ) as server:
+        results = {}
+
+        for threshold in [None, 1024]:
+            received.clear()
+
+            with GraphAPI(
+                protocol="http",
+                host=server.host,
+                request_compression_threshold=threshold,
+            ) as graph:
+                start = time.perf_counter()
+                graph.get_products_by_searches(queries=queries, schema="internal")
+                graph.set_custom_product_ids(id_to_custom_id=id_to_custom_id)
+                elapsed = time.perf_counter() - start
+
+            results[threshold] = received.copy()
+            print(
+                {
+                    "compression": "gzip" if threshold else "none",
+                    "elapsed_s": round(elapsed, 3),
+                }
+            )
+
+        # The server must see exactly the same payloads either way.
+        assert results[None] == results[1024]
+
+
+if __name__ == "__main__":
+    main()
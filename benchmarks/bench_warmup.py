@@ -0,0 +1,57 @@
+"""Benchmark the first batch search of a cold start, with and without prewarmed connections.
+
+Usage: PYTHONPATH=. python benchmarks/bench_warmup.py [--queries 1000] [--handshake-delay 0.1]
+"""
+# Standard Modules
+import argparse
+import time
+
+# Local Modules
+from cofactr.graph import GraphAPI
+from standin import StandInServer
+
+
+def run(server: StandInServer, queries: int, prewarm: int, setup_time: float):
+    """Construct a client, simulate other cold-start work, then time the first batch search."""
+
+    server.reset()
+
+    with GraphAPI(protocol="http", host=server.host, prewarm=prewarm) as graph:
+        # Stands in for work a worker does before its first request (e.g. parsing a BOM).
+        time.sleep(setup_time)
+
+        start = time.perf_counter()
+        graph.get_products_by_searches(
+            queries=[f"RC0603FR-07{i}KL" for i in range(queries)],
+            schema="internal",
+            max_concurrency=4,
+        )
+        elapsed = time.perf_counter() - start
+
+    return {
+        "prewarm": prewarm,
+        "connections": server.connections,
+        "first_call_ms": round(elapsed * 1000, 1),
+    }
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--prewarm", type=int, default=4)
+    parser.add_argument("--handshake-delay", type=float, default=0.1)
+    parser.add_argument("--response-delay", type=float, default=0.02)
+    parser.add_argument("--setup-time", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with StandInServer(
+        handshake_delay=args.handshake_delay, response_delay=args.response_delay
+    ) as server:
+        print(run(server, args.queries, 0, args.setup_time))
+        print(run(server, args.queries, args.prewarm, args.setup_time))
+
+
+if __name__ == "__main__":
+    main()
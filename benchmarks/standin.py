@@ -0,0 +1,291 @@
+"""Local stand-in for the Cofactr graph API, used by benchmarks.
+
+Serves HTTP/1.1 and cleartext HTTP/2 (prior knowledge) on the same port, counts the
+connections it accepts, and can add latency to each connection setup (standing in for DNS, TCP
+and TLS) and to each response (standing in for server work, optionally in proportion to the
+response's size). HTTP/1.1 request bodies can be
+received at a limited rate (standing in for a slow uplink), and gzip-encoded request bodies are
+decoded before they're handled.
+"""
+# Standard Modules
+import asyncio
+from dataclasses import dataclass, field
+import gzip
+import json
+from threading import Thread
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+_H2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+Reply = Tuple[int, Dict[str, str], bytes]
+
+
+def _get_filtered_products(params: Dict[str, str]) -> List[Dict]:
+    """Get a small document for each product ID in a query's `IN` filter."""
+
+    filtering = json.loads(params.get("filtering", "[]") or "[]")
+    ids = filtering[0]["value"] if filtering else []
+
+    return [{"id": id_, "deprecated_ids": []} for id_ in ids]
+
+
+def default_handler(
+    method: str, target: str, headers: Dict[str, str], body: bytes
+) -> Reply:
+    """Respond like the graph API, with one small document per requested product."""
+
+    url = urlsplit(target)
+    params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+    if url.path == "/":
+        data: object = {"status": "ok"}
+    elif url.path.rstrip("/") == "/products" and method == "GET":
+        data = {"data": _get_filtered_products(params)}
+    elif url.path.startswith("/products/"):
+        data = {"data": {"id": url.path.split("/")[2], "deprecated_ids": []}}
+    elif url.path.startswith("/batch/products"):
+        batch = json.loads(body)["batch"]
+        data = [
+            {
+                "code": 200,
+                "body": {
+                    "data": _get_filtered_products(
+                        {
+                            key: values[0]
+                            for key, values in parse_qs(
+                                urlsplit(sub_request["relative_url"]).query
+                            ).items()
+                        }
+                    )
+                },
+            }
+            for sub_request in batch
+        ]
+    else:
+        data = {"data": []}
+
+    return 200, {"content-type": "application/json"}, json.dumps(data).encode()
+
+
+@dataclass
+class StandInServer:  # pylint: disable=too-many-instance-attributes
+    """A stand-in graph API server running on its own event loop thread."""
+
+    handshake_delay: float = 0.0
+    response_delay: float = 0.0
+    response_delay_per_megabyte: float = 0.0
+    upload_bytes_per_second: Optional[float] = None
+    handler: Callable[[str, str, Dict[str, str], bytes], Reply] = default_handler
+    port: int = 0
+    connections: int = 0
+    requests: int = 0
+    protocols: List[str] = field(default_factory=list)
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _server: Optional[asyncio.AbstractServer] = None
+    _thread: Optional[Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def host(self) -> str:
+        """Host (with port) of the server."""
+
+        return f"127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "StandInServer":
+        started = asyncio.Event()
+        self._loop = asyncio.new_event_loop()
+
+        async def serve():
+            self._server = await asyncio.start_server(
+                self._handle_connection, "127.0.0.1", self.port
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            started.set()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+
+        self._thread = Thread(target=run, daemon=True)
+        self._thread.start()
+
+        while not started.is_set():
+            self._thread.join(0.01)
+
+        return self
+
+    def __exit__(self, *args):
+        async def stop():
+            self._server.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def reset(self):
+        """Reset counters."""
+
+        self.connections = 0
+        self.requests = 0
+        self.protocols.clear()
+
+    async def _reply(
+        self, method: str, target: str, headers: Dict[str, str], body: bytes
+    ) -> Reply:
+        self.requests += 1
+
+        if headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        if self.response_delay:
+            await asyncio.sleep(self.response_delay)
+
+        reply = self.handler(method, target, headers, body)
+
+        if self.response_delay_per_megabyte:
+            await asyncio.sleep(len(reply[2]) / 1e6 * self.response_delay_per_megabyte)
+
+        return reply
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        self.connections += 1
+
+        if self.handshake_delay:
+            await asyncio.sleep(self.handshake_delay)
+
+        try:
+            preface = await reader.readexactly(len(_H2_PREFACE))
+        except asyncio.IncompleteReadError:
+            writer.close()
+            return
+
+        try:
+            if preface == _H2_PREFACE:
+                self.protocols.append("HTTP/2")
+                await self._serve_http2(reader, writer, preface)
+            else:
+                self.protocols.append("HTTP/1.1")
+                await self._serve_http1(reader, writer, preface)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_http1(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, data: bytes
+    ):
+        buffer = data
+
+        while True:
+            while b"\r\n\r\n" not in buffer:
+                chunk = await reader.read(65536)
+
+                if not chunk:
+                    return
+
+                buffer += chunk
+
+            head, buffer = buffer.split(b"\r\n\r\n", 1)
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = request_line.split(" ", 2)
+            headers = {
+                key.strip().lower(): value.strip()
+                for key, value in (line.split(":", 1) for line in header_lines)
+            }
+            length = int(headers.get("content-length", 0))
+
+            while len(buffer) < length:
+                buffer += await reader.readexactly(length - len(buffer))
+
+            if self.upload_bytes_per_second:
+                await asyncio.sleep(length / self.upload_bytes_per_second)
+
+            body, buffer = buffer[:length], buffer[length:]
+            status, response_headers, content = await self._reply(
+                method, target, headers, body
+            )
+            response_head = "".join(
+                [
+                    f"HTTP/1.1 {status} OK\r\n",
+                    *[f"{key}: {value}\r\n" for key, value in response_headers.items()],
+                    f"content-length: {len(content)}\r\n\r\n",
+                ]
+            )
+            writer.write(response_head.encode("latin-1") + content)
+            await writer.drain()
+
+    async def _serve_http2(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, data: bytes
+    ):
+        # pylint: disable=import-outside-toplevel
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+        from h2.events import DataReceived, RequestReceived, StreamEnded
+
+        conn = H2Connection(config=H2Configuration(client_side=False))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+
+        stream_headers: Dict[int, Dict[str, str]] = {}
+        stream_bodies: Dict[int, bytes] = {}
+        tasks = set()
+
+        async def respond(stream_id: int):
+            headers = stream_headers.pop(stream_id)
+            body = stream_bodies.pop(stream_id, b"")
+            status, response_headers, content = await self._reply(
+                headers[":method"], headers[":path"], headers, body
+            )
+            conn.send_headers(
+                stream_id,
+                [
+                    (":status", str(status)),
+                    *response_headers.items(),
+                    ("content-length", str(len(content))),
+                ],
+            )
+            conn.send_data(stream_id, content, end_stream=True)
+            writer.write(conn.data_to_send())
+            await writer.drain()
+
+        while True:
+            data = data or await reader.read(65536)
+
+            if not data:
+                return
+
+            for event in conn.receive_data(data):
+                if isinstance(event, RequestReceived):
+                    stream_headers[event.stream_id] = {
+                        key.decode()
+                        if isinstance(key, bytes)
+                        else key: (
+                            value.decode() if isinstance(value, bytes) else value
+                        )
+                        for key, value in event.headers
+                    }
+                elif isinstance(event, DataReceived):
+                    stream_bodies[event.stream_id] = (
+                        stream_bodies.get(event.stream_id, b"") + event.data
+                    )
+                    conn.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id
+                    )
+                elif isinstance(event, StreamEnded):
+                    task = asyncio.ensure_future(respond(event.stream_id))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+            writer.write(conn.data_to_send())
+            await writer.drain()
+            data = b""
@@ -0,0 +1,180 @@
+"""Mapping deprecated product IDs to their canonical IDs without a request."""
+# Standard Modules
+from itertools import islice
+import json
+import os
+from pathlib import Path
+from threading import Lock
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Union
+import warnings
+
+
+class AliasMap:
+    """Maps each product ID seen in a response (its `id` and `deprecated_ids`) to its canonical ID.
+
+    When products are merged, the ID that's kept is canonical, and the others are deprecated. If a
+    canonical ID is later deprecated in turn, IDs that mapped to it resolve to the new one.
+
+    Holds up to `max_size` IDs, forgetting the ones recorded first once full. Forgotten IDs are
+    simply requested as is.
+
+    Optionally backed by a JSON file, which is loaded on creation and written by `save`. A file that
+    can't be read is ignored, and replaced on the next `save`.
+
+    Thread-safe. A single instance may be shared by several clients.
+    """
+
+    # Guards against cycles, should the API ever report contradictory merges.
+    _MAX_HOPS = 16
+
+    def __init__(
+        self, path: Optional[Union[str, Path]] = None, max_size: int = 1_000_000
+    ):
+        """
+        Args:
+            path: JSON file to load the map from (if it exists) and save it to.
+            max_size: Maximum number of IDs to hold.
+        """
+
+        self.path = Path(path).expanduser() if path else None
+        self.max_size = max_size
+        self._id_to_canonical_id: Dict[str, str] = {}
+        self._lock = Lock()
+        self._changed = False
+
+        if self.path and self.path.exists():
+            self._id_to_canonical_id = self._load(self.path)
+            self._evict()
+
+    @staticmethod
+    def _load(path: Path) -> Dict[str, str]:
+        """Load a map from a JSON file, or get an empty map if the file can't be read."""
+
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as error:
+            warnings.warn(f"Ignoring unreadable alias map file {path}: {error}")
+
+            return {}
+
+        if not isinstance(data, dict):
+            warnings.warn(f"Ignoring alias map file {path}: expected a JSON object.")
+
+            return {}
+
+        return {
+            id_: canonical_id
+            for id_, canonical_id in data.items()
+            if isinstance(canonical_id, str)
+        }
+
+    def _evict(self):
+        """Forget the IDs recorded first, down to `max_size`. Must be called with the lock held
+        (or before the map is shared)."""
+
+        excess = len(self._id_to_canonical_id) - self.max_size
+
+        if excess > 0:
+            for id_ in list(islice(self._id_to_canonical_id, excess)):
+                del self._id_to_canonical_id[id_]
+
+            self._changed = True
+
+    def __len__(self) -> int:
+        return len(self._id_to_canonical_id)
+
+    def __contains__(self, id_: str) -> bool:
+        return id_ in self._id_to_canonical_id
+
+    def record(self, canonical_id: str, deprecated_ids: Iterable[str] = ()):
+        """Record a product's canonical ID and the IDs it deprecates.
+
+        Only `deprecated_ids` replace existing mappings: a stale record in which an ID that's since
+        been deprecated is still its own `id` doesn't undo the merge.
+        """
+
+        with self._lock:
+            if canonical_id not in self._id_to_canonical_id:
+                self._id_to_canonical_id[canonical_id] = canonical_id
+                self._changed = True
+
+            for id_ in deprecated_ids:
+                if self._id_to_canonical_id.get(id_) != canonical_id:
+                    self._id_to_canonical_id[id_] = canonical_id
+                    self._changed = True
+
+            self._evict()
+
+    def observe(self, products: Optional[Iterable[Any]]):
+        """Record the IDs of products from a response's data (dictionaries with an `id` and, if
+        requested, `deprecated_ids`)."""
+
+        for product in products or []:
+            if isinstance(product, dict) and product.get("id"):
+                self.record(product["id"], product.get("deprecated_ids") or [])
+
+    def resolve(self, id_: str) -> Optional[str]:
+        """Get the canonical ID for an ID, or `None` if it hasn't been seen."""
+
+        with self._lock:
+            canonical_id = self._id_to_canonical_id.get(id_)
+
+            if canonical_id is None:
+                return None
+
+            for _ in range(self._MAX_HOPS):
+                next_id = self._id_to_canonical_id.get(canonical_id)
+
+                if next_id is None or next_id == canonical_id:
+                    break
+
+                canonical_id = next_id
+
+            return canonical_id
+
+    def collapse(self, ids: Iterable[str]) -> Dict[str, str]:
+        """Map each ID to the ID to request it by: its canonical ID if known, and itself if not.
+
+        The distinct values are the fewest IDs that cover every given ID.
+        """
+
+        return {id_: self.resolve(id_) or id_ for id_ in ids}
+
+    def save(self):
+        """Write the map to its file, if it has one and has changed since it was last saved."""
+
+        if not self.path:
+            return
+
+        with self._lock:
+            if not self._changed:
+                return
+
+            id_to_canonical_id = dict(self._id_to_canonical_id)
+            self._changed = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first, so that a crash can't leave a partial file behind.
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.path.parent, suffix=".tmp", delete=False, encoding="utf-8"
+        ) as file:
+            json.dump(id_to_canonical_id, file)
+
+        os.replace(file.name, self.path)
+
+
+def unfinished_inputs(
+    id_to_lookup_id: Dict[str, str], unfinished: List[str]
+) -> List[str]:
+    """Get the given IDs whose lookups didn't finish."""
+
+    unfinished_lookups = set(unfinished)
+
+    return [
+        id_
+        for id_, lookup_id in id_to_lookup_id.items()
+        if lookup_id in unfinished_lookups
+    ]
@@ -0,0 +1,1921 @@
+"""Asynchronous Cofactr graph API client."""
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+# pylint: disable=too-many-lines
+# Python Modules
+import asyncio
+from importlib.util import find_spec
+import json
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+import warnings
+
+# 3rd Party Modules
+import httpx
+from more_itertools import batched, flatten
+from tenacity import retry
+
+# Local Modules
+from cofactr.graph import (
+    DEFAULT_LIMITS,
+    GraphAPI,
+    Protocol,
+    RetrySettings,
+)
+from cofactr.schema import (
+    OfferSchemaName,
+    OrderSchemaName,
+    OrgSchemaName,
+    ProductSchemaName,
+    SupplierSchemaName,
+    schema_to_offer,
+    schema_to_order,
+    schema_to_org,
+    schema_to_product,
+    schema_to_supplier,
+)
+from cofactr.aliases import AliasMap
+from cofactr.batch_sizing import BatchSizer, chunk_ids, measure_batch
+from cofactr.bisection import bisect_batch_async
+from cofactr.circuit_breaker import AsyncCircuitBreakerTransport, CircuitBreaker
+from cofactr.coalescing import AsyncSingleFlight, coalesced
+from cofactr.concurrency import (
+    AdaptiveConcurrencyLimit,
+    R,
+    T,
+    gather_concurrently,
+)
+from cofactr.deadline import apply_deadline_async, deadline_scope, is_deadline_error
+from cofactr.failover import AsyncFailoverTransport, EndpointPool
+from cofactr.hedging import HedgePolicy
+from cofactr.helpers import drop_none_values
+from cofactr.jobs import (
+    DEFAULT_POLLING_POLICY,
+    JobResult,
+    JobSchedule,
+    PollingPolicy,
+    get_job_products,
+    is_job_finished,
+)
+from cofactr.keepalive import AsyncKeepAlive, get_warmup_extensions
+from cofactr.loader import AsyncBatchLoader
+from cofactr.lookups import (
+    MAX_BATCH_SIZE,
+    IdLookup,
+    IdLookupMethod,
+    SearchStrategy,
+    add_required_fields,
+    get_fetch_key,
+    get_id_filter,
+    get_id_lookup_batch,
+    get_id_to_requested_ids,
+    get_job_id,
+    get_job_sub_batch_size,
+    get_query_params,
+    get_request_params,
+    get_search_batch,
+    get_search_results,
+    match_products,
+    merge_by_ids,
+    merge_canonical_ids,
+    merge_search_results,
+    parse_products,
+    parse_products_response,
+    plan_fetch,
+    raise_incomplete,
+    resolve_schema,
+)
+from cofactr.planner import FetchPlan, FetchPlanner, FetchStrategy, get_freshness
+from cofactr.rate_limit import AsyncRateLimitedTransport, RateLimiter
+from cofactr.retry import DEFAULT_RETRY_POLICY, RetryPolicy
+from cofactr.schema.types import Completion, OrderInV0, PartInV0, PartialPartInV0
+from cofactr.transfer import ACCEPT_ENCODING, TransferStats, encode_json_body
+
+if TYPE_CHECKING:
+    from cofactr.batch import AsyncBatch
+
+
+def _resolve_http2(http2: bool) -> bool:
+    """Resolve whether HTTP/2 can be used, falling back to HTTP/1.1 if `h2` isn't installed."""
+
+    if http2 and find_spec("h2") is None:
+        warnings.warn(
+            "HTTP/2 requires the 'h2' package (install `cofactr[http2]`). "
+            "Falling back to HTTP/1.1."
+        )
+
+        return False
+
+    return http2
+
+
+def _build_async_transport(
+    transport: Optional[httpx.AsyncBaseTransport],
+    limits: Optional[httpx.Limits],
+    http2: bool,
+    rate_limiter: Optional[RateLimiter],
+    circuit_breaker: Optional[CircuitBreaker],
+    endpoint_pool: Optional[EndpointPool],
+) -> httpx.AsyncBaseTransport:
+    """Build the transport stack for a pooled async client."""
+
+    transport = transport or httpx.AsyncHTTPTransport(
+        limits=limits or DEFAULT_LIMITS, http2=_resolve_http2(http2)
+    )
+
+    if endpoint_pool:
+        transport = AsyncFailoverTransport(transport, endpoint_pool)
+
+    if rate_limiter:
+        transport = AsyncRateLimitedTransport(transport, rate_limiter)
+
+    if circuit_breaker:
+        transport = AsyncCircuitBreakerTransport(transport, circuit_breaker)
+
+    return transport
+
+
+async def _gather_until_deadline(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    max_concurrency: Union[int, AdaptiveConcurrencyLimit],
+    deadline: Optional[float],
+) -> Tuple[List[R], List[T]]:
+    """Await a coroutine function for each item, like `gather_concurrently`, within a deadline.
+
+    Returns:
+        Results of the calls that finished, and the items whose calls didn't finish before the
+        deadline.
+    """
+
+    async def attempt(item: T) -> Tuple[bool, Any]:
+        try:
+            return True, await func(item)
+        except httpx.TimeoutException as error:
+            if not is_deadline_error(error):
+                raise
+
+            return False, item
+
+    with deadline_scope(deadline):
+        outcomes = await gather_concurrently(
+            attempt, items, max_concurrency=max_concurrency
+        )
+
+    return (
+        [value for finished, value in outcomes if finished],
+        [value for finished, value in outcomes if not finished],
+    )
+
+
+class AsyncGraphAPI:  # pylint: disable=too-many-instance-attributes
+    """An asyncio client-side representation of the Cofactr graph API.
+
+    Mirrors `GraphAPI`, but every request is sent through a shared `httpx.AsyncClient` and
+    retries wait without blocking the event loop.
+    """
+
+    PROTOCOL: Protocol = GraphAPI.PROTOCOL
+    HOST = GraphAPI.HOST
+    retry_settings = RetrySettings()
+    non_idempotent_retry_settings = GraphAPI.non_idempotent_retry_settings
+
+    def __init__(
+        self,
+        protocol: Optional[Protocol] = PROTOCOL,
+        host: Optional[str] = HOST,
+        default_product_schema: Union[
+            ProductSchemaName, str
+        ] = ProductSchemaName.FLAGSHIP,
+        default_order_schema: Union[OrderSchemaName, str] = OrderSchemaName.FLAGSHIP,
+        default_org_schema: Union[OrgSchemaName, str] = OrgSchemaName.FLAGSHIP,
+        default_offer_schema: Union[OfferSchemaName, str] = OfferSchemaName.FLAGSHIP,
+        default_supplier_schema: Union[
+            SupplierSchemaName, str
+        ] = SupplierSchemaName.FLAGSHIP,
+        client_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        limits: Optional[httpx.Limits] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        http2: bool = False,
+        request_compression_threshold: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        hedge_policy: Optional[HedgePolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        urls: Optional[List[str]] = None,
+        prewarm: int = 0,
+        keepalive_interval: Optional[float] = None,
+        coalesce_requests: bool = False,
+        batch_window: float = 0.0,
+        alias_map: Optional[AliasMap] = None,
+        batch_sizer: Optional[BatchSizer] = None,
+        id_lookup_method: IdLookupMethod = IdLookupMethod.FILTER,
+        fetch_planner: Optional[FetchPlanner] = None,
+    ):
+        """
+        Args:
+            limits: Connection pool limits for the underlying HTTP client. Ignored if `client` is
+                given.
+            client: HTTP client to send requests through. If not given, a pooled client is created
+                and owned by this instance. A client that is passed in is not closed by `aclose`,
+                and its event hooks are left as is: its responses aren't recorded in
+                `transfer_stats` or by `batch_sizer`, its requests aren't counted by the retry
+                budget, and their timeouts aren't cut to a `deadline`. Can't be combined with
+                `transport`, `rate_limiter`, `circuit_breaker` or `urls`.
+            http2: Whether to negotiate HTTP/2, so that concurrent requests are multiplexed over a
+                single connection. Falls back to HTTP/1.1 if the server or environment doesn't
+                support it. Ignored if `client` is given.
+            request_compression_threshold: If given, large JSON request bodies (batch searches,
+                batch jobs and custom ID mappings) of at least this many bytes are sent
+                gzip-compressed, with `Content-Encoding: gzip`.
+            transport: Transport for the pooled client to send requests with. Defaults to an HTTP
+                transport configured by `limits` and `http2`.
+            rate_limiter: Limits the rate of requests to each endpoint family, adapting to `429`
+                responses. May be shared between instances that use the same API key.
+            retry_policy: Which failures to retry and how long to wait between attempts. Retries
+                are capped by the policy's retry budget, if it has one.
+            hedge_policy: If given, `get_product`, `get_org`, `get_supplier` and `get_offers` send
+                a duplicate request when the first is slower than usual, and use whichever response
+                arrives first.
+            circuit_breaker: Fails requests to an endpoint family immediately while its backend is
+                failing, instead of waiting for timeouts. May be shared between instances.
+            urls: Base URLs of several API hosts (e.g. regional caching proxies) to spread requests
+                across, picking by observed latency and ejecting hosts that fail. Overrides
+                `protocol` and `host`. See `EndpointPool`.
+            prewarm: Number of pooled connections to open ahead of time (see `warmup`). They're
+                opened in the background once an event loop is running: right away if the
+                instance is created within one, and otherwise on entering `async with`.
+            keepalive_interval: If given, every this many seconds, `max(prewarm, 1)` health
+                checks are sent in the background so that idle pooled connections aren't
+                closed between bursts of requests. Should be shorter than the pool's
+                `keepalive_expiry`. Starts along with `prewarm`.
+            coalesce_requests: Whether concurrent identical calls to `get_product`,
+                `get_offers`, `get_org` and `get_supplier` (same arguments, apart from
+                `timeout`) share a single in-flight request and its parsed result, which callers
+                must then not mutate. Calls that join one in flight wait for it for up to their
+                own `timeout`.
+            batch_window: Time (in seconds) that `load_product`, `load_org` and
+                `load_supplier` collect lookups for before sending them as a batch. If 0,
+                lookups made within one event loop iteration are batched.
+            alias_map: Maps deprecated product IDs to canonical IDs, learned from every product
+                response. Used to skip duplicate and known-deprecated IDs in
+                `get_products_by_ids`, and to answer `get_canonical_product_ids` for known IDs
+                without a request. Defaults to an in-memory map. Pass an `AliasMap` with a
+                `path` to keep it across processes: it's saved on `aclose`. May be
+                shared between instances.
+            batch_sizer: If given, sizes the batches of `get_products_by_ids`,
+                `get_canonical_product_ids` and `get_suppliers_by_ids` (and the sub-requests of
+                `create_get_products_by_ids_job`) from the response sizes and latencies it
+                observes per schema, instead of always sending 250 IDs. May be shared between
+                instances.
+            id_lookup_method: How `get_products_by_ids` and `get_canonical_product_ids` send IDs
+                by default. See `IdLookupMethod`.
+            fetch_planner: Picks between inline batches and jobs for `fetch_products`, from the
+                latencies it records. Defaults to a `FetchPlanner` with default settings. May be
+                shared between instances.
+
+        Compressed and decompressed response sizes of the pooled client are recorded in
+        `transfer_stats`.
+        """
+
+        self.endpoint_pool = EndpointPool(urls) if urls else None
+        self.url = urls[0].rstrip("/") if urls else f"{protocol}://{host}"
+        self.default_product_schema = default_product_schema
+        self.default_order_schema = default_order_schema
+        self.default_org_schema = default_org_schema
+        self.default_offer_schema = default_offer_schema
+        self.default_supplier_schema = default_supplier_schema
+        self.client_id = client_id
+        self.api_key = api_key
+        self.request_compression_threshold = request_compression_threshold
+
+        if client and (transport or rate_limiter or circuit_breaker or urls):
+            raise ValueError(
+                "A custom client can't be combined with a transport, rate limiter, circuit "
+                "breaker or several URLs."
+            )
+
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.retry_policy = retry_policy
+        self.hedge_policy = hedge_policy
+        self.alias_map = alias_map if alias_map is not None else AliasMap()
+        self.batch_sizer = batch_sizer
+        self.id_lookup_method = id_lookup_method
+        self.fetch_planner = (
+            fetch_planner if fetch_planner is not None else FetchPlanner()
+        )
+        self.single_flight = AsyncSingleFlight() if coalesce_requests else None
+        self.product_loader = AsyncBatchLoader(
+            self.get_products_by_ids,
+            window=batch_window,
+            max_batch_size=MAX_BATCH_SIZE,
+        )
+        self.org_loader = AsyncBatchLoader(
+            self.get_orgs_by_ids, window=batch_window, max_batch_size=MAX_BATCH_SIZE
+        )
+        self.supplier_loader = AsyncBatchLoader(
+            self.get_suppliers_by_ids,
+            window=batch_window,
+            max_batch_size=MAX_BATCH_SIZE,
+        )
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            transport=_build_async_transport(
+                transport=transport,
+                limits=limits,
+                http2=http2,
+                rate_limiter=rate_limiter,
+                circuit_breaker=circuit_breaker,
+                endpoint_pool=self.endpoint_pool,
+            ),
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+        )
+        self.transfer_stats = TransferStats()
+
+        # A client that's passed in is left as is, since it may be shared with other code.
+        if self._owns_client:
+            self.client.event_hooks["response"].append(self.transfer_stats.async_hook)
+
+            if batch_sizer:
+                self.client.event_hooks["response"].append(batch_sizer.async_hook)
+
+            self.client.event_hooks["request"].append(apply_deadline_async)
+
+            if retry_policy.budget:
+                self.client.event_hooks["request"].append(
+                    retry_policy.budget.async_hook
+                )
+
+        self.prewarm = prewarm
+        self.keepalive = (
+            AsyncKeepAlive(
+                lambda: self.warmup(connections=max(prewarm, 1)),
+                interval=keepalive_interval,
+            )
+            if keepalive_interval
+            else None
+        )
+        self._warmup_task: Optional[asyncio.Task] = None
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            self._start_background_tasks()
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Authentication headers sent with every request."""
+
+        return drop_none_values(
+            {
+                "X-CLIENT-ID": self.client_id,
+                "X-API-KEY": self.api_key,
+            }
+        )
+
+    def _start_background_tasks(self):
+        """Start prewarming and keep-alive pings on the running event loop."""
+
+        if self.prewarm and self._warmup_task is None:
+            self._warmup_task = asyncio.get_running_loop().create_task(
+                self.warmup(connections=self.prewarm)
+            )
+
+        if self.keepalive:
+            self.keepalive.start()
+
+    async def aclose(self):
+        """Stop background pings and close the underlying HTTP client, releasing its pooled
+        connections."""
+
+        if self.keepalive:
+            await self.keepalive.stop()
+
+        if self._warmup_task:
+            await self._warmup_task
+
+        self.alias_map.save()
+
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        self._start_background_tasks()
+
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def _get_entity(self, url: str, **kwargs) -> httpx.Response:
+        """Get a single entity, hedging the request if a hedge policy is set."""
+
+        if not self.hedge_policy:
+            return await self.client.get(url, **kwargs)
+
+        return await self.hedge_policy.send_async(
+            lambda: self.client.get(url, **kwargs)
+        )
+
+    async def check_health(self):
+        """Check the operational status of the service."""
+
+        res = await self.client.get(self.url)
+
+        res.raise_for_status()
+
+        return res.json()
+
+    async def warmup(self, connections: int = 4) -> int:
+        """Open pooled connections ahead of time. See `GraphAPI.warmup`."""
+
+        async def ping() -> bool:
+            try:
+                res = await self.client.get(
+                    self.url, extensions=get_warmup_extensions()
+                )
+                res.raise_for_status()
+            except httpx.HTTPError:
+                return False
+
+            return True
+
+        return sum(await asyncio.gather(*[ping() for _ in range(connections)]))
+
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def get_products(
+        self,
+        query: Optional[str] = None,
+        fields: Optional[str] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        filtering: Optional[List[Dict]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        search_strategy: SearchStrategy = SearchStrategy.DEFAULT,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ):
+        """Get products. See `GraphAPI.get_products`."""
+
+        schema_class, schema_value = resolve_schema(
+            schema or self.default_product_schema, ProductSchemaName, fields
+        )
+
+        options = options or {}
+
+        res = await self.client.get(
+            f"{self.url}/products/",
+            headers=self.headers,
+            params=drop_none_values(
+                {
+                    "owner_id": owner_id,
+                    "q": query,
+                    "fields": fields,
+                    "before": before,
+                    "after": after,
+                    "limit": limit,
+                    "external": external,
+                    "force_refresh": force_refresh,
+                    "schema": schema_value,
+                    "filtering": json.dumps(filtering) if filtering else None,
+                    "search_strategy": search_strategy.value,
+                    "stale_delta": stale_delta,
+                    "ref": reference,
+                    **options,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        return parse_products_response(res.json(), schema_class, self.alias_map)
+
+    async def get_products_by_searches(
+        self,
+        queries: List[str],
+        external: bool = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        search_strategy: SearchStrategy = SearchStrategy.DEFAULT,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+        fields: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+        split_on_failure: bool = False,
+    ):
+        """Search for products associated with each query. See
+        `GraphAPI.get_products_by_searches`.
+        """
+
+        if not queries:
+            return {}
+
+        schema_class, schema_value = resolve_schema(
+            schema or self.default_product_schema, ProductSchemaName, fields
+        )
+        query_params = get_query_params(
+            schema_value,
+            external=external,
+            force_refresh=force_refresh,
+            stale_delta=stale_delta,
+            fields=fields,
+            search_strategy=search_strategy,
+        )
+
+        @retry(
+            reraise=True,
+            retry=self.retry_policy.retry,
+            stop=self.retry_policy.stop,
+            wait=self.retry_policy.wait,
+        )
+        async def search_batch(query_batch: Sequence[str]) -> Dict[str, Any]:
+            res = await self.client.post(
+                f"{self.url}/batch/products/",
+                **encode_json_body(
+                    get_search_batch(query_batch, query_params),
+                    headers=self.headers,
+                    compression_threshold=self.request_compression_threshold,
+                ),
+                params=get_request_params(owner_id, reference, options),
+                timeout=timeout,
+                follow_redirects=True,
+            )
+
+            res.raise_for_status()
+
+            return get_search_results(query_batch, res, schema_class, self.alias_map)
+
+        async def search_batches(
+            query_batch: Sequence[str],
+        ) -> Tuple[List[Dict[str, Any]], List[str]]:
+            if split_on_failure:
+                return await bisect_batch_async(search_batch, query_batch)
+
+            return [await search_batch(query_batch)], []
+
+        outcomes, unfinished_batches = await _gather_until_deadline(
+            search_batches,
+            batched(queries, n=MAX_BATCH_SIZE),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
+
+        return merge_search_results(outcomes, unfinished_batches)
+
+    async def _post_id_lookups(
+        self,
+        lookup: IdLookup,
+        ids: List[str],
+        timeout: Optional[int],
+        owner_id: Optional[str],
+        reference: Optional[str],
+        options: Optional[Dict],
+    ) -> Dict[str, Any]:
+        """Look up products by ID through `/batch/products/`. See `GraphAPI._post_id_lookups`."""
+
+        @retry(
+            reraise=True,
+            retry=self.retry_policy.retry,
+            stop=self.retry_policy.stop,
+            wait=self.retry_policy.wait,
+        )
+        async def post() -> Dict[str, Any]:
+            res = await self.client.post(
+                f"{self.url}/batch/products/",
+                **encode_json_body(
+                    lookup.get_batch(ids),
+                    headers=self.headers,
+                    compression_threshold=self.request_compression_threshold,
+                ),
+                params=get_request_params(owner_id, reference, options),
+                timeout=timeout,
+                follow_redirects=True,
+            )
+
+            res.raise_for_status()
+
+            return lookup.parse_batch(res)
+
+        return await post()
+
+    async def _send_id_lookup(
+        self,
+        lookup: IdLookup,
+        ids: List[str],
+        timeout: Optional[int],
+        owner_id: Optional[str],
+        reference: Optional[str],
+        options: Optional[Dict],
+    ) -> Dict[str, Any]:
+        """Look up a batch of products by ID. See `GraphAPI._send_id_lookup`."""
+
+        with measure_batch(self.batch_sizer, lookup.batch_key, len(ids)):
+            if lookup.method is IdLookupMethod.BATCH:
+                return await self._post_id_lookups(
+                    lookup,
+                    ids,
+                    timeout=timeout,
+                    owner_id=owner_id,
+                    reference=reference,
+                    options=options,
+                )
+
+            return await self.get_products(
+                **lookup.get_products_kwargs(ids),
+                timeout=timeout,
+                owner_id=owner_id,
+                reference=reference,
+                options=options,
+            )
+
+    async def get_products_by_ids(
+        self,
+        ids: List[str],
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+        fields: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+        lookup_method: Optional[IdLookupMethod] = None,
+        split_on_failure: bool = False,
+    ):
+        """Get a batch of products by IDs. See `GraphAPI.get_products_by_ids`."""
+
+        if not ids:
+            return {}
+
+        lookup = IdLookup(
+            ids,
+            alias_map=self.alias_map,
+            schema=schema or self.default_product_schema,
+            fields=fields,
+            method=lookup_method or self.id_lookup_method,
+            external=external,
+            force_refresh=force_refresh,
+            stale_delta=stale_delta,
+        )
+
+        async def get_batch(batched_ids: List[str]) -> Dict[str, Any]:
+            return await self._send_id_lookup(
+                lookup,
+                batched_ids,
+                timeout=timeout,
+                owner_id=owner_id,
+                reference=reference,
+                options=options,
+            )
+
+        async def get_batches(
+            batched_ids: List[str],
+        ) -> Tuple[List[Dict[str, Any]], List[str]]:
+            if split_on_failure:
+                return await bisect_batch_async(get_batch, batched_ids)
+
+            return [await get_batch(batched_ids)], []
+
+        outcomes, unfinished_batches = await _gather_until_deadline(
+            get_batches,
+            lookup.chunk(self.batch_sizer),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
+
+        return lookup.merge(outcomes, unfinished_batches)
+
+    async def get_canonical_product_ids(
+        self,
+        ids: List[str],
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+        lookup_method: Optional[IdLookupMethod] = None,
+    ):
+        """Get the canonical product ID for each of the given IDs, which may or may not be
+        deprecated.
+        """
+
+        if not ids:
+            return {}
+
+        # Known IDs are answered from the alias map, without a request.
+        lookup = IdLookup.of_unknown_ids(
+            ids, self.alias_map, method=lookup_method or self.id_lookup_method
+        )
+
+        _, unfinished_batches = await _gather_until_deadline(
+            lambda batched_ids: self._send_id_lookup(
+                lookup,
+                batched_ids,
+                timeout=timeout,
+                owner_id=owner_id,
+                reference=reference,
+                options=options,
+            ),
+            lookup.chunk(self.batch_sizer),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
+
+        # Each lookup records its products' IDs in the alias map.
+        return merge_canonical_ids(ids, self.alias_map, unfinished_batches)
+
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def get_orgs(
+        self,
+        query: Optional[str] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        schema: Optional[Union[OrgSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        filtering: Optional[List[Dict]] = None,
+        owner_id: Optional[str] = None,
+    ):
+        """Get organizations. See `GraphAPI.get_orgs`."""
+
+        if not schema:
+            schema = self.default_org_schema
+
+        schema_class: Optional[OrgSchemaName] = (
+            schema if isinstance(schema, OrgSchemaName) else None
+        )
+        schema_value = schema_class.value if schema_class else schema
+
+        res = await self.client.get(
+            f"{self.url}/orgs",
+            headers=self.headers,
+            params=drop_none_values(
+                {
+                    "owner_id": owner_id,
+                    "q": query,
+                    "before": before,
+                    "after": after,
+                    "limit": limit,
+                    "schema": schema_value,
+                    "filtering": json.dumps(filtering) if filtering else None,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        res_json = res.json()
+        res_data = res_json and res_json.get("data")
+
+        if res_data and schema_class:
+            Org = schema_to_org[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = [Org(**data) for data in res_data]
+
+        return res_json
+
+    async def get_orgs_by_ids(
+        self,
+        ids: List[str],
+        schema: Optional[Union[OrgSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+    ):
+        """Get a batch of orgs by IDs. See `GraphAPI.get_orgs_by_ids`."""
+
+        if not ids:
+            return {}
+
+        if not schema:
+            schema = self.default_org_schema
+
+        batched_orgs, unfinished_batches = await _gather_until_deadline(
+            lambda batched_ids: self.get_orgs(
+                schema=schema,
+                filtering=get_id_filter(batched_ids),
+                limit=MAX_BATCH_SIZE,
+                timeout=timeout,
+                owner_id=owner_id,
+            ),
+            batched(ids, n=MAX_BATCH_SIZE),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
+
+        return merge_by_ids(batched_orgs, ids, unfinished_batches)
+
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def get_suppliers(
+        self,
+        query: Optional[str] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        schema: Optional[Union[SupplierSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        filtering: Optional[List[Dict]] = None,
+        owner_id: Optional[str] = None,
+    ):
+        """Get suppliers. See `GraphAPI.get_suppliers`."""
+
+        if not schema:
+            schema = self.default_supplier_schema
+
+        schema_class: Optional[SupplierSchemaName] = (
+            schema if isinstance(schema, SupplierSchemaName) else None
+        )
+        schema_value = schema_class.value if schema_class else schema
+
+        res = await self.client.get(
+            f"{self.url}/orgs/suppliers",
+            headers=self.headers,
+            params=drop_none_values(
+                {
+                    "owner_id": owner_id,
+                    "q": query,
+                    "before": before,
+                    "after": after,
+                    "limit": limit,
+                    "schema": schema_value,
+                    "filtering": json.dumps(filtering) if filtering else None,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        res_json = res.json()
+        res_data = res_json and res_json.get("data")
+
+        if res_data and schema_class:
+            Supplier = schema_to_supplier[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = [Supplier(**data) for data in res_data]
+
+        return res_json
+
+    async def get_suppliers_by_ids(
+        self,
+        ids: List[str],
+        schema: Optional[Union[SupplierSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+    ):
+        """Get a batch of suppliers by IDs. See `GraphAPI.get_suppliers_by_ids`."""
+
+        if not ids:
+            return {}
+
+        if not schema:
+            schema = self.default_supplier_schema
+
+        batch_key = ("suppliers", getattr(schema, "value", schema))
+
+        async def get_batch(batched_ids: List[str]):
+            with measure_batch(self.batch_sizer, batch_key, len(batched_ids)):
+                return await self.get_suppliers(
+                    schema=schema,
+                    filtering=get_id_filter(batched_ids),
+                    limit=MAX_BATCH_SIZE,
+                    timeout=timeout,
+                    owner_id=owner_id,
+                )
+
+        batched_suppliers, unfinished_batches = await _gather_until_deadline(
+            get_batch,
+            chunk_ids(self.batch_sizer, ids, key=batch_key, max_size=MAX_BATCH_SIZE),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
+
+        return merge_by_ids(batched_suppliers, ids, unfinished_batches)
+
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def autocomplete_orgs(
+        self,
+        query: Optional[str] = None,
+        limit: Optional[int] = None,
+        types: Optional[str] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+    ) -> Dict[Literal["data"], Completion]:
+        """Autocomplete organizations. See `GraphAPI.autocomplete_orgs`."""
+
+        res = await self.client.get(
+            f"{self.url}/orgs/autocompletions/",
+            headers=self.headers,
+            params=drop_none_values(
+                {
+                    "owner_id": owner_id,
+                    "q": query,
+                    "limit": limit,
+                    "types": types,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        return res.json()
+
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def autocomplete_classifications(
+        self,
+        query: Optional[str] = None,
+        limit: Optional[int] = None,
+        types: Optional[str] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+    ) -> Dict[Literal["data"], Completion]:
+        """Autocomplete classifications. See `GraphAPI.autocomplete_classifications`."""
+
+        res = await self.client.get(
+            f"{self.url}/classes/autocompletions/",
+            headers=self.headers,
+            params=drop_none_values(
+                {
+                    "owner_id": owner_id,
+                    "q": query,
+                    "limit": limit,
+                    "types": types,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        return res.json()
+
+    def batch(
+        self,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        reference: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+    ) -> "AsyncBatch":
+        """Start a batch of reads to send together. See `GraphAPI.batch`.
+
+        Example:
+            async with graph.batch() as batch:
+                product = batch.get_product(id="CCV1F7A8UIYH", schema="internal")
+
+            product.result()
+        """
+
+        # Imported here, since `cofactr.batch` depends on this module.
+        from cofactr.batch import (  # pylint: disable=import-outside-toplevel
+            AsyncBatch,
+        )
+
+        return AsyncBatch(
+            self,
+            timeout=timeout,
+            owner_id=owner_id,
+            reference=reference,
+            max_concurrency=max_concurrency,
+        )
+
+    @coalesced
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def get_product(
+        self,
+        id: str,  # pylint: disable=redefined-builtin
+        fields: Optional[str] = None,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ):
+        """Get product. See `GraphAPI.get_product`."""
+
+        if not schema:
+            schema = self.default_product_schema
+
+        schema_class: Optional[ProductSchemaName] = (
+            schema if isinstance(schema, ProductSchemaName) else None
+        )
+
+        if (schema_class and fields) and (
+            schema_class is not ProductSchemaName.INTERNAL
+        ):
+            raise ValueError(
+                "Field expansion is not supported for the targeted schema."
+            )
+
+        schema_value = schema_class.value if schema_class else schema
+
+        options = options or {}
+
+        res = await self._get_entity(
+            f"{self.url}/products/{id}",
+            headers=self.headers,
+            params=drop_none_values(
+                {
+                    "owner_id": owner_id,
+                    "fields": fields,
+                    "external": external,
+                    "force_refresh": force_refresh,
+                    "schema": schema_value,
+                    "stale_delta": stale_delta,
+                    "ref": reference,
+                    **options,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        res_json = res.json()
+        res_data = res_json and res_json.get("data")
+
+        if isinstance(res_data, dict):
+            self.alias_map.observe([res_data])
+
+        if res_data and schema_class:
+            Product = schema_to_product[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = Product(**res_data)
+
+        return res_json
+
+    @retry(
+        reraise=non_idempotent_retry_settings.reraise,
+        retry=non_idempotent_retry_settings.retry,
+        stop=non_idempotent_retry_settings.stop,
+        wait=non_idempotent_retry_settings.wait,
+    )
+    async def create_product(
+        self,
+        data: PartInV0,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+        fields: Optional[str] = None,
+    ):
+        """Create product. See `GraphAPI.create_product`."""
+
+        if not schema:
+            schema = self.default_product_schema
+
+        schema_class: Optional[ProductSchemaName] = (
+            schema if isinstance(schema, ProductSchemaName) else None
+        )
+
+        if (schema_class and fields) and (
+            schema_class is not ProductSchemaName.INTERNAL
+        ):
+            raise ValueError(
+                "Field expansion is not supported for the targeted schema."
+            )
+
+        schema_value = schema_class.value if schema_class else schema
+
+        options = options or {}
+
+        res = await self.client.post(
+            f"{self.url}/products/",
+            json=data,
+            headers=self.headers,
+            params=drop_none_values(
+                {"schema": schema_value, "fields": fields, "ref": reference, **options}
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        res_json = res.json()
+        res_data = res_json and res_json.get("data")
+
+        if res_data and schema_class:
+            Product = schema_to_product[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = Product(**res_data)
+
+        return res_json
+
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def update_product(
+        self,
+        product_id: str,
+        data: PartialPartInV0,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ):
+        """Update product. See `GraphAPI.update_product`."""
+
+        options = options or {}
+
+        res = await self.client.patch(
+            f"{self.url}/products/{product_id}",
+            json={
+                "owner_id": owner_id,
+                "schema": "flagship",
+                "data": data,
+            },
+            headers=self.headers,
+            params=drop_none_values({"ref": reference, **options}),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+    @retry(
+        reraise=non_idempotent_retry_settings.reraise,
+        retry=non_idempotent_retry_settings.retry,
+        stop=non_idempotent_retry_settings.stop,
+        wait=non_idempotent_retry_settings.wait,
+    )
+    async def set_custom_product_ids(
+        self,
+        id_to_custom_id: Dict[str, Optional[str]],
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ):
+        """Set custom product IDs. See `GraphAPI.set_custom_product_ids`."""
+
+        if not id_to_custom_id:
+            return
+
+        options = options or {}
+
+        res = await self.client.post(
+            f"{self.url}/actions/custom-product-id-mappings/",
+            **encode_json_body(
+                {
+                    "owner_id": owner_id,
+                    "id_to_custom_id": id_to_custom_id,
+                },
+                headers=self.headers,
+                compression_threshold=self.request_compression_threshold,
+            ),
+            params=drop_none_values({"ref": reference, **options}),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+    @coalesced
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def get_offers(
+        self,
+        product_id: str,
+        fields: Optional[str] = None,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[OfferSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ):
+        """Get offers for a product. See `GraphAPI.get_offers`."""
+
+        if not schema:
+            schema = self.default_offer_schema
+
+        options = options or {}
+
+        schema_class: Optional[OfferSchemaName] = (
+            schema if isinstance(schema, OfferSchemaName) else None
+        )
+
+        if (schema_class and fields) and (schema_class is not OfferSchemaName.INTERNAL):
+            raise ValueError(
+                "Field expansion is not supported for the targeted schema."
+            )
+
+        schema_value = schema_class.value if schema_class else schema
+
+        res = await self._get_entity(
+            f"{self.url}/products/{product_id}/offers",
+            headers=self.headers,
+            params=drop_none_values(
+                {
+                    "owner_id": owner_id,
+                    "fields": fields,
+                    "external": external,
+                    "force_refresh": force_refresh,
+                    "schema": schema_value,
+                    "stale_delta": stale_delta,
+                    "ref": reference,
+                    **options,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        res_json = res.json()
+        res_data = res_json and res_json.get("data")
+
+        if res_json and schema_class:
+            Offer = schema_to_offer[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = [Offer(**data) for data in res_data]
+
+        return res_json
+
+    @coalesced
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def get_org(
+        self,
+        id: str,  # pylint: disable=redefined-builtin
+        schema: Optional[Union[OrgSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+    ):
+        """Get organization."""
+
+        if not schema:
+            schema = self.default_org_schema
+
+        schema_class: Optional[OrgSchemaName] = (
+            schema if isinstance(schema, OrgSchemaName) else None
+        )
+        schema_value = schema_class.value if schema_class else schema
+
+        res = await self._get_entity(
+            f"{self.url}/orgs/{id}",
+            headers=self.headers,
+            params=drop_none_values({"owner_id": owner_id, "schema": schema_value}),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        res_json = res.json()
+        res_data = res_json and res_json.get("data")
+
+        if res_json and schema_class:
+            Org = schema_to_org[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = Org(**res_data) if res_data else None
+
+        return res_json
+
+    @coalesced
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def get_supplier(
+        self,
+        id: str,  # pylint: disable=redefined-builtin
+        schema: Optional[Union[SupplierSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+    ):
+        """Get supplier."""
+
+        if not schema:
+            schema = self.default_supplier_schema
+
+        schema_class: Optional[SupplierSchemaName] = (
+            schema if isinstance(schema, SupplierSchemaName) else None
+        )
+        schema_value = schema_class.value if schema_class else schema
+
+        res = await self._get_entity(
+            f"{self.url}/orgs/{id}",
+            headers=self.headers,
+            params=drop_none_values({"owner_id": owner_id, "schema": schema_value}),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        res_json = res.json()
+        res_data = res_json and res_json.get("data")
+
+        if res_data and schema_class:
+            Supplier = schema_to_supplier[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = Supplier(**res_data)
+
+        return res_json
+
+    async def load_product(
+        self,
+        id: str,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+        fields: Optional[str] = None,
+    ):
+        """Get a product by ID, batched with concurrent lookups. See `GraphAPI.load_product`."""
+
+        return await self.product_loader.load(
+            id=id,
+            external=external,
+            force_refresh=force_refresh,
+            schema=schema,
+            timeout=timeout,
+            owner_id=owner_id,
+            stale_delta=stale_delta,
+            reference=reference,
+            options=options,
+            fields=fields,
+        )
+
+    async def load_org(
+        self,
+        id: str,
+        schema: Optional[Union[OrgSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+    ):
+        """Get an organization by ID, batched with concurrent lookups. See `GraphAPI.load_org`."""
+
+        return await self.org_loader.load(
+            id=id, schema=schema, timeout=timeout, owner_id=owner_id
+        )
+
+    async def load_supplier(
+        self,
+        id: str,
+        schema: Optional[Union[SupplierSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+    ):
+        """Get a supplier by ID, batched with concurrent lookups. See
+        `GraphAPI.load_supplier`."""
+
+        return await self.supplier_loader.load(
+            id=id, schema=schema, timeout=timeout, owner_id=owner_id
+        )
+
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def get_orders(
+        self,
+        schema: Optional[Union[OrderSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        filtering: Optional[List[Dict]] = None,
+        owner_id: Optional[str] = None,
+        is_sandbox: bool = False,
+    ):
+        """Get orders. See `GraphAPI.get_orders`."""
+
+        if not schema:
+            schema = self.default_order_schema
+
+        schema_class: Optional[OrderSchemaName] = (
+            schema if isinstance(schema, OrderSchemaName) else None
+        )
+        schema_value = schema_class.value if schema_class else schema
+
+        res = await self.client.get(
+            f"{self.url}/orders/",
+            headers=self.headers,
+            params=drop_none_values(
+                {
+                    "owner_id": owner_id,
+                    "external": True,
+                    "schema": schema_value,
+                    "filtering": json.dumps(filtering) if filtering else None,
+                    "is_sandbox": is_sandbox,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        res_json = res.json()
+        res_data = res_json.get("data")
+
+        if res_data and schema_class:
+            Order = schema_to_order[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = [Order(**data) for data in res_data]
+
+        return res_json
+
+    async def get_orders_by_ids(
+        self,
+        ids: List[str],
+        schema: Optional[Union[OrderSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        is_sandbox: bool = False,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+    ):
+        """Get a batch of orders by IDs. See `GraphAPI.get_orders_by_ids`."""
+
+        if not ids:
+            return {}
+
+        if not schema:
+            schema = self.default_order_schema
+
+        batched_orders, unfinished_batches = await _gather_until_deadline(
+            lambda batched_ids: self.get_orders(
+                schema=schema,
+                filtering=get_id_filter(batched_ids),
+                timeout=timeout,
+                owner_id=owner_id,
+                is_sandbox=is_sandbox,
+            ),
+            batched(ids, n=MAX_BATCH_SIZE),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
+
+        return merge_by_ids(batched_orders, ids, unfinished_batches)
+
+    async def create_order(
+        self,
+        data: OrderInV0,
+        timeout: Optional[int] = None,
+        is_sandbox: bool = False,
+    ):
+        """Create order. See `GraphAPI.create_order`.
+
+        Returns:
+            ID of the created order.
+        """
+
+        res = await self.client.post(
+            f"{self.url}/orders/",
+            headers=self.headers,
+            json=data,
+            params=drop_none_values(
+                {
+                    "is_sandbox": is_sandbox,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        location = res.headers.get("location")
+
+        if not location:
+            raise ValueError("No resource location found in order creation response.")
+
+        # Remove `/orders/` to get the ID from the resource path.
+        return location[8:]
+
+    async def create_get_products_by_ids_job(
+        self,
+        ids: List[str],
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[dict] = None,
+        fields: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> List[str]:
+        """Create batch product request job. See `GraphAPI.create_get_products_by_ids_job`.
+
+        Returns:
+            A list with one ID for each job that was created.
+        """
+
+        _, schema_value = resolve_schema(
+            schema or self.default_product_schema, ProductSchemaName, fields
+        )
+        query_params = get_query_params(
+            schema_value,
+            external=external,
+            force_refresh=force_refresh,
+            stale_delta=stale_delta,
+            fields=fields,
+        )
+        sub_batch_size = get_job_sub_batch_size(self.batch_sizer, schema_value, fields)
+
+        async def create_job(id_batch: Sequence[str]) -> str:
+            res = await self.client.post(
+                f"{self.url}/jobs/batch-products-requests/",
+                **encode_json_body(
+                    {
+                        "batch": get_id_lookup_batch(
+                            id_batch,
+                            query_params=query_params,
+                            sub_batch_size=sub_batch_size,
+                        )
+                    },
+                    headers=self.headers,
+                    compression_threshold=self.request_compression_threshold,
+                ),
+                params=get_request_params(owner_id, reference, options),
+                timeout=timeout,
+                follow_redirects=True,
+            )
+
+            res.raise_for_status()
+
+            return get_job_id(res)
+
+        # Jobs are created one at a time, in order.
+        job_ids, unfinished_batches = await _gather_until_deadline(
+            create_job,
+            batched(ids, n=MAX_BATCH_SIZE),
+            max_concurrency=1,
+            deadline=deadline,
+        )
+
+        raise_incomplete(
+            job_ids, unfinished=list(flatten(unfinished_batches)), poison=[]
+        )
+
+        return job_ids
+
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    async def get_job(
+        self, job_id: str, timeout: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Get a job's status and, once it's completed, its results. See `GraphAPI.get_job`."""
+
+        res = await self.client.get(
+            f"{self.url}/jobs/{job_id}",
+            headers=self.headers,
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        return res.json()
+
+    async def _iter_finished_jobs(
+        self,
+        job_ids: List[str],
+        polling: PollingPolicy,
+        max_concurrency: int,
+        timeout: Optional[int],
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Poll jobs until each finishes, yielding each as it does."""
+
+        schedule = JobSchedule(job_ids, polling)
+
+        while schedule:
+            await asyncio.sleep(schedule.get_delay())
+            due = schedule.take_due()
+            jobs = await gather_concurrently(
+                lambda job_id: self.get_job(job_id, timeout=timeout),
+                [job_id for job_id, _ in due],
+                max_concurrency=max_concurrency,
+            )
+
+            for (job_id, polls), job in zip(due, jobs):
+                if is_job_finished(job):
+                    yield job_id, job
+                else:
+                    schedule.reschedule(job_id, polls + 1)
+
+    async def iter_job_results(
+        self,
+        job_ids: List[str],
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        polling: PollingPolicy = DEFAULT_POLLING_POLICY,
+        max_concurrency: int = 8,
+        timeout: Optional[int] = None,
+    ) -> AsyncIterator[JobResult]:
+        """Poll jobs until they finish, and get their products as each one does. See
+        `GraphAPI.iter_job_results`."""
+
+        schema_class, _ = resolve_schema(
+            schema or self.default_product_schema, ProductSchemaName, None
+        )
+
+        async for job_id, job in self._iter_finished_jobs(
+            job_ids, polling=polling, max_concurrency=max_concurrency, timeout=timeout
+        ):
+            products = get_job_products(job_id, job)
+
+            yield JobResult(
+                job_id=job_id,
+                products=parse_products(products, schema_class, self.alias_map),
+            )
+
+    def plan_fetch(
+        self,
+        ids: int,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        stale_delta: Optional[str] = None,
+        fields: Optional[str] = None,
+        max_concurrency: int = 4,
+    ) -> FetchPlan:
+        """Pick the strategy `fetch_products` would use. See `GraphAPI.plan_fetch`."""
+
+        return plan_fetch(
+            self.fetch_planner,
+            ids,
+            schema=schema or self.default_product_schema,
+            fields=fields,
+            external=external,
+            force_refresh=force_refresh,
+            stale_delta=stale_delta,
+            max_concurrency=max_concurrency,
+        )
+
+    def fetch_products(
+        self,
+        ids: List[str],
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+        fields: Optional[str] = None,
+        max_concurrency: int = 4,
+        strategy: Optional[FetchStrategy] = None,
+        polling: PollingPolicy = DEFAULT_POLLING_POLICY,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Fetch products by ID, inline or through the jobs API. See `GraphAPI.fetch_products`.
+
+        Returns:
+            An async iterator of each ID found and its product.
+        """
+
+        schema = schema or self.default_product_schema
+        resolve_schema(schema, ProductSchemaName, fields)
+
+        ids = list(dict.fromkeys(ids))
+        key = get_fetch_key(
+            schema,
+            fields,
+            get_freshness(
+                external=external, force_refresh=force_refresh, stale_delta=stale_delta
+            ),
+        )
+
+        if strategy is None:
+            strategy = self.plan_fetch(
+                len(ids),
+                external=external,
+                force_refresh=force_refresh,
+                schema=schema,
+                stale_delta=stale_delta,
+                fields=fields,
+                max_concurrency=max_concurrency,
+            ).strategy
+
+        if strategy is FetchStrategy.JOBS:
+            return self._fetch_products_by_jobs(
+                ids,
+                polling=polling,
+                max_concurrency=max_concurrency,
+                external=external,
+                force_refresh=force_refresh,
+                schema=schema,
+                timeout=timeout,
+                owner_id=owner_id,
+                stale_delta=stale_delta,
+                reference=reference,
+                options=options,
+                fields=fields,
+            )
+
+        return self._fetch_products_inline(
+            ids,
+            key=key,
+            max_concurrency=max_concurrency,
+            external=external,
+            force_refresh=force_refresh,
+            schema=schema,
+            timeout=timeout,
+            owner_id=owner_id,
+            stale_delta=stale_delta,
+            reference=reference,
+            options=options,
+            fields=fields,
+        )
+
+    async def _fetch_products_inline(
+        self,
+        ids: List[str],
+        key: Hashable,
+        max_concurrency: int,
+        external: Optional[bool],
+        force_refresh: bool,
+        schema: Union[ProductSchemaName, str],
+        timeout: Optional[int],
+        owner_id: Optional[str],
+        stale_delta: Optional[str],
+        reference: Optional[str],
+        options: Optional[Dict],
+        fields: Optional[str],
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+
+        async def fetch(id_batch: List[str]) -> Dict[str, Any]:
+            async with semaphore:
+                start = time.monotonic()
+                id_to_product = await self.get_products_by_ids(
+                    ids=id_batch,
+                    external=external,
+                    force_refresh=force_refresh,
+                    schema=schema,
+                    timeout=timeout,
+                    owner_id=owner_id,
+                    stale_delta=stale_delta,
+                    reference=reference,
+                    options=options,
+                    fields=fields,
+                )
+                self.fetch_planner.record(key, len(id_batch), time.monotonic() - start)
+
+            return id_to_product
+
+        tasks = [
+            asyncio.ensure_future(fetch(list(id_batch)))
+            for id_batch in batched(ids, n=MAX_BATCH_SIZE)
+        ]
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for item in (await next_done).items():
+                    yield item
+        finally:
+            # Stop early if the caller stops iterating (or a batch failed).
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _fetch_products_by_jobs(
+        self,
+        ids: List[str],
+        polling: PollingPolicy,
+        max_concurrency: int,
+        external: Optional[bool],
+        force_refresh: bool,
+        schema: Union[ProductSchemaName, str],
+        timeout: Optional[int],
+        owner_id: Optional[str],
+        stale_delta: Optional[str],
+        reference: Optional[str],
+        options: Optional[Dict],
+        fields: Optional[str],
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        job_ids = await self.create_get_products_by_ids_job(
+            ids=ids,
+            external=external,
+            force_refresh=force_refresh,
+            schema=schema,
+            timeout=timeout,
+            owner_id=owner_id,
+            stale_delta=stale_delta,
+            reference=reference,
+            options=options,
+            fields=add_required_fields(fields),
+        )
+
+        id_to_requested_ids = get_id_to_requested_ids(ids, self.alias_map)
+
+        async for job_id, job in self._iter_finished_jobs(
+            job_ids, polling=polling, max_concurrency=max_concurrency, timeout=timeout
+        ):
+
+            for item in match_products(
+                get_job_products(job_id, job),
+                id_to_requested_ids=id_to_requested_ids,
+                schema=schema,
+                fields=fields,
+                alias_map=self.alias_map,
+            ):
+                yield item
@@ -0,0 +1,411 @@
+"""Sending mixed reads (products, offers and product searches) in as few requests as possible."""
+# pylint: disable=too-many-arguments
+# Python Modules
+import json
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib.parse import quote, urlencode
+
+# 3rd Party Modules
+import httpx
+from more_itertools import batched
+from tenacity import retry
+
+# Local Modules
+from cofactr.aliases import AliasMap
+from cofactr.concurrency import (
+    AdaptiveConcurrencyLimit,
+    gather_concurrently,
+    map_concurrently,
+)
+from cofactr.helpers import drop_none_values
+from cofactr.lookups import (
+    MAX_BATCH_SIZE,
+    SearchStrategy,
+    parse_products_response,
+    resolve_schema,
+)
+from cofactr.schema import (
+    OfferSchemaName,
+    ProductSchemaName,
+    schema_to_offer,
+    schema_to_product,
+)
+from cofactr.transfer import encode_json_body
+
+if TYPE_CHECKING:
+    from cofactr.async_graph import AsyncGraphAPI
+    from cofactr.graph import GraphAPI
+
+GraphT = TypeVar("GraphT", bound=Union["GraphAPI", "AsyncGraphAPI"])
+
+
+class BatchResult:
+    """Result of a read queued on a batch, available once the batch has been sent."""
+
+    def __init__(self, url: str, parse: Callable[[Any], Any]):
+        self.url = url
+        self.done = False
+        self._parse = parse
+        self._value: Any = None
+        self._error: Optional[BaseException] = None
+
+    def __repr__(self) -> str:
+        return f"BatchResult({self.url!r}, done={self.done})"
+
+    def result(self) -> Any:
+        """Get the parsed response, in the same shape as the equivalent `GraphAPI` method's.
+
+        Raises:
+            RuntimeError: If the batch hasn't been sent.
+            httpx.HTTPStatusError: If the read failed.
+        """
+
+        if not self.done:
+            raise RuntimeError("The batch hasn't been sent.")
+
+        if self._error:
+            raise self._error
+
+        return self._value
+
+    def _set_response(self, code: int, body: Any):
+        if code != httpx.codes.OK:
+            response = httpx.Response(
+                code, json=body, request=httpx.Request("GET", self.url)
+            )
+
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as error:
+                self._set_error(error)
+
+                return
+
+        try:
+            self._value = self._parse(body)
+        except Exception as error:  # pylint: disable=broad-except
+            self._set_error(error)
+
+            return
+
+        self.done = True
+
+    def _set_error(self, error: BaseException):
+        self._error = error
+        self.done = True
+
+
+def _parse_product(schema_class: Optional[ProductSchemaName], alias_map: AliasMap):
+    def parse(res_json):
+        res_data = res_json and res_json.get("data")
+
+        if isinstance(res_data, dict):
+            alias_map.observe([res_data])
+
+        if res_data and schema_class:
+            Product = schema_to_product[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = Product(**res_data)
+
+        return res_json
+
+    return parse
+
+
+def _parse_products(schema_class: Optional[ProductSchemaName], alias_map: AliasMap):
+    def parse(res_json):
+        return parse_products_response(res_json, schema_class, alias_map)
+
+    return parse
+
+
+def _parse_offers(schema_class: Optional[OfferSchemaName]):
+    def parse(res_json):
+        res_data = res_json and res_json.get("data")
+
+        if res_json and schema_class:
+            Offer = schema_to_offer[schema_class]  # pylint: disable=invalid-name
+
+            res_json["data"] = [Offer(**data) for data in res_data]
+
+        return res_json
+
+    return parse
+
+
+class _BatchBuilder(Generic[GraphT]):
+    """Queues reads, and packs them into `/batch/products/` requests of up to 250 reads each."""
+
+    def __init__(
+        self,
+        graph: GraphT,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        reference: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+    ):
+        self.graph = graph
+        self.timeout = timeout
+        self.owner_id = owner_id
+        self.reference = reference
+        self.max_concurrency = max_concurrency
+        self.queued: List[Tuple[str, BatchResult]] = []
+
+    def _queue(
+        self, path: str, params: Dict[str, Any], parse: Callable[[Any], Any]
+    ) -> BatchResult:
+        relative_url = f"{path}?{urlencode(drop_none_values(params))}"
+        result = BatchResult(f"{self.graph.url}/products/{relative_url}", parse)
+        self.queued.append((relative_url, result))
+
+        return result
+
+    def get_product(
+        self,
+        id: str,  # pylint: disable=redefined-builtin
+        fields: Optional[str] = None,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        stale_delta: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ) -> BatchResult:
+        """Queue getting a product. See `GraphAPI.get_product`."""
+
+        schema_class, schema_value = resolve_schema(
+            schema or self.graph.default_product_schema, ProductSchemaName, fields
+        )
+
+        return self._queue(
+            quote(id),
+            {
+                "fields": fields,
+                "external": external,
+                "force_refresh": force_refresh,
+                "schema": schema_value,
+                "stale_delta": stale_delta,
+                **(options or {}),
+            },
+            _parse_product(schema_class, self.graph.alias_map),
+        )
+
+    def get_offers(
+        self,
+        product_id: str,
+        fields: Optional[str] = None,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[OfferSchemaName, str]] = None,
+        stale_delta: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ) -> BatchResult:
+        """Queue getting a product's offers. See `GraphAPI.get_offers`."""
+
+        schema_class, schema_value = resolve_schema(
+            schema or self.graph.default_offer_schema, OfferSchemaName, fields
+        )
+
+        return self._queue(
+            f"{quote(product_id)}/offers",
+            {
+                "fields": fields,
+                "external": external,
+                "force_refresh": force_refresh,
+                "schema": schema_value,
+                "stale_delta": stale_delta,
+                **(options or {}),
+            },
+            _parse_offers(schema_class),
+        )
+
+    def get_products(
+        self,
+        query: Optional[str] = None,
+        fields: Optional[str] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        filtering: Optional[List[Dict]] = None,
+        search_strategy: SearchStrategy = SearchStrategy.DEFAULT,
+        stale_delta: Optional[str] = None,
+        options: Optional[Dict] = None,
+    ) -> BatchResult:
+        """Queue a product search. See `GraphAPI.get_products`."""
+
+        schema_class, schema_value = resolve_schema(
+            schema or self.graph.default_product_schema, ProductSchemaName, fields
+        )
+
+        return self._queue(
+            "",
+            {
+                "q": query,
+                "fields": fields,
+                "before": before,
+                "after": after,
+                "limit": limit,
+                "external": external,
+                "force_refresh": force_refresh,
+                "schema": schema_value,
+                "filtering": json.dumps(filtering) if filtering else None,
+                "search_strategy": search_strategy.value,
+                "stale_delta": stale_delta,
+                **(options or {}),
+            },
+            _parse_products(schema_class, self.graph.alias_map),
+        )
+
+    def _take_chunks(self) -> List[List[Tuple[str, BatchResult]]]:
+        """Take the queued reads, split into one chunk per request."""
+
+        queued, self.queued = self.queued, []
+
+        return [list(chunk) for chunk in batched(queued, n=MAX_BATCH_SIZE)]
+
+    def _get_request_kwargs(self, chunk: List[Tuple[str, BatchResult]]) -> Dict:
+        """Get the keyword arguments for the client's `post` to send a chunk with."""
+
+        graph = self.graph
+
+        return {
+            "url": f"{graph.url}/batch/products/",
+            **encode_json_body(
+                {
+                    "batch": [
+                        {"method": "GET", "relative_url": relative_url}
+                        for relative_url, _ in chunk
+                    ]
+                },
+                headers=drop_none_values(
+                    {"X-CLIENT-ID": graph.client_id, "X-API-KEY": graph.api_key}
+                ),
+                compression_threshold=graph.request_compression_threshold,
+            ),
+            "params": drop_none_values(
+                {"owner_id": self.owner_id, "ref": self.reference}
+            ),
+            "timeout": self.timeout,
+            "follow_redirects": True,
+        }
+
+    @staticmethod
+    def _resolve(chunk: List[Tuple[str, BatchResult]], res: httpx.Response):
+        """Set the results of a chunk's reads from the batch response."""
+
+        responses = res.json()
+
+        if not isinstance(responses, list) or len(responses) != len(chunk):
+            for _, result in chunk:
+                result._set_error(  # pylint: disable=protected-access
+                    ValueError("Unexpected batch response.")
+                )
+
+            return
+
+        for (_, result), response in zip(chunk, responses):
+            result._set_response(  # pylint: disable=protected-access
+                response["code"], response.get("body")
+            )
+
+    @staticmethod
+    def _fail(chunk: List[Tuple[str, BatchResult]], error: BaseException):
+        for _, result in chunk:
+            result._set_error(error)  # pylint: disable=protected-access
+
+
+class Batch(_BatchBuilder["GraphAPI"]):
+    """Reads to send together. Create with `GraphAPI.batch`.
+
+    Each read returns a `BatchResult` right away, whose `result` is available once the batch is
+    sent (by `send`, or on leaving a `with` block). Reads are packed into `/batch/products/`
+    requests of up to 250 reads each, which are retried on their own. A read that fails (or whose
+    request fails) raises from its `result`, without affecting the others.
+    """
+
+    def send(self) -> List[BatchResult]:
+        """Send the reads queued since the last send.
+
+        Returns:
+            Results of the reads, in the order they were queued.
+        """
+
+        chunks = self._take_chunks()
+        policy = self.graph.retry_policy
+
+        @retry(reraise=True, retry=policy.retry, stop=policy.stop, wait=policy.wait)
+        def post(chunk: List[Tuple[str, BatchResult]]) -> httpx.Response:
+            res = self.graph.client.post(**self._get_request_kwargs(chunk))
+            res.raise_for_status()
+
+            return res
+
+        def send_chunk(chunk: List[Tuple[str, BatchResult]]):
+            try:
+                res = post(chunk)
+            except (httpx.HTTPError, ValueError) as error:
+                self._fail(chunk, error)
+            else:
+                self._resolve(chunk, res)
+
+        map_concurrently(send_chunk, chunks, max_concurrency=self.max_concurrency)
+
+        return [result for chunk in chunks for _, result in chunk]
+
+    def __enter__(self) -> "Batch":
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.send()
+
+
+class AsyncBatch(_BatchBuilder["AsyncGraphAPI"]):
+    """Reads to send together. Create with `AsyncGraphAPI.batch`. See `Batch`."""
+
+    async def send(self) -> List[BatchResult]:
+        """Send the reads queued since the last send. See `Batch.send`."""
+
+        chunks = self._take_chunks()
+        policy = self.graph.retry_policy
+
+        @retry(reraise=True, retry=policy.retry, stop=policy.stop, wait=policy.wait)
+        async def post(chunk: List[Tuple[str, BatchResult]]) -> httpx.Response:
+            res = await self.graph.client.post(**self._get_request_kwargs(chunk))
+            res.raise_for_status()
+
+            return res
+
+        async def send_chunk(chunk: List[Tuple[str, BatchResult]]):
+            try:
+                res = await post(chunk)
+            except (httpx.HTTPError, ValueError) as error:
+                self._fail(chunk, error)
+            else:
+                self._resolve(chunk, res)
+
+        await gather_concurrently(
+            send_chunk, chunks, max_concurrency=self.max_concurrency
+        )
+
+        return [result for chunk in chunks for _, result in chunk]
+
+    async def __aenter__(self) -> "AsyncBatch":
+        return self
+
+    async def __aexit__(self, exc_type, *args):
+        if exc_type is None:
+            await self.send()
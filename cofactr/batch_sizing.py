@@ -0,0 +1,277 @@
+"""Sizing ID batches from the response sizes and latencies observed per endpoint and schema."""
+# Standard Modules
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+import json
+from threading import Lock
+import time
+from typing import (
+    ContextManager,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+from urllib.parse import quote_plus
+
+# 3rd Party Modules
+import httpx
+from more_itertools import batched
+
+
+class BatchEstimate(NamedTuple):
+    """Smoothed per-ID costs observed for a kind of batch request."""
+
+    bytes_per_item: float
+    seconds_per_item: float
+    observations: int
+
+
+class _Measurement:
+    """The last successful response of a batch request (which may have been retried)."""
+
+    def __init__(self):
+        self.response_bytes: Optional[int] = None
+        self.latency: Optional[float] = None
+
+
+_current_measurement: ContextVar[Optional[_Measurement]] = ContextVar(
+    "cofactr_batch_measurement", default=None
+)
+
+
+def get_encoded_filter_length(id_: str) -> int:
+    """Get how much an ID adds to an `IN` filter, once URL-encoded in a query string."""
+
+    return len(quote_plus(f"{json.dumps(id_)}, "))
+
+
+class BatchSizer:
+    """Picks how many IDs to send per batch request, from the response sizes and latencies
+    observed for each kind of request (its "key": endpoint, schema and fields).
+
+    The same number of IDs can take a few kilobytes (e.g. `fields="id,deprecated_ids"`) or many
+    megabytes (e.g. a pricing schema), so a fixed batch size is either too small for the first or
+    too large for the second. Batches are sized so that their responses are expected to stay
+    under `target_response_bytes` and `target_latency`, within the server's batch size limit.
+    Until a key has been observed, its batches are as large as the server allows.
+
+    IDs sent in a query string's `filtering` are also kept under `max_filter_length` encoded
+    characters, so that long IDs don't make URLs the server rejects.
+
+    Thread-safe. A single instance may be shared by several clients.
+    """
+
+    def __init__(
+        self,
+        target_response_bytes: int = 1_000_000,
+        target_latency: float = 1.0,
+        max_filter_length: int = 6000,
+        min_size: int = 10,
+        smoothing: float = 0.3,
+    ):
+        """
+        Args:
+            target_response_bytes: Decompressed response size to aim for per batch.
+            target_latency: Response time (in seconds) to aim for per batch.
+            max_filter_length: Maximum URL-encoded length of the IDs in a query string's
+                `filtering`.
+            min_size: Fewest IDs to send per batch (unless fewer are left).
+            smoothing: Weight of each new observation in the running estimates, from 0 to 1.
+        """
+
+        if not 0 < smoothing <= 1:
+            raise ValueError("Expected a smoothing factor in (0, 1].")
+
+        if min_size < 1:
+            raise ValueError("Expected a positive minimum batch size.")
+
+        self.target_response_bytes = target_response_bytes
+        self.target_latency = target_latency
+        self.max_filter_length = max_filter_length
+        self.min_size = min_size
+        self.smoothing = smoothing
+        self._estimates: Dict[Hashable, BatchEstimate] = {}
+        self._lock = Lock()
+
+    def get_estimate(self, key: Hashable) -> Optional[BatchEstimate]:
+        """Get the estimate for a key, or `None` if it hasn't been observed."""
+
+        with self._lock:
+            return self._estimates.get(key)
+
+    def get_size(self, key: Hashable, max_size: int, by_latency: bool = True) -> int:
+        """Get the number of IDs to send per batch.
+
+        Args:
+            key: Kind of request.
+            max_size: Most IDs the server accepts per batch.
+            by_latency: Whether to size for `target_latency`, as well as for
+                `target_response_bytes`. Batches that the server processes in the background
+                (e.g. jobs) are sized by response bytes alone.
+        """
+
+        estimate = self.get_estimate(key)
+
+        if estimate is None:
+            return max_size
+
+        size = float(max_size)
+
+        if estimate.bytes_per_item > 0:
+            size = min(size, self.target_response_bytes / estimate.bytes_per_item)
+
+        if by_latency and estimate.seconds_per_item > 0:
+            size = min(size, self.target_latency / estimate.seconds_per_item)
+
+        return max(min(self.min_size, max_size), min(max_size, int(size)))
+
+    def chunk(
+        self, ids: Sequence[str], key: Hashable, max_size: int, in_url: bool = True
+    ) -> List[List[str]]:
+        """Split IDs into batches.
+
+        Args:
+            ids: IDs to split.
+            key: Kind of request.
+            max_size: Most IDs the server accepts per batch.
+            in_url: Whether the IDs are sent in a query string's `filtering`, and so are limited
+                by `max_filter_length`.
+        """
+
+        size = self.get_size(key, max_size)
+        chunks: List[List[str]] = []
+        chunk: List[str] = []
+        length = 0
+
+        for id_ in ids:
+            id_length = get_encoded_filter_length(id_) if in_url else 0
+
+            if chunk and (
+                len(chunk) >= size or length + id_length > self.max_filter_length
+            ):
+                chunks.append(chunk)
+                chunk, length = [], 0
+
+            chunk.append(id_)
+            length += id_length
+
+        if chunk:
+            chunks.append(chunk)
+
+        return chunks
+
+    def record(self, key: Hashable, items: int, response_bytes: int, latency: float):
+        """Record a batch request's response."""
+
+        if items < 1:
+            return
+
+        bytes_per_item = response_bytes / items
+        # Includes the request's fixed overhead, so small batches are sized up in steps.
+        seconds_per_item = latency / items
+
+        with self._lock:
+            estimate = self._estimates.get(key)
+
+            if estimate is None:
+                self._estimates[key] = BatchEstimate(
+                    bytes_per_item, seconds_per_item, 1
+                )
+
+                return
+
+            weight = self.smoothing
+            self._estimates[key] = BatchEstimate(
+                bytes_per_item=(1 - weight) * estimate.bytes_per_item
+                + weight * bytes_per_item,
+                seconds_per_item=(1 - weight) * estimate.seconds_per_item
+                + weight * seconds_per_item,
+                observations=estimate.observations + 1,
+            )
+
+    @contextmanager
+    def measure(self, key: Hashable, items: int) -> Iterator[None]:
+        """Record the response of the batch request sent within the block (if it succeeds), as
+        reported to `hook` or `async_hook`."""
+
+        measurement = _Measurement()
+        token = _current_measurement.set(measurement)
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            _current_measurement.reset(token)
+
+        if measurement.response_bytes is not None:
+            latency = measurement.latency
+
+            if latency is None:
+                latency = time.perf_counter() - start
+
+            self.record(key, items, measurement.response_bytes, latency)
+
+    @staticmethod
+    def _observe(response: httpx.Response):
+        measurement = _current_measurement.get()
+
+        if measurement is None or response.is_error:
+            return
+
+        measurement.response_bytes = len(response.content)
+
+        try:
+            measurement.latency = response.elapsed.total_seconds()
+        except RuntimeError:
+            # The response's stream hasn't been closed (e.g. it was built in memory), so the
+            # time the whole block took is used instead.
+            measurement.latency = None
+
+    def hook(self, response: httpx.Response):
+        """Response event hook for `httpx.Client`."""
+
+        response.read()
+        self._observe(response)
+
+    async def async_hook(self, response: httpx.Response):
+        """Response event hook for `httpx.AsyncClient`."""
+
+        await response.aread()
+        self._observe(response)
+
+    def reset(self):
+        """Forget everything observed so far."""
+
+        with self._lock:
+            self._estimates.clear()
+
+
+def chunk_ids(
+    batch_sizer: Optional[BatchSizer],
+    ids: Sequence[str],
+    key: Hashable,
+    max_size: int,
+    in_url: bool = True,
+) -> List[List[str]]:
+    """Split IDs into batches, sized by a batch sizer if there is one, and of `max_size`
+    otherwise."""
+
+    if batch_sizer is None:
+        return [list(chunk) for chunk in batched(ids, n=max_size)]
+
+    return batch_sizer.chunk(ids, key=key, max_size=max_size, in_url=in_url)
+
+
+def measure_batch(
+    batch_sizer: Optional[BatchSizer], key: Hashable, items: int
+) -> ContextManager:
+    """Measure a batch request with a batch sizer, if there is one."""
+
+    if batch_sizer is None:
+        return nullcontext()
+
+    return batch_sizer.measure(key, items)
@@ -0,0 +1,196 @@
+"""Isolating the items that make a batch request fail, by splitting the batch in half."""
+# Standard Modules
+from typing import Any, Awaitable, Callable, List, Sequence, Tuple, TypeVar
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.retry import retries_exhausted
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Failures that may be caused by the contents of a batch, rather than by the server or network:
+# too large a body or URL, or an item the server chokes on.
+SPLITTABLE_STATUS_CODES = frozenset(
+    {
+        httpx.codes.REQUEST_ENTITY_TOO_LARGE,
+        httpx.codes.REQUEST_URI_TOO_LONG,
+        httpx.codes.INTERNAL_SERVER_ERROR,
+        httpx.codes.GATEWAY_TIMEOUT,
+    }
+)
+# Most failing items that bisecting a batch isolates before taking its failure to be the server's.
+DEFAULT_MAX_POISON_ITEMS = 4
+
+
+class PoisonItemsError(Exception):
+    """Raised when some items failed their batch requests even when sent on their own.
+
+    Attributes:
+        results: Results for every other item, in the shape the method returns.
+        poison: Inputs (e.g. IDs or queries) that failed on their own.
+    """
+
+    def __init__(self, results: Any, poison: List[Any]):
+        super().__init__(f"{len(poison)} item(s) failed on their own.")
+        self.results = results
+        self.poison = poison
+
+
+def is_splittable_error(error: BaseException) -> bool:
+    """Whether a batch request's error may go away by sending fewer items at once."""
+
+    return (
+        isinstance(error, httpx.HTTPStatusError)
+        and error.response.status_code in SPLITTABLE_STATUS_CODES
+    )
+
+
+def get_max_requests(items: int, max_poison_items: int) -> int:
+    """Get the most requests that bisecting a failing batch may send: enough to isolate up to
+    `max_poison_items` items, each of which takes a request per level of halving (plus one for its
+    sibling).
+
+    A batch that keeps failing past that (e.g. every item, during an outage) isn't split further.
+    """
+
+    return 2 * max_poison_items * items.bit_length()
+
+
+class _SplitLimitReached(Exception):
+    """Raised once bisecting a batch has sent as many requests as it may."""
+
+
+class _RequestBudget:
+    def __init__(self, requests: int):
+        self.requests = requests
+
+    def spend(self):
+        if self.requests <= 0:
+            raise _SplitLimitReached()
+
+        self.requests -= 1
+
+
+def bisect_batch(
+    func: Callable[[List[T]], R],
+    items: Sequence[T],
+    max_poison_items: int = DEFAULT_MAX_POISON_ITEMS,
+) -> Tuple[List[R], List[T]]:
+    """Apply a function to a batch of items. Whenever it fails with a splittable error (see
+    `is_splittable_error`), apply it to each half of the batch instead, down to single items.
+
+    The halves aren't retried on the status code the whole batch failed with, since its retries
+    (if any) already ran out. If isolating the failing items would take more requests than
+    `get_max_requests` allows, the failure is taken to be the server's rather than the items', and
+    the batch's error is raised.
+
+    Returns:
+        Results of the batches that succeeded, and the items that failed on their own.
+    """
+
+    items = list(items)
+
+    try:
+        return [func(items)], []
+    except httpx.HTTPStatusError as error:
+        if not is_splittable_error(error):
+            raise
+
+        if len(items) <= 1:
+            return [], items
+
+        batch_error = error
+
+    budget = _RequestBudget(get_max_requests(len(items), max_poison_items))
+
+    try:
+        with retries_exhausted(batch_error.response.status_code):
+            return _split(func, items, budget)
+    except _SplitLimitReached:
+        raise batch_error from None
+
+
+def _split(
+    func: Callable[[List[T]], R], items: List[T], budget: _RequestBudget
+) -> Tuple[List[R], List[T]]:
+    middle = len(items) // 2
+    head_results, head_poison = _bisect(func, items[:middle], budget)
+    tail_results, tail_poison = _bisect(func, items[middle:], budget)
+
+    return head_results + tail_results, head_poison + tail_poison
+
+
+def _bisect(
+    func: Callable[[List[T]], R], items: List[T], budget: _RequestBudget
+) -> Tuple[List[R], List[T]]:
+    budget.spend()
+
+    try:
+        return [func(items)], []
+    except httpx.HTTPStatusError as error:
+        if not is_splittable_error(error):
+            raise
+
+        if len(items) <= 1:
+            return [], items
+
+    return _split(func, items, budget)
+
+
+async def bisect_batch_async(
+    func: Callable[[List[T]], Awaitable[R]],
+    items: Sequence[T],
+    max_poison_items: int = DEFAULT_MAX_POISON_ITEMS,
+) -> Tuple[List[R], List[T]]:
+    """Await a coroutine function for a batch of items. See `bisect_batch`."""
+
+    items = list(items)
+
+    try:
+        return [await func(items)], []
+    except httpx.HTTPStatusError as error:
+        if not is_splittable_error(error):
+            raise
+
+        if len(items) <= 1:
+            return [], items
+
+        batch_error = error
+
+    budget = _RequestBudget(get_max_requests(len(items), max_poison_items))
+
+    try:
+        with retries_exhausted(batch_error.response.status_code):
+            return await _split_async(func, items, budget)
+    except _SplitLimitReached:
+        raise batch_error from None
+
+
+async def _split_async(
+    func: Callable[[List[T]], Awaitable[R]], items: List[T], budget: _RequestBudget
+) -> Tuple[List[R], List[T]]:
+    middle = len(items) // 2
+    head_results, head_poison = await _bisect_async(func, items[:middle], budget)
+    tail_results, tail_poison = await _bisect_async(func, items[middle:], budget)
+
+    return head_results + tail_results, head_poison + tail_poison
+
+
+async def _bisect_async(
+    func: Callable[[List[T]], Awaitable[R]], items: List[T], budget: _RequestBudget
+) -> Tuple[List[R], List[T]]:
+    budget.spend()
+
+    try:
+        return [await func(items)], []
+    except httpx.HTTPStatusError as error:
+        if not is_splittable_error(error):
+            raise
+
+        if len(items) <= 1:
+            return [], items
+
+    return await _split_async(func, items, budget)
@@ -0,0 +1,374 @@
+"""Client-side circuit breaking."""
+# Standard Modules
+from collections import deque
+from enum import Enum
+from threading import Lock
+import time
+from typing import Deque, Dict, Iterable, Optional
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.deadline import apply_deadline, get_probe_timeout
+from cofactr.endpoints import (
+    HEALTH_CHECK_TIMEOUT,
+    EndpointFamily,
+    get_endpoint_family,
+)
+
+
+class CircuitState(str, Enum):
+    """State of a circuit."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of sending a request while its endpoint family's circuit is open."""
+
+    def __init__(
+        self, family: EndpointFamily, retry_after: float, request: httpx.Request
+    ):
+        super().__init__(
+            f"Circuit for {family.value} endpoints is open. Retry in {retry_after:.1f}s.",
+            request=request,
+        )
+        self.family = family
+        self.retry_after = retry_after
+
+
+class Circuit:  # pylint: disable=too-many-instance-attributes
+    """Circuit for a single endpoint family.
+
+    Closed: requests are sent, and their outcomes are recorded. Once at least `min_calls` of the
+    last `window_size` outcomes are known and `failure_rate_threshold` of them are failures, the
+    circuit opens.
+
+    Open: requests fail immediately. After `open_duration`, the circuit becomes half-open (or, if
+    probing with health checks, once a health check succeeds).
+
+    Half-open: up to `half_open_max_calls` requests are let through as probes, while others fail
+    immediately. The circuit closes once they all succeed, and opens again if any fails.
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        min_calls: int = 10,
+        window_size: int = 50,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 1,
+        health_check: bool = False,
+    ):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.health_check = health_check
+        self.state = CircuitState.CLOSED
+        self.outcomes: Deque[bool] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._health_check_in_flight = False
+        self._lock = Lock()
+
+    @property
+    def failure_rate(self) -> float:
+        """Fraction of recent outcomes that were failures."""
+
+        with self._lock:
+            outcomes = list(self.outcomes)
+
+        return outcomes.count(False) / len(outcomes) if outcomes else 0.0
+
+    def _transition(self, state: CircuitState):
+        """Move to a new state. Must be called with the lock held."""
+
+        self.state = state
+        self.outcomes.clear()
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+
+        if state is CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+
+    def _remaining_open_time(self) -> float:
+        return max(self._opened_at + self.open_duration - time.monotonic(), 0.0)
+
+    def start_health_check(self) -> bool:
+        """Claim the health check that's due, if any.
+
+        Returns:
+            Whether the caller should run a health check and report it with
+            `finish_health_check`.
+        """
+
+        with self._lock:
+            if (
+                not self.health_check
+                or self.state is not CircuitState.OPEN
+                or self._health_check_in_flight
+                or self._remaining_open_time() > 0
+            ):
+                return False
+
+            self._health_check_in_flight = True
+
+            return True
+
+    def finish_health_check(self, healthy: bool):
+        """Move to half-open after a successful health check, or stay open for another
+        `open_duration`."""
+
+        with self._lock:
+            self._health_check_in_flight = False
+
+            if self.state is CircuitState.OPEN:
+                if healthy:
+                    self._transition(CircuitState.HALF_OPEN)
+                else:
+                    self._opened_at = time.monotonic()
+
+    def acquire(self, family: EndpointFamily, request: httpx.Request) -> bool:
+        """Get permission to send a request.
+
+        Returns:
+            Whether the request is a half-open probe.
+
+        Raises:
+            CircuitOpenError: If the request may not be sent.
+        """
+
+        with self._lock:
+            if self.state is CircuitState.OPEN:
+                remaining = self._remaining_open_time()
+
+                if remaining > 0 or self.health_check:
+                    raise CircuitOpenError(
+                        family=family, retry_after=remaining, request=request
+                    )
+
+                self._transition(CircuitState.HALF_OPEN)
+
+            if self.state is CircuitState.HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    raise CircuitOpenError(
+                        family=family, retry_after=0, request=request
+                    )
+
+                self._half_open_in_flight += 1
+
+                return True
+
+            return False
+
+    def release(self, probe: bool):
+        """Release a request that was abandoned (e.g. cancelled) without an outcome."""
+
+        with self._lock:
+            if self.state is CircuitState.HALF_OPEN and probe:
+                self._half_open_in_flight -= 1
+
+    def record(self, success: bool, probe: bool):
+        """Record the outcome of a request."""
+
+        with self._lock:
+            if self.state is CircuitState.HALF_OPEN and probe:
+                self._half_open_in_flight -= 1
+
+                if not success:
+                    self._transition(CircuitState.OPEN)
+                else:
+                    self._half_open_successes += 1
+
+                    if self._half_open_successes >= self.half_open_max_calls:
+                        self._transition(CircuitState.CLOSED)
+            elif self.state is CircuitState.CLOSED:
+                self.outcomes.append(success)
+                failures = self.outcomes.count(False)
+
+                if (
+                    len(self.outcomes) >= self.min_calls
+                    and failures / len(self.outcomes) >= self.failure_rate_threshold
+                ):
+                    self._transition(CircuitState.OPEN)
+
+
+class CircuitBreaker:
+    """Circuits for each endpoint family, so that a degraded backend fails fast instead of tying
+    up callers with timeouts and retries.
+
+    Requests fail if they raise a transport error (such as a timeout) or get a `5xx` response.
+    Health checks are never broken, since they're used as probes.
+
+    A single instance may be shared by several `GraphAPI` and `AsyncGraphAPI` instances.
+    """
+
+    def __init__(
+        self,
+        families: Optional[Iterable[EndpointFamily]] = None,
+        failure_rate_threshold: float = 0.5,
+        min_calls: int = 10,
+        window_size: int = 50,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 1,
+        health_check: bool = False,
+    ):
+        """
+        Args:
+            families: Endpoint families to break. Defaults to every family but health checks.
+            failure_rate_threshold: Fraction of failed requests at which a circuit opens.
+            min_calls: Number of outcomes to observe before a circuit can open.
+            window_size: Number of recent outcomes the failure rate is computed over.
+            open_duration: Time (in seconds) a circuit stays open before probing.
+            half_open_max_calls: Number of successful probes needed to close a circuit.
+            health_check: Whether to probe with a health check (as in `GraphAPI.check_health`)
+                before letting any requests through an open circuit.
+        """
+
+        if families is None:
+            families = [
+                family
+                for family in EndpointFamily
+                if family is not EndpointFamily.HEALTH
+            ]
+
+        self.circuits: Dict[EndpointFamily, Circuit] = {
+            family: Circuit(
+                failure_rate_threshold=failure_rate_threshold,
+                min_calls=min_calls,
+                window_size=window_size,
+                open_duration=open_duration,
+                half_open_max_calls=half_open_max_calls,
+                health_check=health_check,
+            )
+            for family in families
+            if family is not EndpointFamily.HEALTH
+        }
+
+    def get_circuit(self, request: httpx.Request) -> Optional[Circuit]:
+        """Get the circuit that guards the given request, if any."""
+
+        return self.circuits.get(get_endpoint_family(request.url.path))
+
+    @staticmethod
+    def get_health_check(request: httpx.Request) -> httpx.Request:
+        """Get a health check request for the host the given request is sent to. It times out
+        with the request, or sooner if the current deadline or `HEALTH_CHECK_TIMEOUT` is
+        sooner."""
+
+        return httpx.Request(
+            "GET",
+            request.url.copy_with(path="/", query=None),
+            headers=request.headers,
+            extensions={"timeout": get_probe_timeout(request, HEALTH_CHECK_TIMEOUT)},
+        )
+
+
+class CircuitBreakerTransport(httpx.BaseTransport):
+    """Transport that fails fast while the circuit for a request's endpoint family is open."""
+
+    def __init__(self, transport: httpx.BaseTransport, circuit_breaker: CircuitBreaker):
+        self.transport = transport
+        self.circuit_breaker = circuit_breaker
+
+    def _check_health(self, request: httpx.Request) -> bool:
+        try:
+            response = self.transport.handle_request(
+                CircuitBreaker.get_health_check(request)
+            )
+            response.read()
+            response.close()
+        except httpx.TransportError:
+            return False
+
+        return response.is_success
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        circuit = self.circuit_breaker.get_circuit(request)
+
+        if not circuit:
+            return self.transport.handle_request(request)
+
+        if circuit.start_health_check():
+            circuit.finish_health_check(healthy=self._check_health(request))
+            # Cut the request's timeouts to what's left of the deadline after the health check.
+            apply_deadline(request)
+
+        probe = circuit.acquire(
+            family=get_endpoint_family(request.url.path), request=request
+        )
+
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TransportError:
+            circuit.record(success=False, probe=probe)
+            raise
+        except BaseException:
+            circuit.release(probe=probe)
+            raise
+
+        circuit.record(success=not response.is_server_error, probe=probe)
+
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncCircuitBreakerTransport(httpx.AsyncBaseTransport):
+    """Async transport that fails fast while the circuit for a request's endpoint family is
+    open."""
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, circuit_breaker: CircuitBreaker
+    ):
+        self.transport = transport
+        self.circuit_breaker = circuit_breaker
+
+    async def _check_health(self, request: httpx.Request) -> bool:
+        try:
+            response = await self.transport.handle_async_request(
+                CircuitBreaker.get_health_check(request)
+            )
+            await response.aread()
+            await response.aclose()
+        except httpx.TransportError:
+            return False
+
+        return response.is_success
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        circuit = self.circuit_breaker.get_circuit(request)
+
+        if not circuit:
+            return await self.transport.handle_async_request(request)
+
+        if circuit.start_health_check():
+            circuit.finish_health_check(healthy=await self._check_health(request))
+            # Cut the request's timeouts to what's left of the deadline after the health check.
+            apply_deadline(request)
+
+        probe = circuit.acquire(
+            family=get_endpoint_family(request.url.path), request=request
+        )
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TransportError:
+            circuit.record(success=False, probe=probe)
+            raise
+        except BaseException:
+            circuit.release(probe=probe)
+            raise
+
+        circuit.record(success=not response.is_server_error, probe=probe)
+
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,188 @@
+"""Single-flight coalescing: concurrent identical calls share one in-flight request."""
+# Standard Modules
+import asyncio
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import wraps
+import inspect
+import json
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+# 3rd Party Modules
+import httpx
+
+T = TypeVar("T")
+
+# Arguments that don't change what a call returns, so calls that differ only in them may share.
+_IGNORED_ARGUMENTS = ("self", "timeout")
+
+
+class SingleFlight:
+    """Lets concurrent calls with the same key share the result of whichever started first.
+
+    Only calls that overlap are coalesced: once a call finishes, the next one with its key starts
+    afresh. Its result (or exception) is shared as is, so callers must not mutate it.
+
+    Thread-safe.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = Lock()
+
+    def do(
+        self, key: Hashable, func: Callable[[], T], timeout: Optional[float] = None
+    ) -> T:
+        """Call a function, or wait for the in-flight call with the same key and share its result.
+
+        Args:
+            key: Key of the call. Calls with the same key must return the same result.
+            func: Function to call.
+            timeout: Time (in seconds) to wait for an in-flight call before giving up.
+
+        Raises:
+            httpx.ReadTimeout: If waiting for an in-flight call timed out.
+        """
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+
+            if future is None:
+                self.calls += 1
+                future = self._in_flight[key] = Future()
+            else:
+                self.shared += 1
+
+        if not leader:
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError as error:
+                raise httpx.ReadTimeout(
+                    "Timed out waiting for the in-flight call."
+                ) from error
+
+        try:
+            result = func()
+        except BaseException as error:
+            self._finish(key)
+            future.set_exception(error)
+            raise
+
+        self._finish(key)
+        future.set_result(result)
+
+        return result
+
+    def _finish(self, key: Hashable):
+        with self._lock:
+            del self._in_flight[key]
+
+
+class AsyncSingleFlight:
+    """Lets concurrent coroutines with the same key share the result of whichever started first.
+    See `SingleFlight`.
+
+    The shared call runs as a task, so cancelling one caller doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[T]],
+        timeout: Optional[float] = None,
+    ) -> T:
+        """Await a coroutine function, or the in-flight call with the same key. See
+        `SingleFlight.do`."""
+
+        task = self._in_flight.get(key)
+
+        if task is None:
+            self.calls += 1
+            task = self._in_flight[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+            return await asyncio.shield(task)
+
+        self.shared += 1
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError as error:
+            raise httpx.ReadTimeout(
+                "Timed out waiting for the in-flight call."
+            ) from error
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        # Mark the exception as retrieved, in case every caller was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+
+def get_call_key(func: Callable, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    """Get a key identifying a method call by its name and the arguments that affect its result."""
+
+    arguments = {
+        name: value
+        for name, value in arguments.items()
+        if name not in _IGNORED_ARGUMENTS
+    }
+
+    return func.__name__, json.dumps(arguments, sort_keys=True, default=str)
+
+
+def _get_arguments(func: Callable, *args, **kwargs) -> Dict[str, Any]:
+    """Get every argument of a call by name, defaults included."""
+
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+
+    return bound.arguments
+
+
+def coalesced(func: Callable) -> Callable:
+    """Decorate a `GraphAPI` or `AsyncGraphAPI` method so that, if the instance has a
+    `single_flight`, concurrent identical calls are coalesced into one. Calls that join one in
+    flight wait for it for up to their own `timeout`."""
+
+    if asyncio.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(self, *args, **kwargs) -> Any:
+            if not self.single_flight:
+                return await func(self, *args, **kwargs)
+
+            arguments = _get_arguments(func, self, *args, **kwargs)
+
+            return await self.single_flight.do(
+                get_call_key(func, arguments),
+                lambda: func(self, *args, **kwargs),
+                timeout=arguments.get("timeout"),
+            )
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs) -> Any:
+        if not self.single_flight:
+            return func(self, *args, **kwargs)
+
+        arguments = _get_arguments(func, self, *args, **kwargs)
+
+        return self.single_flight.do(
+            get_call_key(func, arguments),
+            lambda: func(self, *args, **kwargs),
+            timeout=arguments.get("timeout"),
+        )
+
+    return wrapper
@@ -0,0 +1,271 @@
+"""Latency-driven adaptive concurrency limiting."""
+# Standard Modules
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import copy_context
+from math import sqrt
+from threading import Condition
+import time
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class AdaptiveConcurrencyLimit:  # pylint: disable=too-many-instance-attributes
+    """A limit on in-flight requests that adapts to observed latency.
+
+    Uses a gradient algorithm: the limit is scaled by the ratio of long-term to short-term
+    latency, so it shrinks as soon as requests start queueing on the server, and grows by a
+    small headroom (the square root of the limit) while latency stays flat. Failed requests
+    shrink the limit multiplicatively.
+
+    Safe to share between threads and event loops, and between calls, so that what's learned
+    about the server carries over from one batch to the next.
+
+    Example:
+        ```python
+        limit = AdaptiveConcurrencyLimit(max_limit=32)
+        graph.get_products_by_ids(ids=ids, max_concurrency=limit)
+        print(limit.limit)
+        ```
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        smoothing: float = 0.2,
+        tolerance: float = 1.5,
+        long_window: int = 100,
+        backoff_ratio: float = 0.9,
+    ):
+        """
+        Args:
+            initial_limit: Number of requests allowed in flight before any latency is observed.
+            min_limit: Lower bound for the limit.
+            max_limit: Upper bound for the limit.
+            smoothing: Weight given to each new limit estimate.
+            tolerance: How much short-term latency may exceed long-term latency before the limit
+                shrinks.
+            long_window: Number of samples the long-term latency average spans.
+            backoff_ratio: Factor the limit is multiplied by when a request fails.
+        """
+
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Expected 1 <= min_limit <= initial_limit <= max_limit.")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.long_window = long_window
+        self.backoff_ratio = backoff_ratio
+        self.estimated_limit = float(initial_limit)
+        self.long_rtt: Optional[float] = None
+        self.short_rtt: Optional[float] = None
+        self.in_flight = 0
+        self._condition = Condition()
+        self._async_waiters: List[asyncio.Future] = []
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+
+        return int(self.estimated_limit)
+
+    def _try_acquire(self) -> bool:
+        if self.in_flight < self.limit:
+            self.in_flight += 1
+
+            return True
+
+        return False
+
+    def _wake(self):
+        """Wake every waiter so that they retry. Must be called with the lock held."""
+
+        self._condition.notify_all()
+
+        for waiter in self._async_waiters:
+            waiter.get_loop().call_soon_threadsafe(
+                lambda waiter=waiter: waiter.done() or waiter.set_result(None)
+            )
+
+        self._async_waiters.clear()
+
+    def _update(self, rtt: float, dropped: bool):
+        """Update the limit from a latency sample. Must be called with the lock held."""
+
+        if dropped:
+            self.estimated_limit = max(
+                self.min_limit, self.estimated_limit * self.backoff_ratio
+            )
+
+            return
+
+        if self.long_rtt is None or self.short_rtt is None:
+            self.long_rtt = self.short_rtt = rtt
+
+            return
+
+        self.short_rtt = rtt
+        self.long_rtt += (rtt - self.long_rtt) / self.long_window
+
+        # Let the long-term average recover quickly after latency drops.
+        if self.long_rtt / rtt > 2:
+            self.long_rtt *= 0.95
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / rtt))
+        new_limit = self.estimated_limit * gradient + sqrt(self.estimated_limit)
+        new_limit = (
+            self.estimated_limit * (1 - self.smoothing) + new_limit * self.smoothing
+        )
+
+        self.estimated_limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+    def _release(self, rtt: float, dropped: bool):
+        with self._condition:
+            self.in_flight -= 1
+            self._update(rtt=rtt, dropped=dropped)
+            self._wake()
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        """Block until a request may be sent, and record its latency once it completes."""
+
+        with self._condition:
+            self._condition.wait_for(self._try_acquire)
+
+        start = time.monotonic()
+        dropped = True
+
+        try:
+            yield
+            dropped = False
+        finally:
+            self._release(rtt=time.monotonic() - start, dropped=dropped)
+
+    @asynccontextmanager
+    async def acquire_async(self) -> AsyncIterator[None]:
+        """Wait, without blocking the event loop, until a request may be sent, and record its
+        latency once it completes."""
+
+        while True:
+            with self._condition:
+                if self._try_acquire():
+                    break
+
+                waiter = asyncio.get_running_loop().create_future()
+                self._async_waiters.append(waiter)
+
+            await waiter
+
+        start = time.monotonic()
+        dropped = True
+
+        try:
+            yield
+            dropped = False
+        finally:
+            self._release(rtt=time.monotonic() - start, dropped=dropped)
+
+
+def map_concurrently(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_concurrency: Union[int, AdaptiveConcurrencyLimit],
+) -> List[R]:
+    """Apply a function to each item, with at most `max_concurrency` calls in flight.
+
+    If `max_concurrency` is an `AdaptiveConcurrencyLimit`, the number of calls in flight follows
+    its limit, which adapts to the latency of each call.
+
+    Results are returned in the same order as the items.
+    """
+
+    items = list(items)
+
+    if isinstance(max_concurrency, AdaptiveConcurrencyLimit):
+        limit = max_concurrency
+
+        def limited(item: T) -> R:
+            with limit.acquire():
+                return func(item)
+
+        if len(items) <= 1:
+            return [limited(item) for item in items]
+
+        return _map_in_threads(limited, items, max_workers=limit.max_limit)
+
+    if max_concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    return _map_in_threads(func, items, max_workers=max_concurrency)
+
+
+def with_current_context(func: Callable[[T], R]) -> Callable[[T], R]:
+    """Get a function that applies `func` in a copy of the current context, as it is now (so that
+    e.g. the current deadline carries over to another thread). Get one for each call, since a
+    context can't be entered by several threads at once."""
+
+    context = copy_context()
+
+    def call(item: T) -> R:
+        return context.run(func, item)
+
+    return call
+
+
+def _map_in_threads(
+    func: Callable[[T], R], items: List[T], max_workers: int
+) -> List[R]:
+    """Apply a function to each item in a thread pool, in copies of the current context (so that
+    e.g. the current deadline carries over)."""
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(with_current_context(func), item) for item in items]
+
+        return [future.result() for future in futures]
+
+
+async def gather_concurrently(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    max_concurrency: Union[int, AdaptiveConcurrencyLimit],
+) -> List[R]:
+    """Await a coroutine function for each item, with at most `max_concurrency` calls in flight.
+
+    If `max_concurrency` is an `AdaptiveConcurrencyLimit`, the number of calls in flight follows
+    its limit, which adapts to the latency of each call.
+
+    Results are returned in the same order as the items.
+    """
+
+    if isinstance(max_concurrency, AdaptiveConcurrencyLimit):
+        limit = max_concurrency
+
+        async def call(item: T) -> R:
+            async with limit.acquire_async():
+                return await func(item)
+
+    else:
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+
+        async def call(item: T) -> R:
+            async with semaphore:
+                return await func(item)
+
+    return await asyncio.gather(*[call(item) for item in items])
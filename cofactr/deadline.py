@@ -0,0 +1,178 @@
+"""End-to-end deadlines for methods that send many requests."""
+# Standard Modules
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+# 3rd Party Modules
+import httpx
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """Raised instead of sending a request once the deadline it's part of has passed."""
+
+
+class PartialResultsError(Exception):
+    """Raised when a method ran out of time before finishing every request.
+
+    Attributes:
+        results: Results of the requests that finished, in the shape the method returns.
+        unfinished: Inputs (e.g. IDs or queries) whose requests didn't finish.
+    """
+
+    def __init__(self, results: Any, unfinished: List[Any]):
+        super().__init__(
+            f"{len(unfinished)} item(s) didn't finish before the deadline."
+        )
+        self.results = results
+        self.unfinished = unfinished
+
+
+class Deadline:
+    """A point in time by which a group of requests, including retries, has to finish."""
+
+    def __init__(self, budget: float):
+        """
+        Args:
+            budget: Time (in seconds) from now until the deadline.
+        """
+
+        self.expires_at = time.monotonic() + budget
+
+    @property
+    def remaining(self) -> float:
+        """Seconds until the deadline."""
+
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+
+        return time.monotonic() >= self.expires_at
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "cofactr_deadline", default=None
+)
+
+
+def get_current_deadline() -> Optional[Deadline]:
+    """Get the deadline that requests sent from the current context must meet, if any."""
+
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(budget: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Set a deadline for requests sent within the scope.
+
+    Nested scopes can only shorten the deadline. Threads started within the scope only inherit it
+    if they run in a copy of the current context (see `contextvars.copy_context`).
+    """
+
+    current = _current_deadline.get()
+
+    if budget is None:
+        yield current
+
+        return
+
+    deadline = Deadline(budget)
+
+    if current and current.expires_at < deadline.expires_at:
+        deadline = current
+
+    token = _current_deadline.set(deadline)
+
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def apply_deadline(request: httpx.Request):
+    """Request event hook that shortens the request's timeouts to the current deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed.
+    """
+
+    deadline = _current_deadline.get()
+
+    if deadline is None:
+        return
+
+    if deadline.expired:
+        raise DeadlineExceeded("Deadline exceeded.", request=request)
+
+    remaining = deadline.remaining
+    timeout: Dict[str, Optional[float]] = {
+        "connect": None,
+        "read": None,
+        "write": None,
+        "pool": None,
+        **(request.extensions.get("timeout") or {}),
+    }
+
+    request.extensions = {
+        **request.extensions,
+        "timeout": {
+            key: remaining if value is None else min(value, remaining)
+            for key, value in timeout.items()
+        },
+    }
+
+
+def get_probe_timeout(request: httpx.Request, max_timeout: float) -> Dict[str, float]:
+    """Get timeouts for a probe (such as a health check) sent on behalf of a request: the
+    request's own, capped at `max_timeout` and at the time left before the current deadline."""
+
+    deadline = _current_deadline.get()
+
+    if deadline is not None:
+        max_timeout = min(max_timeout, deadline.remaining)
+
+    timeout = request.extensions.get("timeout") or {}
+
+    return {
+        key: max_timeout if timeout.get(key) is None else min(timeout[key], max_timeout)
+        for key in ("connect", "read", "write", "pool")
+    }
+
+
+def check_wait(wait: float, request: httpx.Request):
+    """Check that waiting before sending a request (e.g. for a rate limiter) leaves time to send
+    it before the current deadline. Call `apply_deadline` after the wait, to cut the request's
+    timeouts to the time then remaining.
+
+    Raises:
+        DeadlineExceeded: If the wait would reach the deadline.
+    """
+
+    deadline = _current_deadline.get()
+
+    if deadline is not None and wait >= deadline.remaining:
+        raise DeadlineExceeded(
+            "Deadline would be exceeded before the request could be sent.",
+            request=request,
+        )
+
+
+async def apply_deadline_async(request: httpx.Request):
+    """Request event hook for `httpx.AsyncClient`. See `apply_deadline`."""
+
+    apply_deadline(request)
+
+
+def is_deadline_error(error: BaseException) -> bool:
+    """Whether an error was caused by the current deadline running out."""
+
+    deadline = _current_deadline.get()
+
+    return isinstance(error, DeadlineExceeded) or (
+        isinstance(error, httpx.TimeoutException)
+        and deadline is not None
+        and deadline.expired
+    )
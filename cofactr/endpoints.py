@@ -0,0 +1,40 @@
+"""Graph API endpoint families."""
+# Standard Modules
+from enum import Enum
+
+
+class EndpointFamily(str, Enum):
+    """A group of endpoints that share backend resources."""
+
+    PRODUCTS = "products"
+    BATCH = "batch"
+    ORGS = "orgs"
+    ORDERS = "orders"
+    CLASSES = "classes"
+    HEALTH = "health"
+
+
+# Longest (in seconds) a health check sent as a probe may take, so that probing a backend that
+# doesn't respond can't hang the request it was sent for.
+HEALTH_CHECK_TIMEOUT = 5.0
+
+_PREFIX_TO_FAMILY = {
+    "products": EndpointFamily.PRODUCTS,
+    "actions": EndpointFamily.PRODUCTS,
+    "batch": EndpointFamily.BATCH,
+    "jobs": EndpointFamily.BATCH,
+    "orgs": EndpointFamily.ORGS,
+    "orders": EndpointFamily.ORDERS,
+    "classes": EndpointFamily.CLASSES,
+}
+
+
+def get_endpoint_family(path: str) -> EndpointFamily:
+    """Get the family of the endpoint at the given URL path.
+
+    Example: "/products/CCCQSA3G9SMR/offers" belongs to `EndpointFamily.PRODUCTS`.
+    """
+
+    prefix = path.strip("/").split("/", 1)[0]
+
+    return _PREFIX_TO_FAMILY.get(prefix, EndpointFamily.HEALTH)
@@ -0,0 +1,374 @@
+"""Spreading requests across several API hosts, with latency-based selection and failover."""
+# Standard Modules
+from threading import Lock
+import time
+from typing import List, Optional, Sequence
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.deadline import DeadlineExceeded, apply_deadline, get_probe_timeout
+from cofactr.endpoints import HEALTH_CHECK_TIMEOUT
+
+# Failures that happen before a request reaches the server, so it's safe to send it elsewhere.
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class Endpoint:  # pylint: disable=too-many-instance-attributes
+    """An API host, with its observed latency and health."""
+
+    def __init__(self, url: str):
+        self.url = httpx.URL(url)
+        self.ewma: Optional[float] = None
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until: Optional[float] = None
+        self.probing = False
+
+    def __repr__(self) -> str:
+        return f"Endpoint({str(self.url)!r}, ewma={self.ewma}, ejected={self.ejected})"
+
+    @property
+    def ejected(self) -> bool:
+        """Whether the endpoint has been taken out of rotation."""
+
+        return self.ejected_until is not None
+
+    @property
+    def score(self) -> float:
+        """Expected latency, penalized by the requests already in flight (lower is better).
+
+        Endpoints with no observed latency score 0, so that they're tried first (ties are
+        broken by the requests in flight).
+        """
+
+        return (self.ewma or 0.0) * (self.in_flight + 1)
+
+
+class EndpointPool:
+    """API hosts (e.g. regional caching proxies) to spread requests across.
+
+    Each request goes to the healthy endpoint with the lowest score: an exponentially weighted
+    moving average (EWMA) of latency, scaled by the requests in flight. After `max_failures`
+    consecutive failures (connection errors, timeouts or `5xx` responses), an endpoint is ejected
+    for `ejection_duration` (doubling with each repeated ejection, up to `max_ejection_duration`).
+    It's then probed with a health check (as in `GraphAPI.check_health`) before being let back in.
+
+    If every endpoint is ejected, the one due back soonest is used anyway.
+
+    Thread-safe. A single instance may be shared by several clients.
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        decay: float = 0.3,
+        max_failures: int = 3,
+        ejection_duration: float = 10.0,
+        max_ejection_duration: float = 300.0,
+    ):
+        """
+        Args:
+            urls: Base URLs of the API hosts.
+            decay: Weight given to each new latency in the EWMA.
+            max_failures: Consecutive failures after which an endpoint is ejected.
+            ejection_duration: Time (in seconds) an endpoint is first ejected for.
+            max_ejection_duration: Maximum time (in seconds) an endpoint is ejected for.
+        """
+
+        if not urls:
+            raise ValueError("Expected at least one URL.")
+
+        self.endpoints: List[Endpoint] = [Endpoint(url) for url in urls]
+        self.decay = decay
+        self.max_failures = max_failures
+        self.ejection_duration = ejection_duration
+        self.max_ejection_duration = max_ejection_duration
+        self._lock = Lock()
+
+    @property
+    def primary(self) -> Endpoint:
+        """Endpoint that requests are addressed to before being routed."""
+
+        return self.endpoints[0]
+
+    def select(self, exclude: Sequence[Endpoint] = ()) -> Endpoint:
+        """Pick an endpoint for a request and count it as in flight.
+
+        If an ejected endpoint is due back, it's returned with `probing` set, in which case the
+        caller must health check it and report the result with `finish_probe` before sending.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                endpoint for endpoint in self.endpoints if endpoint not in exclude
+            ] or self.endpoints
+
+            for endpoint in candidates:
+                if (
+                    endpoint.ejected_until is not None
+                    and not endpoint.probing
+                    and endpoint.ejected_until <= now
+                ):
+                    endpoint.probing = True
+                    endpoint.in_flight += 1
+
+                    return endpoint
+
+            healthy = [endpoint for endpoint in candidates if not endpoint.ejected]
+
+            if healthy:
+                endpoint = min(
+                    healthy, key=lambda endpoint: (endpoint.score, endpoint.in_flight)
+                )
+            else:
+                endpoint = min(
+                    candidates, key=lambda endpoint: endpoint.ejected_until or 0.0
+                )
+
+            endpoint.in_flight += 1
+
+            return endpoint
+
+    def finish_probe(self, endpoint: Endpoint, healthy: bool):
+        """Let an ejected endpoint back in after a successful health check, or eject it again."""
+
+        with self._lock:
+            endpoint.probing = False
+
+            if healthy:
+                endpoint.ejected_until = None
+                endpoint.consecutive_failures = 0
+                endpoint.ewma = None
+            else:
+                self._eject(endpoint)
+
+    def _eject(self, endpoint: Endpoint):
+        """Take an endpoint out of rotation. Must be called with the lock held."""
+
+        duration = min(
+            self.ejection_duration * 2**endpoint.ejections, self.max_ejection_duration
+        )
+        endpoint.ejections += 1
+        endpoint.ejected_until = time.monotonic() + duration
+
+    def record(self, endpoint: Endpoint, latency: float, success: bool):
+        """Record the outcome of a request sent to an endpoint."""
+
+        with self._lock:
+            endpoint.in_flight -= 1
+
+            if success:
+                endpoint.consecutive_failures = 0
+                endpoint.ejections = 0
+                endpoint.ewma = (
+                    latency
+                    if endpoint.ewma is None
+                    else self.decay * latency + (1 - self.decay) * endpoint.ewma
+                )
+
+                return
+
+            endpoint.consecutive_failures += 1
+
+            if (
+                endpoint.consecutive_failures >= self.max_failures
+                and not endpoint.ejected
+            ):
+                self._eject(endpoint)
+
+    def release(self, endpoint: Endpoint):
+        """Release an endpoint whose request was abandoned (e.g. cancelled) without an outcome."""
+
+        with self._lock:
+            endpoint.in_flight -= 1
+
+    def route(self, request: httpx.Request, url: httpx.URL, endpoint: Endpoint):
+        """Point a request, originally addressed to the given URL on the primary endpoint, at an
+        endpoint."""
+
+        base_path = self.primary.url.raw_path.rstrip(b"/")
+        path = url.raw_path
+
+        if base_path and path.startswith(base_path):
+            path = path[len(base_path) :]
+
+        request.url = endpoint.url.copy_with(
+            raw_path=endpoint.url.raw_path.rstrip(b"/") + path
+        )
+        request.headers["Host"] = request.url.netloc.decode("ascii")
+
+    @staticmethod
+    def get_health_check(endpoint: Endpoint, request: httpx.Request) -> httpx.Request:
+        """Get a health check request for an endpoint, sent before the given request. It times
+        out with the request, or sooner if the current deadline or `HEALTH_CHECK_TIMEOUT` is
+        sooner."""
+
+        return httpx.Request(
+            "GET",
+            endpoint.url,
+            headers={
+                key: value
+                for key, value in request.headers.items()
+                if key.lower()
+                not in ("host", "content-length", "content-type", "content-encoding")
+            },
+            extensions={"timeout": get_probe_timeout(request, HEALTH_CHECK_TIMEOUT)},
+        )
+
+
+class FailoverTransport(httpx.BaseTransport):
+    """Transport that routes each request to the best endpoint in a pool.
+
+    Requests that fail to connect are sent to another endpoint right away.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, endpoint_pool: EndpointPool):
+        self.transport = transport
+        self.endpoint_pool = endpoint_pool
+
+    def _check_health(self, endpoint: Endpoint, request: httpx.Request) -> bool:
+        try:
+            response = self.transport.handle_request(
+                EndpointPool.get_health_check(endpoint, request)
+            )
+            response.read()
+            response.close()
+        except httpx.TransportError:
+            return False
+
+        return response.is_success
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        pool = self.endpoint_pool
+        url = request.url
+        tried: List[Endpoint] = []
+
+        while True:
+            endpoint = pool.select(exclude=tried)
+            tried.append(endpoint)
+
+            if endpoint.probing:
+                healthy = self._check_health(endpoint, request)
+                pool.finish_probe(endpoint, healthy)
+
+                if not healthy:
+                    pool.release(endpoint)
+                    continue
+
+            # Health checks and attempts at other endpoints take time: cut the request's timeouts
+            # to what's left of the deadline.
+            try:
+                apply_deadline(request)
+            except DeadlineExceeded:
+                pool.release(endpoint)
+                raise
+
+            pool.route(request, url=url, endpoint=endpoint)
+            start = time.monotonic()
+
+            try:
+                response = self.transport.handle_request(request)
+            except _CONNECT_ERRORS:
+                pool.record(endpoint, time.monotonic() - start, success=False)
+
+                if len(tried) < len(pool.endpoints):
+                    continue
+
+                raise
+            except httpx.TransportError:
+                pool.record(endpoint, time.monotonic() - start, success=False)
+                raise
+            except BaseException:
+                pool.release(endpoint)
+                raise
+
+            pool.record(
+                endpoint, time.monotonic() - start, success=not response.is_server_error
+            )
+
+            return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncFailoverTransport(httpx.AsyncBaseTransport):
+    """Async transport that routes each request to the best endpoint in a pool.
+
+    Requests that fail to connect are sent to another endpoint right away.
+    """
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, endpoint_pool: EndpointPool
+    ):
+        self.transport = transport
+        self.endpoint_pool = endpoint_pool
+
+    async def _check_health(self, endpoint: Endpoint, request: httpx.Request) -> bool:
+        try:
+            response = await self.transport.handle_async_request(
+                EndpointPool.get_health_check(endpoint, request)
+            )
+            await response.aread()
+            await response.aclose()
+        except httpx.TransportError:
+            return False
+
+        return response.is_success
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        pool = self.endpoint_pool
+        url = request.url
+        tried: List[Endpoint] = []
+
+        while True:
+            endpoint = pool.select(exclude=tried)
+            tried.append(endpoint)
+
+            if endpoint.probing:
+                healthy = await self._check_health(endpoint, request)
+                pool.finish_probe(endpoint, healthy)
+
+                if not healthy:
+                    pool.release(endpoint)
+                    continue
+
+            # Health checks and attempts at other endpoints take time: cut the request's timeouts
+            # to what's left of the deadline.
+            try:
+                apply_deadline(request)
+            except DeadlineExceeded:
+                pool.release(endpoint)
+                raise
+
+            pool.route(request, url=url, endpoint=endpoint)
+            start = time.monotonic()
+
+            try:
+                response = await self.transport.handle_async_request(request)
+            except _CONNECT_ERRORS:
+                pool.record(endpoint, time.monotonic() - start, success=False)
+
+                if len(tried) < len(pool.endpoints):
+                    continue
+
+                raise
+            except httpx.TransportError:
+                pool.record(endpoint, time.monotonic() - start, success=False)
+                raise
+            except BaseException:
+                pool.release(endpoint)
+                raise
+
+            pool.record(
+                endpoint, time.monotonic() - start, success=not response.is_server_error
+            )
+
+            return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -2,23 +2,31 @@
 # pylint: disable=too-many-arguments
 # pylint: disable=too-many-locals
 # Python Modules
-from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
-from typing import Any, Dict, List, Literal, NamedTuple, Optional, Union
-from urllib.parse import quote, urlencode
+from threading import Lock, Thread
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 # 3rd Party Modules
 import httpx
 from more_itertools import batched, flatten
-from tenacity import (
-    retry,
-    retry_any,
-    retry_if_exception_message,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_chain,
-    wait_fixed,
-)
+from tenacity import RetryCallState, retry
 
 # Local Modules
 from cofactr.schema import (
@@ -33,52 +41,165 @@ from cofactr.schema import (
     schema_to_product,
     schema_to_supplier,
 )
+from cofactr.aliases import AliasMap
+from cofactr.batch_sizing import BatchSizer, chunk_ids, measure_batch
+from cofactr.bisection import bisect_batch
+from cofactr.circuit_breaker import CircuitBreaker, CircuitBreakerTransport
+from cofactr.coalescing import SingleFlight, coalesced
+from cofactr.concurrency import (
+    AdaptiveConcurrencyLimit,
+    R,
+    T,
+    map_concurrently,
+    with_current_context,
+)
+from cofactr.deadline import apply_deadline, deadline_scope, is_deadline_error
+from cofactr.failover import EndpointPool, FailoverTransport
+from cofactr.hedging import HedgePolicy
+from cofactr.helpers import drop_none_values
+from cofactr.jobs import (
+    DEFAULT_POLLING_POLICY,
+    JobResult,
+    JobSchedule,
+    PollingPolicy,
+    get_job_products,
+    is_job_finished,
+)
+from cofactr.keepalive import KeepAlive, get_warmup_extensions
+from cofactr.loader import BatchLoader
+from cofactr.lookups import (
+    MAX_BATCH_SIZE,
+    IdLookup,
+    IdLookupMethod,
+    SearchStrategy,
+    add_required_fields,
+    get_fetch_key,
+    get_id_filter,
+    get_id_lookup_batch,
+    get_id_to_requested_ids,
+    get_job_id,
+    get_job_sub_batch_size,
+    get_query_params,
+    get_request_params,
+    get_search_batch,
+    get_search_results,
+    match_products,
+    merge_by_ids,
+    merge_canonical_ids,
+    merge_search_results,
+    parse_products,
+    parse_products_response,
+    plan_fetch,
+    raise_incomplete,
+    resolve_schema,
+)
+from cofactr.planner import FetchPlan, FetchPlanner, FetchStrategy, get_freshness
+from cofactr.rate_limit import RateLimitedTransport, RateLimiter
+from cofactr.retry import (
+    DEFAULT_RETRY_POLICY,
+    RetryPolicy,
+    retry_by_policy,
+    retry_non_idempotent_by_policy,
+    stop_by_policy,
+    wait_by_policy,
+)
 from cofactr.schema.types import Completion, OrderInV0, PartInV0, PartialPartInV0
+from cofactr.transfer import ACCEPT_ENCODING, TransferStats, encode_json_body
+
+if TYPE_CHECKING:
+    from cofactr.batch import Batch
 
 Protocol = Literal["http", "https"]
 
-_MAX_BATCH_SIZE = 250
-_MAX_SUB_BATCH_SIZE = 25
-_REQUIRED_FIELDS = ["id", "deprecated_ids"]
+BATCH_LIMIT = 500
+
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=100, max_keepalive_connections=20, keepalive_expiry=30
+)
 
+_default_client: Optional[httpx.Client] = None
+_default_client_lock = Lock()
 
-class SearchStrategy(str, Enum):
-    """Search strategy."""
 
-    DEFAULT = "default"
-    MPN_SKU_MFR = "mpn_sku_mfr"
+def _get_default_client() -> httpx.Client:
+    """Get the process-wide pooled client used by the module-level request helpers."""
 
+    global _default_client  # pylint: disable=global-statement
 
-drop_none_values = lambda d: {k: v for k, v in d.items() if v is not None}
+    with _default_client_lock:
+        if _default_client is None or _default_client.is_closed:
+            _default_client = httpx.Client(
+                limits=DEFAULT_LIMITS, headers={"Accept-Encoding": ACCEPT_ENCODING}
+            )
 
-BATCH_LIMIT = 500
+        return _default_client
+
+
+def _build_transport(
+    transport: Optional[httpx.BaseTransport],
+    limits: Optional[httpx.Limits],
+    rate_limiter: Optional[RateLimiter],
+    circuit_breaker: Optional[CircuitBreaker],
+    endpoint_pool: Optional[EndpointPool],
+) -> httpx.BaseTransport:
+    """Build the transport stack for a pooled client."""
+
+    transport = transport or httpx.HTTPTransport(limits=limits or DEFAULT_LIMITS)
+
+    if endpoint_pool:
+        transport = FailoverTransport(transport, endpoint_pool)
+
+    if rate_limiter:
+        transport = RateLimitedTransport(transport, rate_limiter)
+
+    if circuit_breaker:
+        transport = CircuitBreakerTransport(transport, circuit_breaker)
+
+    return transport
 
 
 class RetrySettings(NamedTuple):
     """Retry settings for GraphAPI methods.
-    TODO: Consider extending to other 5xx errors if and when encountered.
+
+    By default, each decision is deferred to the `retry_policy` of the GraphAPI instance whose
+    method is being retried (see `RetryPolicy`).
     """
 
     reraise: bool = True
-    retry: retry_any = (
-        retry_if_exception_type(httpx.ConnectTimeout)
-        | retry_if_exception_type(httpx.ReadTimeout)
-        | retry_if_exception_message(match=r"Server error '502 Bad Gateway'")
-    )
-    stop: stop_after_attempt = stop_after_attempt(3)
-    wait: wait_chain = wait_chain(*[wait_fixed(wait=wait) for wait in [1, 3, 5]])
-
-
-def _get_ids_from_dict(entity):
-    """Get IDs from dictionary."""
+    retry: Callable[[RetryCallState], bool] = retry_by_policy
+    stop: Callable[[RetryCallState], bool] = stop_by_policy
+    wait: Callable[[RetryCallState], float] = wait_by_policy
+
+
+def _map_until_deadline(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_concurrency: Union[int, AdaptiveConcurrencyLimit],
+    deadline: Optional[float],
+) -> Tuple[List[R], List[T]]:
+    """Apply a function to each item, like `map_concurrently`, within a deadline.
+
+    Returns:
+        Results of the calls that finished, and the items whose calls didn't finish before the
+        deadline.
+    """
 
-    return [entity["id"], *(entity.get("deprecated_ids") or [])]
+    def attempt(item: T) -> Tuple[bool, Any]:
+        try:
+            return True, func(item)
+        except httpx.TimeoutException as error:
+            if not is_deadline_error(error):
+                raise
 
+            return False, item
 
-def _get_ids_from_class(entity):
-    """Get IDs from class."""
+    with deadline_scope(deadline):
+        outcomes = map_concurrently(attempt, items, max_concurrency=max_concurrency)
 
-    return [entity.id, *(getattr(entity, "deprecated_ids", None) or [])]
+    return (
+        [value for finished, value in outcomes if finished],
+        [value for finished, value in outcomes if not finished],
+    )
 
 
 def get_products(
@@ -100,12 +221,14 @@ def get_products(
     owner_id: Optional[str] = None,
     reference: Optional[str] = None,
     options: Optional[Dict] = None,
+    client: Optional[httpx.Client] = None,
 ) -> httpx.Response:
     """Get products."""
 
     options = options or {}
+    client = client or _get_default_client()
 
-    res = httpx.get(
+    res = client.get(
         f"{url}/products/",
         headers=drop_none_values(
             {
@@ -152,10 +275,13 @@ def get_orgs(
     timeout,
     filtering,
     owner_id,
+    client: Optional[httpx.Client] = None,
 ) -> httpx.Response:
     """Get orgs."""
 
-    res = httpx.get(
+    client = client or _get_default_client()
+
+    res = client.get(
         f"{url}/orgs",
         headers=drop_none_values(
             {
@@ -195,10 +321,13 @@ def get_suppliers(
     timeout,
     filtering,
     owner_id,
+    client: Optional[httpx.Client] = None,
 ) -> httpx.Response:
     """Get orgs."""
 
-    res = httpx.get(
+    client = client or _get_default_client()
+
+    res = client.get(
         f"{url}/orgs/suppliers",
         headers=drop_none_values(
             {
@@ -232,6 +361,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
     PROTOCOL: Protocol = "https"
     HOST = "graph.cofactr.com"
     retry_settings = RetrySettings()
+    non_idempotent_retry_settings = RetrySettings(retry=retry_non_idempotent_by_policy)
 
     def __init__(
         self,
@@ -248,8 +378,87 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         ] = SupplierSchemaName.FLAGSHIP,
         client_id: Optional[str] = None,
         api_key: Optional[str] = None,
+        limits: Optional[httpx.Limits] = None,
+        client: Optional[httpx.Client] = None,
+        request_compression_threshold: Optional[int] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+        hedge_policy: Optional[HedgePolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        urls: Optional[List[str]] = None,
+        prewarm: int = 0,
+        keepalive_interval: Optional[float] = None,
+        coalesce_requests: bool = False,
+        batch_window: float = 0.005,
+        alias_map: Optional[AliasMap] = None,
+        batch_sizer: Optional[BatchSizer] = None,
+        id_lookup_method: IdLookupMethod = IdLookupMethod.FILTER,
+        fetch_planner: Optional[FetchPlanner] = None,
     ):
-        self.url = f"{protocol}://{host}"
+        """
+        Args:
+            limits: Connection pool limits for the underlying HTTP client. Ignored if `client` is
+                given.
+            client: HTTP client to send requests through. If not given, a pooled client is created
+                and owned by this instance. A client that is passed in is not closed by `close`,
+                and its event hooks are left as is: its responses aren't recorded in
+                `transfer_stats` or by `batch_sizer`, its requests aren't counted by the retry
+                budget, and their timeouts aren't cut to a `deadline`. Can't be combined with
+                `transport`, `rate_limiter`, `circuit_breaker` or `urls`.
+            request_compression_threshold: If given, large JSON request bodies (batch searches,
+                batch jobs and custom ID mappings) of at least this many bytes are sent
+                gzip-compressed, with `Content-Encoding: gzip`.
+            transport: Transport for the pooled client to send requests with. Defaults to an HTTP
+                transport configured by `limits`.
+            rate_limiter: Limits the rate of requests to each endpoint family, adapting to `429`
+                responses. May be shared between instances that use the same API key.
+            retry_policy: Which failures to retry and how long to wait between attempts. Retries
+                are capped by the policy's retry budget, if it has one.
+            hedge_policy: If given, `get_product`, `get_org`, `get_supplier` and `get_offers` send
+                a duplicate request when the first is slower than usual, and use whichever response
+                arrives first. The policy's threads are shut down by `close`.
+            circuit_breaker: Fails requests to an endpoint family immediately while its backend is
+                failing, instead of waiting for timeouts. May be shared between instances.
+            urls: Base URLs of several API hosts (e.g. regional caching proxies) to spread requests
+                across, picking by observed latency and ejecting hosts that fail. Overrides
+                `protocol` and `host`. See `EndpointPool`.
+            prewarm: Number of pooled connections to open ahead of time, in the background (see
+                `warmup`).
+            keepalive_interval: If given, every this many seconds, `max(prewarm, 1)` health
+                checks are sent in the background so that idle pooled connections aren't
+                closed between bursts of requests. Should be shorter than the pool's
+                `keepalive_expiry`.
+            coalesce_requests: Whether concurrent identical calls to `get_product`,
+                `get_offers`, `get_org` and `get_supplier` (same arguments, apart from
+                `timeout`) share a single in-flight request and its parsed result, which callers
+                must then not mutate. Calls that join one in flight wait for it for up to their
+                own `timeout`.
+            batch_window: Time (in seconds) that `load_product`, `load_org` and
+                `load_supplier` collect lookups for before sending them as a batch.
+            alias_map: Maps deprecated product IDs to canonical IDs, learned from every product
+                response. Used to skip duplicate and known-deprecated IDs in
+                `get_products_by_ids`, and to answer `get_canonical_product_ids` for known IDs
+                without a request. Defaults to an in-memory map. Pass an `AliasMap` with a
+                `path` to keep it across processes: it's saved on `close`. May be
+                shared between instances.
+            batch_sizer: If given, sizes the batches of `get_products_by_ids`,
+                `get_canonical_product_ids` and `get_suppliers_by_ids` (and the sub-requests of
+                `create_get_products_by_ids_job`) from the response sizes and latencies it
+                observes per schema, instead of always sending 250 IDs. May be shared between
+                instances.
+            id_lookup_method: How `get_products_by_ids` and `get_canonical_product_ids` send IDs
+                by default. See `IdLookupMethod`.
+            fetch_planner: Picks between inline batches and jobs for `fetch_products`, from the
+                latencies it records. Defaults to a `FetchPlanner` with default settings. May be
+                shared between instances.
+
+        Compressed and decompressed response sizes of the pooled client are recorded in
+        `transfer_stats`.
+        """
+
+        self.endpoint_pool = EndpointPool(urls) if urls else None
+        self.url = urls[0].rstrip("/") if urls else f"{protocol}://{host}"
         self.default_product_schema = default_product_schema
         self.default_order_schema = default_order_schema
         self.default_org_schema = default_org_schema
@@ -257,16 +466,151 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         self.default_supplier_schema = default_supplier_schema
         self.client_id = client_id
         self.api_key = api_key
+        self.request_compression_threshold = request_compression_threshold
+
+        if client and (transport or rate_limiter or circuit_breaker or urls):
+            raise ValueError(
+                "A custom client can't be combined with a transport, rate limiter, circuit "
+                "breaker or several URLs."
+            )
+
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.retry_policy = retry_policy
+        self.hedge_policy = hedge_policy
+        self.alias_map = alias_map if alias_map is not None else AliasMap()
+        self.batch_sizer = batch_sizer
+        self.id_lookup_method = id_lookup_method
+        self.fetch_planner = (
+            fetch_planner if fetch_planner is not None else FetchPlanner()
+        )
+        self.single_flight = SingleFlight() if coalesce_requests else None
+        self.product_loader = BatchLoader(
+            self.get_products_by_ids,
+            window=batch_window,
+            max_batch_size=MAX_BATCH_SIZE,
+        )
+        self.org_loader = BatchLoader(
+            self.get_orgs_by_ids, window=batch_window, max_batch_size=MAX_BATCH_SIZE
+        )
+        self.supplier_loader = BatchLoader(
+            self.get_suppliers_by_ids,
+            window=batch_window,
+            max_batch_size=MAX_BATCH_SIZE,
+        )
+        self._owns_client = client is None
+        self.client = client or httpx.Client(
+            transport=_build_transport(
+                transport=transport,
+                limits=limits,
+                rate_limiter=rate_limiter,
+                circuit_breaker=circuit_breaker,
+                endpoint_pool=self.endpoint_pool,
+            ),
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+        )
+        self.transfer_stats = TransferStats()
+
+        # A client that's passed in is left as is, since it may be shared with other code.
+        if self._owns_client:
+            self.client.event_hooks["response"].append(self.transfer_stats.hook)
+
+            if batch_sizer:
+                self.client.event_hooks["response"].append(batch_sizer.hook)
+
+            self.client.event_hooks["request"].append(apply_deadline)
+
+            if retry_policy.budget:
+                self.client.event_hooks["request"].append(retry_policy.budget.hook)
+
+        self.keepalive = (
+            KeepAlive(
+                lambda: self.warmup(connections=max(prewarm, 1)),
+                interval=keepalive_interval,
+            )
+            if keepalive_interval
+            else None
+        )
+        self._warmup_thread: Optional[Thread] = None
+
+        if prewarm:
+            self._warmup_thread = Thread(
+                target=self.warmup,
+                kwargs={"connections": prewarm},
+                name="cofactr-warmup",
+                daemon=True,
+            )
+            self._warmup_thread.start()
+
+        if self.keepalive:
+            self.keepalive.start()
+
+    def close(self):
+        """Stop background pings and hedging threads, and close the underlying HTTP client,
+        releasing its pooled connections."""
+
+        if self.keepalive:
+            self.keepalive.stop()
+
+        if self._warmup_thread:
+            self._warmup_thread.join()
+
+        self.alias_map.save()
+
+        if self.hedge_policy:
+            self.hedge_policy.close()
+
+        if self._owns_client:
+            self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_entity(self, url: str, **kwargs) -> httpx.Response:
+        """Get a single entity, hedging the request if a hedge policy is set."""
+
+        if not self.hedge_policy:
+            return self.client.get(url, **kwargs)
+
+        return self.hedge_policy.send(lambda: self.client.get(url, **kwargs))
 
     def check_health(self):
         """Check the operational status of the service."""
 
-        res = httpx.get(self.url)
+        res = self.client.get(self.url)
 
         res.raise_for_status()
 
         return res.json()
 
+    def warmup(self, connections: int = 4) -> int:
+        """Open pooled connections ahead of time by sending concurrent health checks, so
+        that later requests skip DNS lookups and TCP and TLS handshakes.
+
+        Args:
+            connections: Number of health checks to send at once. Each opens a connection (up to
+                the pool's limits).
+
+        Returns:
+            Number of health checks that succeeded.
+        """
+
+        def ping(_: int) -> bool:
+            try:
+                res = self.client.get(self.url, extensions=get_warmup_extensions())
+                res.raise_for_status()
+            except httpx.HTTPError:
+                return False
+
+            return True
+
+        return sum(
+            map_concurrently(ping, range(connections), max_concurrency=connections)
+        )
+
     @retry(
         reraise=retry_settings.reraise,
         retry=retry_settings.retry,
@@ -317,22 +661,10 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             options: Extra configuration options.
         """
 
-        if not schema:
-            schema = self.default_product_schema
-
-        schema_class: Optional[ProductSchemaName] = (
-            schema if isinstance(schema, ProductSchemaName) else None
+        schema_class, schema_value = resolve_schema(
+            schema or self.default_product_schema, ProductSchemaName, fields
         )
 
-        if (schema_class and fields) and (
-            schema_class is not ProductSchemaName.INTERNAL
-        ):
-            raise ValueError(
-                "Field expansion is not supported for the targeted schema."
-            )
-
-        schema_value = schema_class.value if schema_class else schema
-
         res = get_products(
             url=self.url,
             client_id=self.client_id,
@@ -352,28 +684,11 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             owner_id=owner_id,
             reference=reference,
             options=options,
+            client=self.client,
         )
 
-        extracted_products = res.json()
-        res_data = extracted_products and extracted_products.get("data")
-
-        if res_data and schema_class:
-            # Handle schemas that have parsers.
-            Product = schema_to_product.get(  # pylint: disable=invalid-name
-                schema_class
-            )
-
-            if Product:
-                extracted_products["data"] = [Product(**data) for data in res_data]
-
-        return extracted_products
+        return parse_products_response(res.json(), schema_class, self.alias_map)
 
-    @retry(
-        reraise=retry_settings.reraise,
-        retry=retry_settings.retry,
-        stop=retry_settings.stop,
-        wait=retry_settings.wait,
-    )
     def get_products_by_searches(
         self,
         queries: List[str],
@@ -387,6 +702,9 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         reference: Optional[str] = None,
         options: Optional[Dict] = None,
         fields: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+        split_on_failure: bool = False,
     ):
         """Search for products associated with each query.
 
@@ -407,6 +725,17 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             fields: Used to filter properties that the response should contain. A field can be a
                 concrete property like "mpn" or an abstract group of properties like "assembly".
                 Example: `"id,aliases,labels,statements{spec,assembly},offers"`.
+            max_concurrency: Maximum number of batch requests to have in flight at once, or an
+                `AdaptiveConcurrencyLimit` that adapts it to observed latency.
+            deadline: Time (in seconds) to finish every request in, including retries. Each
+                request's timeout is cut to the time remaining. If time runs out,
+                `PartialResultsError` is raised with the results that did finish.
+            split_on_failure: Whether to split a batch request that fails with a 413, 414, 500
+                or 504 response in half, and send each half, until the queries that fail on
+                their own are isolated. If any are, `PoisonItemsError` is raised with every
+                other query's results. If `deadline` runs out too, `PartialResultsError` is raised
+                instead, and the failing queries are listed as unfinished. A batch that keeps
+                failing however it's split (e.g. during an outage) raises its error instead.
 
         Returns:
             A dictionary mapping each MPN to a list of matching products.
@@ -415,93 +744,128 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         if not queries:
             return {}
 
-        if not schema:
-            schema = self.default_product_schema
-
-        schema_class: Optional[ProductSchemaName] = (
-            schema if isinstance(schema, ProductSchemaName) else None
+        schema_class, schema_value = resolve_schema(
+            schema or self.default_product_schema, ProductSchemaName, fields
+        )
+        query_params = get_query_params(
+            schema_value,
+            external=external,
+            force_refresh=force_refresh,
+            stale_delta=stale_delta,
+            fields=fields,
+            search_strategy=search_strategy,
         )
 
-        if (schema_class and fields) and (
-            schema_class is not ProductSchemaName.INTERNAL
-        ):
-            raise ValueError(
-                "Field expansion is not supported for the targeted schema."
+        @retry(
+            reraise=True,
+            retry=self.retry_policy.retry,
+            stop=self.retry_policy.stop,
+            wait=self.retry_policy.wait,
+        )
+        def search_batch(query_batch: Sequence[str]) -> Dict[str, Any]:
+            res = self.client.post(
+                f"{self.url}/batch/products/",
+                **encode_json_body(
+                    get_search_batch(query_batch, query_params),
+                    headers=drop_none_values(
+                        {"X-CLIENT-ID": self.client_id, "X-API-KEY": self.api_key}
+                    ),
+                    compression_threshold=self.request_compression_threshold,
+                ),
+                params=get_request_params(owner_id, reference, options),
+                timeout=timeout,
+                follow_redirects=True,
             )
 
-        schema_value = schema_class.value if schema_class else schema
+            res.raise_for_status()
 
-        options = options or {}
+            return get_search_results(query_batch, res, schema_class, self.alias_map)
 
-        invariant_query_params = drop_none_values(
-            {
-                "schema": schema_value,
-                "external": bool(external),
-                "force_refresh": force_refresh,
-                "stale_delta": stale_delta,
-                "fields": fields,
-                "search_strategy": search_strategy.value,
-            }
+        def search_batches(
+            query_batch: Sequence[str],
+        ) -> Tuple[List[Dict[str, Any]], List[str]]:
+            if split_on_failure:
+                return bisect_batch(search_batch, query_batch)
+
+            return [search_batch(query_batch)], []
+
+        outcomes, unfinished_batches = _map_until_deadline(
+            search_batches,
+            batched(queries, n=MAX_BATCH_SIZE),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
         )
 
-        query_to_products: Dict[str, Any] = {}
+        return merge_search_results(outcomes, unfinished_batches)
 
-        for query_batch in batched(queries, n=_MAX_BATCH_SIZE):
-            res = httpx.post(
+    def _post_id_lookups(
+        self,
+        lookup: IdLookup,
+        ids: List[str],
+        timeout: Optional[int],
+        owner_id: Optional[str],
+        reference: Optional[str],
+        options: Optional[Dict],
+    ) -> Dict[str, Any]:
+        """Look up products by ID through `/batch/products/`, with up to 25 IDs per sub-request."""
+
+        @retry(
+            reraise=True,
+            retry=self.retry_policy.retry,
+            stop=self.retry_policy.stop,
+            wait=self.retry_policy.wait,
+        )
+        def post() -> Dict[str, Any]:
+            res = self.client.post(
                 f"{self.url}/batch/products/",
-                headers=drop_none_values(
-                    {
-                        "X-CLIENT-ID": self.client_id,
-                        "X-API-KEY": self.api_key,
-                    }
-                ),
-                json={
-                    "batch": [
-                        {
-                            "method": "GET",
-                            "relative_url": (
-                                f"?q={quote(query)}&{urlencode(invariant_query_params)}"
-                            ),
-                        }
-                        for query in query_batch
-                    ]
-                },
-                params=drop_none_values(
-                    {"owner_id": owner_id, "ref": reference, **options}
+                **encode_json_body(
+                    lookup.get_batch(ids),
+                    headers=drop_none_values(
+                        {"X-CLIENT-ID": self.client_id, "X-API-KEY": self.api_key}
+                    ),
+                    compression_threshold=self.request_compression_threshold,
                 ),
+                params=get_request_params(owner_id, reference, options),
                 timeout=timeout,
                 follow_redirects=True,
             )
 
             res.raise_for_status()
 
-            responses = res.json()
-
-            if isinstance(responses, list):
-                for query, response in zip(query_batch, responses):
-                    matches = []
-
-                    if response["code"] == 200:
-                        matches = response["body"]["data"]
+            return lookup.parse_batch(res)
 
-                    query_to_products[query] = matches
+        return post()
 
-        if schema_class:
-            Product = schema_to_product[schema_class]  # pylint: disable=invalid-name
-
-            for query, products in query_to_products.items():
-                query_to_products[query] = [
-                    Product(**product_data) for product_data in products
-                ]
-
-        return query_to_products
+    def _send_id_lookup(
+        self,
+        lookup: IdLookup,
+        ids: List[str],
+        timeout: Optional[int],
+        owner_id: Optional[str],
+        reference: Optional[str],
+        options: Optional[Dict],
+    ) -> Dict[str, Any]:
+        """Look up a batch of products by ID, by the lookup's method."""
+
+        with measure_batch(self.batch_sizer, lookup.batch_key, len(ids)):
+            if lookup.method is IdLookupMethod.BATCH:
+                return self._post_id_lookups(
+                    lookup,
+                    ids,
+                    timeout=timeout,
+                    owner_id=owner_id,
+                    reference=reference,
+                    options=options,
+                )
+
+            return self.get_products(
+                **lookup.get_products_kwargs(ids),
+                timeout=timeout,
+                owner_id=owner_id,
+                reference=reference,
+                options=options,
+            )
 
-    @retry(
-        reraise=retry_settings.reraise,
-        retry=retry_settings.retry,
-        stop=retry_settings.stop,
-        wait=retry_settings.wait,
-    )
     def get_products_by_ids(
         self,
         ids: List[str],
@@ -514,10 +878,16 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         reference: Optional[str] = None,
         options: Optional[Dict] = None,
         fields: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+        lookup_method: Optional[IdLookupMethod] = None,
+        split_on_failure: bool = False,
     ):
         """Get a batch of products by IDs.
 
-        Note: Multiple requests are made if more than 250 IDs are provided.
+        Note: Multiple requests are made if more than 250 IDs (6250 with
+        `IdLookupMethod.BATCH`) are provided.
+        Each request is retried on its own, so batches that succeeded aren't fetched again.
 
         Args:
             ids: Cofactr product IDs to match on.
@@ -535,80 +905,61 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             fields: Used to filter properties that the response should contain. A field can be a
                 concrete property like "mpn" or an abstract group of properties like "assembly".
                 Example: `"id,aliases,labels,statements{spec,assembly},offers"`.
+            max_concurrency: Maximum number of batch requests to have in flight at once, or an
+                `AdaptiveConcurrencyLimit` that adapts it to observed latency.
+            deadline: Time (in seconds) to finish every request in, including retries. Each
+                request's timeout is cut to the time remaining. If time runs out,
+                `PartialResultsError` is raised with the results that did finish.
+            lookup_method: How to send the IDs. Defaults to the client's `id_lookup_method`.
+            split_on_failure: Whether to split a batch request that fails with a 413, 414, 500
+                or 504 response (or whose sub-request does) in half, and send each half, until the
+                IDs that fail on their own are isolated. If any are, `PoisonItemsError` is raised
+                with every other ID's products. If `deadline` runs out too, `PartialResultsError`
+                is raised instead, and the failing IDs are listed as unfinished. A batch that keeps
+                failing however it's split (e.g. during an outage) raises its error instead.
         """
 
         if not ids:
             return {}
 
-        if not schema:
-            schema = self.default_product_schema
-
-        schema_class: Optional[ProductSchemaName] = (
-            schema if isinstance(schema, ProductSchemaName) else None
+        lookup = IdLookup(
+            ids,
+            alias_map=self.alias_map,
+            schema=schema or self.default_product_schema,
+            fields=fields,
+            method=lookup_method or self.id_lookup_method,
+            external=external,
+            force_refresh=force_refresh,
+            stale_delta=stale_delta,
         )
 
-        if (schema_class and fields) and (
-            schema_class is not ProductSchemaName.INTERNAL
-        ):
-            raise ValueError(
-                "Field expansion is not supported for the targeted schema."
-            )
-
-        # schema_value = schema_class.value if schema_class else schema
-        parsed_fields = fields.split(",") if fields else []
-
-        if fields:
-            for required_field in _REQUIRED_FIELDS:
-                if required_field not in parsed_fields:
-                    fields = f"{required_field},{fields}"
-
-        batched_products = [
-            self.get_products(
-                external=external,
-                force_refresh=force_refresh,
-                schema=schema,
-                filtering=[{"field": "id", "operator": "IN", "value": batched_ids}],
-                limit=_MAX_BATCH_SIZE,
+        def get_batch(batched_ids: List[str]) -> Dict[str, Any]:
+            return self._send_id_lookup(
+                lookup,
+                batched_ids,
                 timeout=timeout,
                 owner_id=owner_id,
-                stale_delta=stale_delta,
                 reference=reference,
                 options=options,
-                fields=fields,
             )
-            for batched_ids in batched(ids, n=_MAX_BATCH_SIZE)
-        ]
-
-        products = list(flatten([res["data"] for res in batched_products]))
 
-        get_ids = _get_ids_from_class if schema_class else _get_ids_from_dict
+        def get_batches(
+            batched_ids: List[str],
+        ) -> Tuple[List[Dict[str, Any]], List[str]]:
+            if split_on_failure:
+                return bisect_batch(get_batch, batched_ids)
 
-        id_to_product = {
-            id_: product for product in products for id_ in get_ids(entity=product)
-        }
-        target_id_to_product = {
-            id_: id_to_product[id_] for id_ in ids if id_ in id_to_product
-        }
-
-        fields_to_drop = [
-            required_field
-            for required_field in _REQUIRED_FIELDS
-            if required_field not in parsed_fields
-        ]
+            return [get_batch(batched_ids)], []
 
-        if not schema_class:
-            for field in fields_to_drop:
-                for _, product in target_id_to_product.items():
-                    product.pop(field, None)
+        outcomes, unfinished_batches = _map_until_deadline(
+            get_batches,
+            lookup.chunk(self.batch_sizer),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
 
-        return target_id_to_product
+        return lookup.merge(outcomes, unfinished_batches)
 
-    @retry(
-        reraise=retry_settings.reraise,
-        retry=retry_settings.retry,
-        stop=retry_settings.stop,
-        wait=retry_settings.wait,
-    )
     def get_canonical_product_ids(
         self,
         ids: List[str],
@@ -616,42 +967,48 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         owner_id: Optional[str] = None,
         reference: Optional[str] = None,
         options: Optional[Dict] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+        lookup_method: Optional[IdLookupMethod] = None,
     ):
         """Get the canonical product ID for each of the given IDs, which may or may not be
         deprecated.
+
+        IDs already in the alias map (see `alias_map`) are answered without a request.
+
+        Args:
+            max_concurrency: Maximum number of batch requests to have in flight at once, or an
+                `AdaptiveConcurrencyLimit` that adapts it to observed latency.
+            deadline: Time (in seconds) to finish every request in, including retries. Each
+                request's timeout is cut to the time remaining. If time runs out,
+                `PartialResultsError` is raised with the results that did finish.
+            lookup_method: How to send the IDs. Defaults to the client's `id_lookup_method`.
         """
 
         if not ids:
             return {}
 
-        batched_products = [
-            self.get_products(
-                fields="id,deprecated_ids",
-                external=False,
-                force_refresh=False,
-                schema=ProductSchemaName.INTERNAL,
-                filtering=[{"field": "id", "operator": "IN", "value": batched_ids}],
-                limit=_MAX_BATCH_SIZE,
+        # Known IDs are answered from the alias map, without a request.
+        lookup = IdLookup.of_unknown_ids(
+            ids, self.alias_map, method=lookup_method or self.id_lookup_method
+        )
+
+        _, unfinished_batches = _map_until_deadline(
+            lambda batched_ids: self._send_id_lookup(
+                lookup,
+                batched_ids,
                 timeout=timeout,
                 owner_id=owner_id,
                 reference=reference,
                 options=options,
-            )
-            for batched_ids in batched(ids, n=_MAX_BATCH_SIZE)
-        ]
-
-        id_to_canonical_id = {}
-
-        for res in batched_products:
-            products = res.get("data", [])
-
-            for product in products:
-                canonical_id = product["id"]
-
-                for key in [canonical_id, *(product.get("deprecated_ids") or [])]:
-                    id_to_canonical_id[key] = canonical_id
+            ),
+            lookup.chunk(self.batch_sizer),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
 
-        return {id_: id_to_canonical_id.get(id_) for id_ in ids}
+        # Each lookup records its products' IDs in the alias map.
+        return merge_canonical_ids(ids, self.alias_map, unfinished_batches)
 
     @retry(
         reraise=retry_settings.reraise,
@@ -704,6 +1061,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             timeout=timeout,
             filtering=filtering,
             owner_id=owner_id,
+            client=self.client,
         )
 
         res_json = res.json()
@@ -716,6 +1074,53 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         return res_json
 
+    def get_orgs_by_ids(
+        self,
+        ids: List[str],
+        schema: Optional[Union[OrgSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
+    ):
+        """Get a batch of orgs by IDs.
+
+        Note: Multiple requests are made if more than 250 IDs are provided.
+        Each request is retried on its own, so batches that succeeded aren't fetched again.
+
+        Args:
+            ids: Cofactr org IDs to match on.
+            schema: Response schema.
+            timeout: Time to wait (in seconds) for the server to issue a response.
+            owner_id: Specifies which private data to access.
+            max_concurrency: Maximum number of batch requests to have in flight at once, or an
+                `AdaptiveConcurrencyLimit` that adapts it to observed latency.
+            deadline: Time (in seconds) to finish every request in, including retries. Each
+                request's timeout is cut to the time remaining. If time runs out,
+                `PartialResultsError` is raised with the results that did finish.
+        """
+
+        if not ids:
+            return {}
+
+        if not schema:
+            schema = self.default_org_schema
+
+        batched_orgs, unfinished_batches = _map_until_deadline(
+            lambda batched_ids: self.get_orgs(
+                schema=schema,
+                filtering=get_id_filter(batched_ids),
+                limit=MAX_BATCH_SIZE,
+                timeout=timeout,
+                owner_id=owner_id,
+            ),
+            batched(ids, n=MAX_BATCH_SIZE),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
+
+        return merge_by_ids(batched_orgs, ids, unfinished_batches)
+
     @retry(
         reraise=retry_settings.reraise,
         retry=retry_settings.retry,
@@ -767,6 +1172,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             timeout=timeout,
             filtering=filtering,
             owner_id=owner_id,
+            client=self.client,
         )
 
         res_json = res.json()
@@ -779,28 +1185,30 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         return res_json
 
-    @retry(
-        reraise=retry_settings.reraise,
-        retry=retry_settings.retry,
-        stop=retry_settings.stop,
-        wait=retry_settings.wait,
-    )
     def get_suppliers_by_ids(
         self,
         ids: List[str],
         schema: Optional[Union[SupplierSchemaName, str]] = None,
         timeout: Optional[int] = None,
         owner_id: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
     ):
         """Get a batch of suppliers by IDs.
 
         Note: Multiple requests are made if more than 250 IDs are provided.
+        Each request is retried on its own, so batches that succeeded aren't fetched again.
 
         Args:
             ids: Cofactr org IDs to match on.
             schema: Response schema.
             timeout: Time to wait (in seconds) for the server to issue a response.
             owner_id: Specifies which private data to access.
+            max_concurrency: Maximum number of batch requests to have in flight at once, or an
+                `AdaptiveConcurrencyLimit` that adapts it to observed latency.
+            deadline: Time (in seconds) to finish every request in, including retries. Each
+                request's timeout is cut to the time remaining. If time runs out,
+                `PartialResultsError` is raised with the results that did finish.
         """
 
         if not ids:
@@ -809,35 +1217,26 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         if not schema:
             schema = self.default_supplier_schema
 
-        schema_class: Optional[SupplierSchemaName] = (
-            schema if isinstance(schema, SupplierSchemaName) else None
-        )
-
-        batched_suppliers = [
-            self.get_suppliers(
-                schema=schema,
-                filtering=[{"field": "id", "operator": "IN", "value": batched_ids}],
-                limit=_MAX_BATCH_SIZE,
-                timeout=timeout,
-                owner_id=owner_id,
-            )
-            for batched_ids in batched(ids, n=_MAX_BATCH_SIZE)
-        ]
-
-        suppliers = list(
-            flatten([suppliers["data"] for suppliers in batched_suppliers])
+        batch_key = ("suppliers", getattr(schema, "value", schema))
+
+        def get_batch(batched_ids: List[str]):
+            with measure_batch(self.batch_sizer, batch_key, len(batched_ids)):
+                return self.get_suppliers(
+                    schema=schema,
+                    filtering=get_id_filter(batched_ids),
+                    limit=MAX_BATCH_SIZE,
+                    timeout=timeout,
+                    owner_id=owner_id,
+                )
+
+        batched_suppliers, unfinished_batches = _map_until_deadline(
+            get_batch,
+            chunk_ids(self.batch_sizer, ids, key=batch_key, max_size=MAX_BATCH_SIZE),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
         )
 
-        get_ids = _get_ids_from_class if schema_class else _get_ids_from_dict
-
-        id_to_supplier = {
-            id_: supplier for supplier in suppliers for id_ in get_ids(entity=supplier)
-        }
-        target_id_to_supplier = {
-            id_: id_to_supplier[id_] for id_ in ids if id_ in id_to_supplier
-        }
-
-        return target_id_to_supplier
+        return merge_by_ids(batched_suppliers, ids, unfinished_batches)
 
     @retry(
         reraise=retry_settings.reraise,
@@ -869,7 +1268,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             owner_id: Specifies which private data to access.
         """
 
-        res = httpx.get(
+        res = self.client.get(
             f"{self.url}/orgs/autocompletions/",
             headers=drop_none_values(
                 {
@@ -921,7 +1320,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             owner_id: Specifies which private data to access.
         """
 
-        res = httpx.get(
+        res = self.client.get(
             f"{self.url}/classes/autocompletions/",
             headers=drop_none_values(
                 {
@@ -945,11 +1344,49 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         return res.json()
 
-    @retry(
-        reraise=retry_settings.reraise,
-        retry=retry_settings.retry,
-        stop=retry_settings.stop,
-        wait=retry_settings.wait,
+    def batch(
+        self,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        reference: Optional[str] = None,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+    ) -> "Batch":
+        """Start a batch of reads (products, offers and product searches, with any schema) to
+        send together, in as few `/batch/products/` requests as possible.
+
+        Example:
+            with graph.batch() as batch:
+                product = batch.get_product(id="CCV1F7A8UIYH", schema="internal")
+                offers = batch.get_offers(product_id="CCV1F7A8UIYH")
+                results = batch.get_products(query="esp32", limit=5)
+
+            product.result()["data"]
+
+        Args:
+            timeout: Time to wait (in seconds) for the server to issue each response.
+            owner_id: Specifies which private data to access.
+            reference: Arbitrary note to associate with the requests.
+            max_concurrency: Maximum number of batch requests to have in flight at once, or an
+                `AdaptiveConcurrencyLimit` that adapts it to observed latency.
+        """
+
+        # Imported here, since `cofactr.batch` depends on this module.
+        from cofactr.batch import Batch  # pylint: disable=import-outside-toplevel
+
+        return Batch(
+            self,
+            timeout=timeout,
+            owner_id=owner_id,
+            reference=reference,
+            max_concurrency=max_concurrency,
+        )
+
+    @coalesced
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
     )
     def get_product(
         self,
@@ -1002,7 +1439,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         options = options or {}
 
-        res = httpx.get(
+        res = self._get_entity(
             f"{self.url}/products/{id}",
             headers=drop_none_values(
                 {
@@ -1031,6 +1468,9 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         res_json = res.json()
         res_data = res_json and res_json.get("data")
 
+        if isinstance(res_data, dict):
+            self.alias_map.observe([res_data])
+
         if res_data and schema_class:
             Product = schema_to_product[schema_class]  # pylint: disable=invalid-name
 
@@ -1039,10 +1479,10 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         return res_json
 
     @retry(
-        reraise=retry_settings.reraise,
-        retry=retry_settings.retry,
-        stop=retry_settings.stop,
-        wait=retry_settings.wait,
+        reraise=non_idempotent_retry_settings.reraise,
+        retry=non_idempotent_retry_settings.retry,
+        stop=non_idempotent_retry_settings.stop,
+        wait=non_idempotent_retry_settings.wait,
     )
     def create_product(
         self,
@@ -1087,7 +1527,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         options = options or {}
 
-        res = httpx.post(
+        res = self.client.post(
             f"{self.url}/products/",
             json=data,
             headers=drop_none_values(
@@ -1145,7 +1585,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         options = options or {}
 
-        res = httpx.patch(
+        res = self.client.patch(
             f"{self.url}/products/{product_id}",
             json={
                 "owner_id": owner_id,
@@ -1166,10 +1606,10 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         res.raise_for_status()
 
     @retry(
-        reraise=retry_settings.reraise,
-        retry=retry_settings.retry,
-        stop=retry_settings.stop,
-        wait=retry_settings.wait,
+        reraise=non_idempotent_retry_settings.reraise,
+        retry=non_idempotent_retry_settings.retry,
+        stop=non_idempotent_retry_settings.stop,
+        wait=non_idempotent_retry_settings.wait,
     )
     def set_custom_product_ids(
         self,
@@ -1194,17 +1634,20 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         options = options or {}
 
-        res = httpx.post(
+        res = self.client.post(
             f"{self.url}/actions/custom-product-id-mappings/",
-            json={
-                "owner_id": owner_id,
-                "id_to_custom_id": id_to_custom_id,
-            },
-            headers=drop_none_values(
+            **encode_json_body(
                 {
-                    "X-CLIENT-ID": self.client_id,
-                    "X-API-KEY": self.api_key,
-                }
+                    "owner_id": owner_id,
+                    "id_to_custom_id": id_to_custom_id,
+                },
+                headers=drop_none_values(
+                    {
+                        "X-CLIENT-ID": self.client_id,
+                        "X-API-KEY": self.api_key,
+                    }
+                ),
+                compression_threshold=self.request_compression_threshold,
             ),
             params=drop_none_values({"ref": reference, **options}),
             timeout=timeout,
@@ -1213,6 +1656,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         res.raise_for_status()
 
+    @coalesced
     @retry(
         reraise=retry_settings.reraise,
         retry=retry_settings.retry,
@@ -1266,7 +1710,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         schema_value = schema_class.value if schema_class else schema
 
-        res = httpx.get(
+        res = self._get_entity(
             f"{self.url}/products/{product_id}/offers",
             headers=drop_none_values(
                 {
@@ -1302,6 +1746,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         return res_json
 
+    @coalesced
     @retry(
         reraise=retry_settings.reraise,
         retry=retry_settings.retry,
@@ -1325,7 +1770,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         )
         schema_value = schema_class.value if schema_class else schema
 
-        res = httpx.get(
+        res = self._get_entity(
             f"{self.url}/orgs/{id}",
             headers=drop_none_values(
                 {
@@ -1352,6 +1797,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         return res_json
 
+    @coalesced
     @retry(
         reraise=retry_settings.reraise,
         retry=retry_settings.retry,
@@ -1375,7 +1821,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         )
         schema_value = schema_class.value if schema_class else schema
 
-        res = httpx.get(
+        res = self._get_entity(
             f"{self.url}/orgs/{id}",
             headers=drop_none_values(
                 {
@@ -1404,6 +1850,94 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
 
         return res_json
 
+    def load_product(
+        self,
+        id: str,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+        fields: Optional[str] = None,
+    ):
+        """Get a product by ID, batched with concurrent lookups.
+
+        Lookups with the same arguments made within `batch_window` (e.g. from a thread per BOM
+        line) are sent as a single `get_products_by_ids` request. A deprecated ID resolves to the
+        product it was merged into.
+
+        Args:
+            id: Cofactr product ID.
+            external: Whether to query external sources in order to refresh data if applicable.
+            force_refresh: Whether to force re-ingestion from external sources. Overrides
+                `external`.
+            schema: Response schema.
+            timeout: Time to wait (in seconds) for the server to issue a response.
+            owner_id: Specifies which private data to access.
+            stale_delta: How much time has to pass before data is treated as stale. Use "inf" or
+                "infinite" to indicate data should not be refreshed, no matter how old.
+                Examples: "5h", "1d", "1w", "inf"
+            reference: Arbitrary note to associate with the request.
+            options: Extra configuration options.
+            fields: Used to filter properties that the response should contain.
+
+        Returns:
+            The product, or `None` if it wasn't found. Concurrent lookups of the same ID share
+            the result, so it must not be mutated.
+        """
+
+        return self.product_loader.load(
+            id=id,
+            external=external,
+            force_refresh=force_refresh,
+            schema=schema,
+            timeout=timeout,
+            owner_id=owner_id,
+            stale_delta=stale_delta,
+            reference=reference,
+            options=options,
+            fields=fields,
+        )
+
+    def load_org(
+        self,
+        id: str,
+        schema: Optional[Union[OrgSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+    ):
+        """Get an organization by ID, batched with concurrent lookups into a single
+        `get_orgs_by_ids` request. See `load_product`.
+
+        Returns:
+            The organization, or `None` if it wasn't found.
+        """
+
+        return self.org_loader.load(
+            id=id, schema=schema, timeout=timeout, owner_id=owner_id
+        )
+
+    def load_supplier(
+        self,
+        id: str,
+        schema: Optional[Union[SupplierSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+    ):
+        """Get a supplier by ID, batched with concurrent lookups into a single
+        `get_suppliers_by_ids` request. See `load_product`.
+
+        Returns:
+            The supplier, or `None` if it wasn't found.
+        """
+
+        return self.supplier_loader.load(
+            id=id, schema=schema, timeout=timeout, owner_id=owner_id
+        )
+
     @retry(
         reraise=retry_settings.reraise,
         retry=retry_settings.retry,
@@ -1438,7 +1972,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         )
         schema_value = schema_class.value if schema_class else schema
 
-        res = httpx.get(
+        res = self.client.get(
             f"{self.url}/orders/",
             headers=drop_none_values(
                 {
@@ -1478,6 +2012,8 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         timeout: Optional[int] = None,
         owner_id: Optional[str] = None,
         is_sandbox: bool = False,
+        max_concurrency: Union[int, AdaptiveConcurrencyLimit] = 1,
+        deadline: Optional[float] = None,
     ):
         """Get a batch of orders by IDs.
 
@@ -1488,6 +2024,11 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             owner_id: Specifies which private data to access.
             is_sandbox: If True, the order will be executed in a sandbox environment: Real orders
                 will not be queried.
+            max_concurrency: Maximum number of batch requests to have in flight at once, or an
+                `AdaptiveConcurrencyLimit` that adapts it to observed latency.
+            deadline: Time (in seconds) to finish every request in, including retries. Each
+                request's timeout is cut to the time remaining. If time runs out,
+                `PartialResultsError` is raised with the results that did finish.
         """
 
         if not ids:
@@ -1496,31 +2037,20 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         if not schema:
             schema = self.default_order_schema
 
-        schema_class: Optional[OrderSchemaName] = (
-            schema if isinstance(schema, OrderSchemaName) else None
-        )
-
-        batched_orders = [
-            self.get_orders(
+        batched_orders, unfinished_batches = _map_until_deadline(
+            lambda batched_ids: self.get_orders(
                 schema=schema,
-                filtering=[{"field": "id", "operator": "IN", "value": batched_ids}],
+                filtering=get_id_filter(batched_ids),
                 timeout=timeout,
                 owner_id=owner_id,
                 is_sandbox=is_sandbox,
-            )
-            for batched_ids in batched(ids, n=_MAX_BATCH_SIZE)
-        ]
-
-        orders = list(flatten([res["data"] for res in batched_orders]))
-
-        get_ids = _get_ids_from_class if schema_class else _get_ids_from_dict
-
-        id_to_order = {id_: order for order in orders for id_ in get_ids(entity=order)}
-        target_id_to_order = {
-            id_: id_to_order[id_] for id_ in ids if id_ in id_to_order
-        }
+            ),
+            batched(ids, n=MAX_BATCH_SIZE),
+            max_concurrency=max_concurrency,
+            deadline=deadline,
+        )
 
-        return target_id_to_order
+        return merge_by_ids(batched_orders, ids, unfinished_batches)
 
     def create_order(
         self,
@@ -1540,7 +2070,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             ID of the created order.
         """
 
-        res = httpx.post(
+        res = self.client.post(
             f"{self.url}/orders/",
             headers=drop_none_values(
                 {
@@ -1580,6 +2110,7 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
         reference: Optional[str] = None,
         options: Optional[dict] = None,
         fields: Optional[str] = None,
+        deadline: Optional[float] = None,
     ) -> List[str]:
         """Create batch product request job.
 
@@ -1601,82 +2132,384 @@ class GraphAPI:  # pylint: disable=too-many-instance-attributes
             fields: Used to filter properties that the response should contain. A field can be a
                 concrete property like "mpn" or an abstract group of properties like "assembly".
                 Example: "id,aliases,labels,statements{spec,assembly},offers"
+            deadline: Time (in seconds) to finish every request in. Each request's timeout is cut to
+                the time remaining. If time runs out, `PartialResultsError` is raised with the IDs
+                of the jobs that were created.
 
         Returns:
             A list with one ID for each job that was created.
         """
 
-        if not schema:
-            schema = self.default_product_schema
+        _, schema_value = resolve_schema(
+            schema or self.default_product_schema, ProductSchemaName, fields
+        )
+        query_params = get_query_params(
+            schema_value,
+            external=external,
+            force_refresh=force_refresh,
+            stale_delta=stale_delta,
+            fields=fields,
+        )
+        sub_batch_size = get_job_sub_batch_size(self.batch_sizer, schema_value, fields)
 
-        schema_class: Optional[ProductSchemaName] = (
-            schema if isinstance(schema, ProductSchemaName) else None
+        def create_job(id_batch: Sequence[str]) -> str:
+            res = self.client.post(
+                f"{self.url}/jobs/batch-products-requests/",
+                **encode_json_body(
+                    {
+                        "batch": get_id_lookup_batch(
+                            id_batch,
+                            query_params=query_params,
+                            sub_batch_size=sub_batch_size,
+                        )
+                    },
+                    headers=drop_none_values(
+                        {"X-CLIENT-ID": self.client_id, "X-API-KEY": self.api_key}
+                    ),
+                    compression_threshold=self.request_compression_threshold,
+                ),
+                params=get_request_params(owner_id, reference, options),
+                timeout=timeout,
+                follow_redirects=True,
+            )
+
+            res.raise_for_status()
+
+            return get_job_id(res)
+
+        # Jobs are created one at a time, in order.
+        job_ids, unfinished_batches = _map_until_deadline(
+            create_job,
+            batched(ids, n=MAX_BATCH_SIZE),
+            max_concurrency=1,
+            deadline=deadline,
         )
 
-        if (schema_class and fields) and (
-            schema_class is not ProductSchemaName.INTERNAL
+        raise_incomplete(
+            job_ids, unfinished=list(flatten(unfinished_batches)), poison=[]
+        )
+
+        return job_ids
+
+    @retry(
+        reraise=retry_settings.reraise,
+        retry=retry_settings.retry,
+        stop=retry_settings.stop,
+        wait=retry_settings.wait,
+    )
+    def get_job(self, job_id: str, timeout: Optional[int] = None) -> Dict[str, Any]:
+        """Get a job's status and, once it's completed, its results.
+
+        Args:
+            job_id: ID of the job, as returned by `create_get_products_by_ids_job`.
+            timeout: Time to wait (in seconds) for the server to issue a response.
+
+        Returns:
+            The job, with its `status` (see `JobStatus`) and, once it's completed, its `results`:
+            a `/batch/products/` sub-response for each of its sub-requests.
+        """
+
+        res = self.client.get(
+            f"{self.url}/jobs/{job_id}",
+            headers=drop_none_values(
+                {
+                    "X-CLIENT-ID": self.client_id,
+                    "X-API-KEY": self.api_key,
+                }
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+        res.raise_for_status()
+
+        return res.json()
+
+    def _iter_finished_jobs(
+        self,
+        job_ids: List[str],
+        polling: PollingPolicy,
+        max_concurrency: int,
+        timeout: Optional[int],
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Poll jobs until each finishes, yielding each as it does."""
+
+        schedule = JobSchedule(job_ids, polling)
+
+        while schedule:
+            time.sleep(schedule.get_delay())
+            due = schedule.take_due()
+            jobs = map_concurrently(
+                lambda job_id: self.get_job(job_id, timeout=timeout),
+                [job_id for job_id, _ in due],
+                max_concurrency=max_concurrency,
+            )
+
+            for (job_id, polls), job in zip(due, jobs):
+                if is_job_finished(job):
+                    yield job_id, job
+                else:
+                    schedule.reschedule(job_id, polls + 1)
+
+    def iter_job_results(
+        self,
+        job_ids: List[str],
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        polling: PollingPolicy = DEFAULT_POLLING_POLICY,
+        max_concurrency: int = 8,
+        timeout: Optional[int] = None,
+    ) -> Iterator[JobResult]:
+        """Poll jobs until they finish, and get their products as each one does.
+
+        Jobs are polled concurrently, each with its own backoff (see `PollingPolicy`), so
+        results can be processed while the server works through the remaining jobs.
+
+        Args:
+            job_ids: IDs of jobs, as returned by `create_get_products_by_ids_job`.
+            schema: Response schema the jobs were created with, to parse products by.
+            polling: How often to check on each job, and for how long.
+            max_concurrency: Maximum number of status checks to have in flight at once.
+            timeout: Time to wait (in seconds) for the server to issue a response.
+
+        Returns:
+            An iterator of the products of each job, in the order the jobs finish.
+
+        Raises:
+            JobFailedError: If a job failed.
+            JobTimeoutError: If jobs didn't finish within the polling policy's timeout.
+        """
+
+        schema_class, _ = resolve_schema(
+            schema or self.default_product_schema, ProductSchemaName, None
+        )
+
+        for job_id, job in self._iter_finished_jobs(
+            job_ids, polling=polling, max_concurrency=max_concurrency, timeout=timeout
         ):
-            raise ValueError(
-                "Field expansion is not supported for the targeted schema."
+            products = get_job_products(job_id, job)
+
+            yield JobResult(
+                job_id=job_id,
+                products=parse_products(products, schema_class, self.alias_map),
             )
 
-        schema_value = schema_class.value if schema_class else schema
+    def plan_fetch(
+        self,
+        ids: int,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        stale_delta: Optional[str] = None,
+        fields: Optional[str] = None,
+        max_concurrency: int = 4,
+    ) -> FetchPlan:
+        """Estimate how long fetching products by ID inline would take, and pick the strategy
+        `fetch_products` would use. See `FetchPlanner`.
 
-        options = options or {}
+        Args:
+            ids: Number of IDs to fetch.
+            max_concurrency: Most inline requests in flight at once.
 
-        invariant_query_params = drop_none_values(
-            {
-                "schema": schema_value,
-                "external": bool(external),
-                "force_refresh": force_refresh,
-                "stale_delta": stale_delta,
-                "fields": fields,
-            }
+        The other arguments are as for `fetch_products`.
+        """
+
+        return plan_fetch(
+            self.fetch_planner,
+            ids,
+            schema=schema or self.default_product_schema,
+            fields=fields,
+            external=external,
+            force_refresh=force_refresh,
+            stale_delta=stale_delta,
+            max_concurrency=max_concurrency,
         )
 
-        job_ids = []
+    def fetch_products(
+        self,
+        ids: List[str],
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        schema: Optional[Union[ProductSchemaName, str]] = None,
+        timeout: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        stale_delta: Optional[str] = None,
+        reference: Optional[str] = None,
+        options: Optional[Dict] = None,
+        fields: Optional[str] = None,
+        max_concurrency: int = 4,
+        strategy: Optional[FetchStrategy] = None,
+        polling: PollingPolicy = DEFAULT_POLLING_POLICY,
+    ) -> Iterator[Tuple[str, Any]]:
+        """Fetch products by ID, inline or through the jobs API, whichever is expected to suit
+        the fetch (see `plan_fetch`).
 
-        for id_batch in batched(ids, n=_MAX_BATCH_SIZE):
-            res = httpx.post(
-                f"{self.url}/jobs/batch-products-requests/",
-                headers=drop_none_values(
-                    {
-                        "X-CLIENT-ID": self.client_id,
-                        "X-API-KEY": self.api_key,
-                    }
-                ),
-                json={
-                    "batch": [
-                        {
-                            "method": "GET",
-                            "relative_url": (
-                                f"?filtering={filtering}&{urlencode(invariant_query_params)}"
-                            ),
-                        }
-                        for ids_ in batched(id_batch, n=_MAX_SUB_BATCH_SIZE)
-                        if (
-                            filtering := quote(
-                                json.dumps(
-                                    [{"field": "id", "operator": "IN", "value": ids_}]
-                                )
-                            )
-                        )
-                    ]
-                },
-                params=drop_none_values(
-                    {"owner_id": owner_id, "ref": reference, **options}
-                ),
+        Small fetches (e.g. a quote's few dozen lines) are sent as concurrent inline batches.
+        Large ones (e.g. a nightly refresh of every part) are sent as jobs, so that the server
+        works through them in the background instead of holding requests open.
+
+        If the caller stops iterating early, inline batches that haven't been sent are cancelled,
+        and those in flight finish in the background without holding up the caller.
+
+        Args:
+            ids: Cofactr product IDs to fetch.
+            max_concurrency: Most inline requests (or job status checks) in flight at once.
+            strategy: Strategy to use, instead of the planned one.
+            polling: How often to check on each job, and for how long.
+
+        The other arguments are as for `get_products_by_ids`.
+
+        Returns:
+            An iterator of each ID found and its product, yielded as soon as the request or job
+            that fetched it finishes.
+        """
+
+        schema = schema or self.default_product_schema
+        resolve_schema(schema, ProductSchemaName, fields)
+
+        ids = list(dict.fromkeys(ids))
+        key = get_fetch_key(
+            schema,
+            fields,
+            get_freshness(
+                external=external, force_refresh=force_refresh, stale_delta=stale_delta
+            ),
+        )
+
+        if strategy is None:
+            strategy = self.plan_fetch(
+                len(ids),
+                external=external,
+                force_refresh=force_refresh,
+                schema=schema,
+                stale_delta=stale_delta,
+                fields=fields,
+                max_concurrency=max_concurrency,
+            ).strategy
+
+        if strategy is FetchStrategy.JOBS:
+            return self._fetch_products_by_jobs(
+                ids,
+                polling=polling,
+                max_concurrency=max_concurrency,
+                external=external,
+                force_refresh=force_refresh,
+                schema=schema,
                 timeout=timeout,
-                follow_redirects=True,
+                owner_id=owner_id,
+                stale_delta=stale_delta,
+                reference=reference,
+                options=options,
+                fields=fields,
             )
-            res.raise_for_status()
 
-            location = res.headers.get("location")
+        return self._fetch_products_inline(
+            ids,
+            key=key,
+            max_concurrency=max_concurrency,
+            external=external,
+            force_refresh=force_refresh,
+            schema=schema,
+            timeout=timeout,
+            owner_id=owner_id,
+            stale_delta=stale_delta,
+            reference=reference,
+            options=options,
+            fields=fields,
+        )
 
-            if not location:
-                raise ValueError("No resource location found in job creation response.")
+    def _fetch_products_inline(
+        self,
+        ids: List[str],
+        key: Hashable,
+        max_concurrency: int,
+        external: Optional[bool],
+        force_refresh: bool,
+        schema: Union[ProductSchemaName, str],
+        timeout: Optional[int],
+        owner_id: Optional[str],
+        stale_delta: Optional[str],
+        reference: Optional[str],
+        options: Optional[Dict],
+        fields: Optional[str],
+    ) -> Iterator[Tuple[str, Any]]:
+        def fetch(id_batch: List[str]) -> Dict[str, Any]:
+            start = time.monotonic()
+            id_to_product = self.get_products_by_ids(
+                ids=id_batch,
+                external=external,
+                force_refresh=force_refresh,
+                schema=schema,
+                timeout=timeout,
+                owner_id=owner_id,
+                stale_delta=stale_delta,
+                reference=reference,
+                options=options,
+                fields=fields,
+            )
+            self.fetch_planner.record(key, len(id_batch), time.monotonic() - start)
 
-            # Remove `/jobs/` to get the ID from the resource path.
-            job_ids.append(location[6:])
+            return id_to_product
 
-        return job_ids
+        id_batches = [list(id_batch) for id_batch in batched(ids, n=MAX_BATCH_SIZE)]
+
+        if not id_batches:
+            return
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(min(max_concurrency, len(id_batches)), 1)
+        )
+        futures = [
+            executor.submit(with_current_context(fetch), id_batch)
+            for id_batch in id_batches
+        ]
+
+        try:
+            for future in as_completed(futures):
+                yield from future.result().items()
+        finally:
+            # Stop early if the caller stops iterating (or a batch failed): batches that haven't
+            # started are cancelled, and those in flight finish in the background instead of
+            # holding up the caller.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_products_by_jobs(
+        self,
+        ids: List[str],
+        polling: PollingPolicy,
+        max_concurrency: int,
+        external: Optional[bool],
+        force_refresh: bool,
+        schema: Union[ProductSchemaName, str],
+        timeout: Optional[int],
+        owner_id: Optional[str],
+        stale_delta: Optional[str],
+        reference: Optional[str],
+        options: Optional[Dict],
+        fields: Optional[str],
+    ) -> Iterator[Tuple[str, Any]]:
+        job_ids = self.create_get_products_by_ids_job(
+            ids=ids,
+            external=external,
+            force_refresh=force_refresh,
+            schema=schema,
+            timeout=timeout,
+            owner_id=owner_id,
+            stale_delta=stale_delta,
+            reference=reference,
+            options=options,
+            fields=add_required_fields(fields),
+        )
+
+        id_to_requested_ids = get_id_to_requested_ids(ids, self.alias_map)
+
+        for job_id, job in self._iter_finished_jobs(
+            job_ids, polling=polling, max_concurrency=max_concurrency, timeout=timeout
+        ):
+
+            yield from match_products(
+                get_job_products(job_id, job),
+                id_to_requested_ids=id_to_requested_ids,
+                schema=schema,
+                fields=fields,
+                alias_map=self.alias_map,
+            )
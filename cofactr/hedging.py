@@ -0,0 +1,236 @@
+"""Hedged requests: duplicate slow requests and take whichever response arrives first."""
+# Standard Modules
+import asyncio
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Lock
+import time
+from typing import Awaitable, Callable, Deque, Optional
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.concurrency import with_current_context
+
+
+def _wins(response: Optional[httpx.Response], error: Optional[BaseException]) -> bool:
+    """Whether an attempt's outcome can be returned without waiting for the other attempt."""
+
+    return error is None and response is not None and response.status_code < 500
+
+
+class HedgePolicy:  # pylint: disable=too-many-instance-attributes
+    """Sends a duplicate of a request that's slower than usual, and uses whichever response
+    arrives first.
+
+    The hedge is sent once the request has been in flight for longer than the given percentile
+    of recent latencies, so only the slowest requests are duplicated. Hedges are also capped at a
+    fraction of requests, so they can't amplify load when the server is slow across the board.
+
+    Requests are sent on the caller's thread while there's no hedge to spare. Otherwise, both
+    attempts are sent from a pool of threads, which is shut down by `close` (or by closing a
+    client that uses the policy).
+
+    Thread-safe. A single instance may be shared by several clients.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        max_hedge_ratio: float = 0.05,
+        initial_delay: float = 0.5,
+        min_delay: float = 0.01,
+        window: int = 1000,
+        min_samples: int = 20,
+        max_workers: int = 32,
+    ):
+        """
+        Args:
+            percentile: Percentile of recent latencies after which a hedge is sent.
+            max_hedge_ratio: Maximum hedges as a fraction of requests.
+            initial_delay: Delay (in seconds) before a hedge is sent, until enough latencies have
+                been observed.
+            min_delay: Lower bound (in seconds) for the delay.
+            window: Number of recent latencies to take the percentile of.
+            min_samples: Number of latencies to observe before using the percentile.
+            max_workers: Maximum number of threads sending hedged synchronous requests.
+        """
+
+        if not 0 < percentile < 100:
+            raise ValueError("Expected a percentile between 0 and 100.")
+
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # Each request earns `max_hedge_ratio` of a hedge, and at most one hedge can be saved up.
+        self._hedge_tokens = 0.0
+        self._lock = Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def delay(self) -> float:
+        """Seconds to wait for a response before sending a hedge."""
+
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return self.initial_delay
+
+            latencies = sorted(self.latencies)
+
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+
+        return max(self.min_delay, latencies[index])
+
+    def _record_request(self):
+        with self._lock:
+            self.requests += 1
+            self._hedge_tokens = min(1.0, self._hedge_tokens + self.max_hedge_ratio)
+
+    def _can_hedge(self) -> bool:
+        with self._lock:
+            return self._hedge_tokens >= 1
+
+    def _try_hedge(self) -> bool:
+        with self._lock:
+            if self._hedge_tokens < 1:
+                return False
+
+            self._hedge_tokens -= 1
+            self.hedges += 1
+
+            return True
+
+    def _record_latency(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def _record_hedge_win(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def _submit(self, send: Callable[[], httpx.Response]) -> Future[httpx.Response]:
+        # Submitted while holding the lock, so that `close` can't shut the pool down in between.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="cofactr-hedge"
+                )
+
+            return self._executor.submit(with_current_context(self._timed), send)
+
+    def close(self):
+        """Shut down the threads that send hedged requests. Attempts still in flight finish in
+        the background, and later requests start a new pool."""
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor:
+            executor.shutdown(wait=False)
+
+    def _timed(self, send: Callable[[], httpx.Response]) -> httpx.Response:
+        start = time.monotonic()
+        response = send()
+        self._record_latency(time.monotonic() - start)
+
+        return response
+
+    def send(self, send: Callable[[], httpx.Response]) -> httpx.Response:
+        """Send a request, hedging it if it's slow.
+
+        The losing request can't be interrupted once it's been sent, so its response is
+        discarded when it arrives.
+        """
+
+        self._record_request()
+
+        if not self._can_hedge():
+            # A request that can't be hedged has nothing to race, so it needn't leave this thread.
+            return self._timed(send)
+
+        primary = self._submit(send)
+        done, _ = wait([primary], timeout=self.delay)
+
+        if done or not self._try_hedge():
+            return primary.result()
+
+        hedge = self._submit(send)
+        pending = {primary, hedge}
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if _wins(*_get_outcome(future)):
+                    for other in pending:
+                        other.cancel()
+
+                    if future is hedge:
+                        self._record_hedge_win()
+
+                    return future.result()
+
+        return primary.result()
+
+    async def send_async(
+        self, send: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Send a request without blocking the event loop, hedging it if it's slow.
+
+        The losing request is cancelled.
+        """
+
+        async def timed() -> httpx.Response:
+            start = time.monotonic()
+            response = await send()
+            self._record_latency(time.monotonic() - start)
+
+            return response
+
+        self._record_request()
+        primary = asyncio.ensure_future(timed())
+        tasks = [primary]
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay)
+
+            if done or not self._try_hedge():
+                return await primary
+
+            hedge = asyncio.ensure_future(timed())
+            tasks.append(hedge)
+            pending = set(tasks)
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    if _wins(*_get_outcome(task)):
+                        if task is hedge:
+                            self._record_hedge_win()
+
+                        return task.result()
+
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+def _get_outcome(future):
+    """Get the response or error of a completed future or task."""
+
+    error = future.exception()
+
+    return (None, error) if error else (future.result(), None)
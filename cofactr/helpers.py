@@ -13,3 +13,5 @@ def get_path(data, keys, default=None):
 
 
 identity = lambda x: x
+
+drop_none_values = lambda d: {k: v for k, v in d.items() if v is not None}
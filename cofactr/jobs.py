@@ -0,0 +1,167 @@
+"""Polling batch product request jobs, and reading their results."""
+# Standard Modules
+from dataclasses import dataclass
+from enum import Enum
+import heapq
+import random
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+class JobStatus(str, Enum):
+    """Job status."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobFailedError(Exception):
+    """Raised when a job, or one of its sub-requests, failed.
+
+    Attributes:
+        job_id: ID of the job.
+        job: The job, as returned by `get_job`.
+    """
+
+    def __init__(self, job_id: str, job: Dict[str, Any]):
+        super().__init__(f"Job {job_id} failed.")
+        self.job_id = job_id
+        self.job = job
+
+
+class JobTimeoutError(Exception):
+    """Raised when jobs didn't finish within the polling policy's timeout.
+
+    Attributes:
+        unfinished: IDs of the jobs that hadn't finished.
+    """
+
+    def __init__(self, unfinished: List[str]):
+        super().__init__(f"{len(unfinished)} job(s) didn't finish in time.")
+        self.unfinished = unfinished
+
+
+class JobResult(NamedTuple):
+    """Products fetched by a job."""
+
+    job_id: str
+    products: List[Any]
+
+
+@dataclass(frozen=True)
+class PollingPolicy:
+    """How often to check on jobs.
+
+    Each job is checked as soon as polling starts, in case it's already finished, then less and
+    less often: after `initial_interval` seconds, growing by `multiplier` up to `max_interval`.
+    Intervals are jittered, so that jobs created together aren't checked in lockstep.
+    """
+
+    initial_interval: float = 1.0
+    max_interval: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.1
+    timeout: Optional[float] = None
+
+    def get_interval(self, polls: int) -> float:
+        """Get the time (in seconds) to wait before checking a job that's been checked `polls`
+        times."""
+
+        interval = min(
+            self.initial_interval * self.multiplier ** max(polls - 1, 0),
+            self.max_interval,
+        )
+
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+DEFAULT_POLLING_POLICY = PollingPolicy()
+
+
+class JobSchedule:
+    """When to check each unfinished job next."""
+
+    def __init__(self, job_ids: List[str], policy: PollingPolicy):
+        now = time.monotonic()
+        self.policy = policy
+        self.expires_at = None if policy.timeout is None else now + policy.timeout
+        # (time of the next check, tiebreaker, job ID, checks so far)
+        self._queue: List[Tuple[float, int, str, int]] = [
+            (now, index, job_id, 0) for index, job_id in enumerate(job_ids)
+        ]
+        self._count = len(job_ids)
+
+    def __bool__(self) -> bool:
+        return bool(self._queue)
+
+    def get_delay(self) -> float:
+        """Get the time (in seconds) until the next check is due.
+
+        Raises:
+            JobTimeoutError: If the policy's timeout has passed, or will have by then.
+        """
+
+        due_at = self._queue[0][0]
+
+        if self.expires_at is not None and due_at > self.expires_at:
+            raise JobTimeoutError(
+                unfinished=[job_id for _, _, job_id, _ in self._queue]
+            )
+
+        return max(due_at - time.monotonic(), 0.0)
+
+    def take_due(self) -> List[Tuple[str, int]]:
+        """Take the jobs whose checks are due, with the number of times each has been checked."""
+
+        now = time.monotonic()
+        due = []
+
+        while self._queue and self._queue[0][0] <= now:
+            _, _, job_id, polls = heapq.heappop(self._queue)
+            due.append((job_id, polls))
+
+        return due
+
+    def reschedule(self, job_id: str, polls: int):
+        """Schedule the next check of a job that hasn't finished."""
+
+        self._count += 1
+        heapq.heappush(
+            self._queue,
+            (
+                time.monotonic() + self.policy.get_interval(polls),
+                self._count,
+                job_id,
+                polls,
+            ),
+        )
+
+
+def is_job_finished(job: Dict[str, Any]) -> bool:
+    """Get whether a job (as returned by `get_job`) has finished, successfully or not."""
+
+    return job.get("status") in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+
+def get_job_products(job_id: str, job: Dict[str, Any]) -> List[Any]:
+    """Get the products from a finished job's results, one `/batch/products/` sub-response per
+    sub-request.
+
+    Raises:
+        JobFailedError: If the job or one of its sub-requests failed.
+    """
+
+    if job.get("status") != JobStatus.COMPLETED:
+        raise JobFailedError(job_id, job)
+
+    products: List[Dict[str, Any]] = []
+
+    for response in job.get("results") or []:
+        if response.get("code") != 200:
+            raise JobFailedError(job_id, job)
+
+        products.extend((response.get("body") or {}).get("data") or [])
+
+    return products
@@ -0,0 +1,126 @@
+"""Keeping pooled connections warm between bursts of requests."""
+# Standard Modules
+import asyncio
+from threading import Event, Thread
+from typing import Any, Awaitable, Callable, Optional
+
+# 3rd Party Modules
+import httpx
+
+# Request extension that marks the health checks sent to open or keep connections warm, so that
+# hooks that account for API traffic (e.g. retry budgets and transfer stats) can leave them out.
+WARMUP_EXTENSION = "cofactr_warmup"
+
+
+def get_warmup_extensions() -> dict:
+    """Get the request extensions for a warmup or keep-alive health check."""
+
+    return {WARMUP_EXTENSION: True}
+
+
+def is_warmup_request(request: httpx.Request) -> bool:
+    """Whether a request is a warmup or keep-alive health check."""
+
+    return bool(request.extensions.get(WARMUP_EXTENSION))
+
+
+class KeepAlive:
+    """Calls a ping function every `interval` seconds on a background thread, so that idle
+    pooled connections aren't closed (by the pool's `keepalive_expiry` or by the server) between
+    bursts of requests.
+
+    Errors raised by the ping are ignored: a failed ping only means the next request sets up a
+    new connection.
+    """
+
+    def __init__(self, ping: Callable[[], Any], interval: float):
+        """
+        Args:
+            ping: Function that sends the keep-alive requests.
+            interval: Time (in seconds) between pings.
+        """
+
+        if interval <= 0:
+            raise ValueError("Expected a positive keep-alive interval.")
+
+        self.ping = ping
+        self.interval = interval
+        self.pings = 0
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        """Start pinging, if not already started."""
+
+        if self._thread is None:
+            self._thread = Thread(
+                target=self._run, name="cofactr-keepalive", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop pinging, waiting for a ping in progress to finish."""
+
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.ping()
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+            self.pings += 1
+
+
+class AsyncKeepAlive:
+    """Awaits a ping coroutine function every `interval` seconds in a background task. See
+    `KeepAlive`."""
+
+    def __init__(self, ping: Callable[[], Awaitable[Any]], interval: float):
+        """
+        Args:
+            ping: Coroutine function that sends the keep-alive requests.
+            interval: Time (in seconds) between pings.
+        """
+
+        if interval <= 0:
+            raise ValueError("Expected a positive keep-alive interval.")
+
+        self.ping = ping
+        self.interval = interval
+        self.pings = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start pinging on the running event loop, if not already started."""
+
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop pinging, cancelling a ping in progress."""
+
+        if self._task is not None:
+            self._task.cancel()
+
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.ping()
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+            self.pings += 1
@@ -0,0 +1,195 @@
+"""Automatic batching of single-ID lookups (in the style of DataLoader)."""
+# Standard Modules
+import asyncio
+from concurrent.futures import Future
+import json
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BatchFunc = Callable[..., Dict[str, Any]]
+AsyncBatchFunc = Callable[..., Awaitable[Dict[str, Any]]]
+
+
+def _get_group(kwargs: Dict[str, Any]) -> str:
+    """Get the group of lookups with the same options (e.g. schema and owner), which can share a
+    batch."""
+
+    return json.dumps(kwargs, sort_keys=True, default=str)
+
+
+class _Batch:
+    """Lookups collected for a single batch request."""
+
+    def __init__(self, kwargs: Dict[str, Any]):
+        self.kwargs = kwargs
+        self.futures: Dict[str, Any] = {}
+        self.full = Event()
+
+
+class BatchLoader:
+    """Collects lookups by ID made from several threads within a short window, and sends them
+    as a single batch request.
+
+    The first lookup of a batch waits `window` seconds (or until `max_batch_size` IDs have been
+    collected) for others to join, then sends the batch from its thread. Every caller gets the
+    entity its ID maps to, or `None` if there's none. Lookups of the same ID share a result, so
+    callers must not mutate it.
+
+    Thread-safe.
+    """
+
+    def __init__(
+        self, batch_func: BatchFunc, window: float = 0.005, max_batch_size: int = 250
+    ):
+        """
+        Args:
+            batch_func: Function that takes `ids` (along with the lookups' other keyword
+                arguments) and returns a mapping from each ID found to its entity.
+            window: Time (in seconds) to collect lookups for.
+            max_batch_size: Maximum number of IDs per batch.
+        """
+
+        self.batch_func = batch_func
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self._pending: Dict[str, _Batch] = {}
+        self._lock = Lock()
+
+    def load(
+        self, id: str, **kwargs  # pylint: disable=redefined-builtin
+    ) -> Optional[Any]:
+        """Look up an entity by ID, batched with concurrent lookups that have the same keyword
+        arguments."""
+
+        group = _get_group(kwargs)
+
+        with self._lock:
+            batch = self._pending.get(group)
+            leader = batch is None
+
+            if batch is None:
+                batch = self._pending[group] = _Batch(kwargs)
+
+            future = batch.futures.get(id)
+
+            if future is None:
+                future = batch.futures[id] = Future()
+
+            if len(batch.futures) >= self.max_batch_size:
+                del self._pending[group]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+
+            with self._lock:
+                if self._pending.get(group) is batch:
+                    del self._pending[group]
+
+            self._send(batch)
+
+        return future.result()
+
+    def _send(self, batch: _Batch):
+        with self._lock:
+            self.batches += 1
+
+        try:
+            id_to_entity = self.batch_func(ids=list(batch.futures), **batch.kwargs)
+        except BaseException as error:
+            for future in batch.futures.values():
+                future.set_exception(error)
+
+            raise
+
+        for id_, future in batch.futures.items():
+            future.set_result(id_to_entity.get(id_))
+
+
+class AsyncBatchLoader:
+    """Collects lookups by ID made by coroutines within one event loop iteration (or `window`
+    seconds), and sends them as a single batch request. See `BatchLoader`."""
+
+    def __init__(
+        self,
+        batch_func: AsyncBatchFunc,
+        window: float = 0.0,
+        max_batch_size: int = 250,
+    ):
+        """
+        Args:
+            batch_func: Coroutine function that takes `ids` (along with the lookups' other
+                keyword arguments) and returns a mapping from each ID found to its entity.
+            window: Time (in seconds) to collect lookups for. If 0, lookups are collected until
+                the event loop's next iteration.
+            max_batch_size: Maximum number of IDs per batch.
+        """
+
+        self.batch_func = batch_func
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self._pending: Dict[str, _Batch] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def load(
+        self, id: str, **kwargs  # pylint: disable=redefined-builtin
+    ) -> Optional[Any]:
+        """Look up an entity by ID, batched with concurrent lookups that have the same keyword
+        arguments."""
+
+        loop = asyncio.get_running_loop()
+        group = _get_group(kwargs)
+        batch = self._pending.get(group)
+
+        if batch is None:
+            batch = self._pending[group] = _Batch(kwargs)
+
+            if self.window:
+                loop.call_later(self.window, self._dispatch, group, batch)
+            else:
+                loop.call_soon(self._dispatch, group, batch)
+
+        future = batch.futures.get(id)
+
+        if future is None:
+            future = batch.futures[id] = loop.create_future()
+
+        if len(batch.futures) >= self.max_batch_size:
+            self._dispatch(group, batch)
+
+        return await asyncio.shield(future)
+
+    def _dispatch(self, group: str, batch: _Batch):
+        if self._pending.get(group) is not batch:
+            return
+
+        del self._pending[group]
+        task = asyncio.ensure_future(self._send(batch))
+        # Keep a reference, so that the task isn't garbage collected while it runs.
+        self._tasks.append(task)
+        task.add_done_callback(self._tasks.remove)
+
+    async def _send(self, batch: _Batch):
+        self.batches += 1
+
+        try:
+            id_to_entity = await self.batch_func(
+                ids=list(batch.futures), **batch.kwargs
+            )
+        except asyncio.CancelledError:
+            for future in batch.futures.values():
+                future.cancel()
+
+            raise
+        except Exception as error:  # pylint: disable=broad-except
+            for future in batch.futures.values():
+                if not future.done():
+                    future.set_exception(error)
+
+            return
+
+        for id_, future in batch.futures.items():
+            if not future.done():
+                future.set_result(id_to_entity.get(id_))
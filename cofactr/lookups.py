@@ -0,0 +1,613 @@
+"""Building product lookups and handling their responses, for `GraphAPI` and `AsyncGraphAPI`.
+
+The clients only differ in how they send requests (blocking, across threads, or awaited, across
+tasks), so everything else lives here: resolving schemas, building query parameters and
+`/batch/products/` bodies, splitting IDs into batches, and merging what the batches return into
+a method's results, raising `PartialResultsError` or `PoisonItemsError` for inputs that didn't
+make it.
+"""
+# pylint: disable=too-many-arguments
+# Python Modules
+from enum import Enum
+import json
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib.parse import quote, urlencode
+
+# 3rd Party Modules
+import httpx
+from more_itertools import batched, flatten
+
+# Local Modules
+from cofactr.aliases import AliasMap, unfinished_inputs
+from cofactr.batch_sizing import BatchSizer, chunk_ids
+from cofactr.bisection import PoisonItemsError
+from cofactr.deadline import PartialResultsError
+from cofactr.helpers import drop_none_values
+from cofactr.planner import FetchPlan, FetchPlanner, get_freshness
+from cofactr.schema import ProductSchemaName, schema_to_product
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+MAX_BATCH_SIZE = 250
+MAX_SUB_BATCH_SIZE = 25
+REQUIRED_FIELDS = ["id", "deprecated_ids"]
+
+
+class SearchStrategy(str, Enum):
+    """Search strategy."""
+
+    DEFAULT = "default"
+    MPN_SKU_MFR = "mpn_sku_mfr"
+
+
+class IdLookupMethod(str, Enum):
+    """How to send the IDs of a lookup by IDs."""
+
+    # A GET of `/products/` per batch, with the IDs in the `filtering` query parameter. Up to 250
+    # IDs per request, which makes for URLs several kilobytes long.
+    FILTER = "filter"
+    # A POST of `/batch/products/` per batch, with the IDs in the body, split into sub-requests of
+    # up to 25 IDs. Keeps URLs short, and allows up to 250 sub-requests (6250 IDs) per request.
+    BATCH = "batch"
+
+
+def resolve_schema(schema, schema_enum, fields: Optional[str]) -> Tuple[Any, Any]:
+    """Get the schema's enum member (if it's one) and its value, validating field expansion."""
+
+    schema_class = schema if isinstance(schema, schema_enum) else None
+
+    if (schema_class and fields) and (schema_class is not schema_enum.INTERNAL):
+        raise ValueError("Field expansion is not supported for the targeted schema.")
+
+    return schema_class, schema_class.value if schema_class else schema
+
+
+def get_query_params(
+    schema_value: Optional[str],
+    external: Optional[bool],
+    force_refresh: bool,
+    stale_delta: Optional[str],
+    fields: Optional[str],
+    search_strategy: Optional[SearchStrategy] = None,
+) -> Dict[str, Any]:
+    """Get the query parameters shared by every sub-request of a search or job batch."""
+
+    return drop_none_values(
+        {
+            "schema": schema_value,
+            "external": bool(external),
+            "force_refresh": force_refresh,
+            "stale_delta": stale_delta,
+            "fields": fields,
+            "search_strategy": search_strategy.value if search_strategy else None,
+        }
+    )
+
+
+def get_request_params(
+    owner_id: Optional[str], reference: Optional[str], options: Optional[Dict]
+) -> Dict[str, Any]:
+    """Get the query parameters of a `/batch/products/` (or jobs) request itself."""
+
+    return drop_none_values({"owner_id": owner_id, "ref": reference, **(options or {})})
+
+
+def get_id_filter(ids: Sequence[str]) -> List[Dict[str, Any]]:
+    """Get a `filtering` value that matches entities by ID."""
+
+    return [{"field": "id", "operator": "IN", "value": ids}]
+
+
+def get_id_lookup_size(lookup_method: IdLookupMethod) -> int:
+    """Get the most IDs the server accepts per lookup request."""
+
+    if lookup_method is IdLookupMethod.BATCH:
+        return MAX_BATCH_SIZE * MAX_SUB_BATCH_SIZE
+
+    return MAX_BATCH_SIZE
+
+
+def get_id_lookup_batch(
+    ids: Sequence[str],
+    query_params: Dict[str, Any],
+    sub_batch_size: int = MAX_SUB_BATCH_SIZE,
+) -> List[Dict[str, str]]:
+    """Get `/batch/products/` sub-requests that look up products by ID, `sub_batch_size` IDs
+    each."""
+
+    encoded_query_params = urlencode(drop_none_values(query_params))
+
+    return [
+        {
+            "method": "GET",
+            "relative_url": f"?filtering={filtering}&{encoded_query_params}",
+        }
+        for ids_ in batched(ids, n=sub_batch_size)
+        if (filtering := quote(json.dumps(get_id_filter(ids_))))
+    ]
+
+
+def get_id_lookup_products(res: httpx.Response) -> List[Any]:
+    """Get the products from a `/batch/products/` response to ID lookups.
+
+    Raises:
+        httpx.HTTPStatusError: If a sub-request failed.
+        ValueError: If the response isn't a list of sub-responses.
+    """
+
+    responses = res.json()
+
+    if not isinstance(responses, list):
+        raise ValueError("Unexpected batch response.")
+
+    products: List[Dict[str, Any]] = []
+
+    for response in responses:
+        if response["code"] != httpx.codes.OK:
+            httpx.Response(
+                response["code"], json=response.get("body"), request=res.request
+            ).raise_for_status()
+
+        products.extend(response["body"]["data"] or [])
+
+    return products
+
+
+def get_search_batch(
+    queries: Sequence[str], query_params: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Get the body of a `/batch/products/` request with a search sub-request per query."""
+
+    encoded_query_params = urlencode(query_params)
+
+    return {
+        "batch": [
+            {
+                "method": "GET",
+                "relative_url": f"?q={quote(query)}&{encoded_query_params}",
+            }
+            for query in queries
+        ]
+    }
+
+
+def get_search_results(
+    queries: Sequence[str],
+    res: httpx.Response,
+    schema_class: Optional[ProductSchemaName],
+    alias_map: AliasMap,
+) -> Dict[str, List[Any]]:
+    """Get the products found for each query from a `/batch/products/` search response. Queries
+    whose sub-requests failed found none."""
+
+    responses = res.json()
+    query_to_products: Dict[str, List[Any]] = {}
+
+    if isinstance(responses, list):
+        for query, response in zip(queries, responses):
+            query_to_products[query] = (
+                parse_products(response["body"]["data"], schema_class, alias_map)
+                if response["code"] == httpx.codes.OK
+                else []
+            )
+
+    return query_to_products
+
+
+def get_job_sub_batch_size(
+    batch_sizer: Optional[BatchSizer],
+    schema_value: Optional[str],
+    fields: Optional[str],
+) -> int:
+    """Get how many IDs to put in each sub-request of a job.
+
+    The server processes jobs in the background, so sub-requests are sized by the response sizes
+    observed for the schema (and not by latency).
+    """
+
+    if not batch_sizer:
+        return MAX_SUB_BATCH_SIZE
+
+    return batch_sizer.get_size(
+        get_products_batch_key(schema_value, fields),
+        max_size=MAX_SUB_BATCH_SIZE,
+        by_latency=False,
+    )
+
+
+def get_job_id(res: httpx.Response) -> str:
+    """Get the ID of the job a job creation response points to."""
+
+    location = res.headers.get("location")
+
+    if not location:
+        raise ValueError("No resource location found in job creation response.")
+
+    # Remove `/jobs/` to get the ID from the resource path.
+    return location[6:]
+
+
+def add_required_fields(fields: Optional[str]) -> Optional[str]:
+    """Add the fields needed to match products to IDs, if fields are given."""
+
+    if not fields:
+        return fields
+
+    parsed_fields = fields.split(",")
+
+    for required_field in REQUIRED_FIELDS:
+        if required_field not in parsed_fields:
+            fields = f"{required_field},{fields}"
+
+    return fields
+
+
+def drop_required_fields(product: Any, fields: Optional[str]) -> Any:
+    """Drop the fields added by `add_required_fields` from an unparsed product, unless they were
+    requested."""
+
+    if isinstance(product, dict):
+        parsed_fields = fields.split(",") if fields else []
+
+        for required_field in REQUIRED_FIELDS:
+            if required_field not in parsed_fields:
+                product.pop(required_field, None)
+
+    return product
+
+
+def get_products_batch_key(
+    schema_value: Optional[str], fields: Optional[str]
+) -> Tuple[str, Optional[str], Optional[str]]:
+    """Get the key a `BatchSizer` keeps observations of product lookups by ID under, so that
+    inline lookups and job sub-requests for the same schema and fields share them."""
+
+    return ("products", schema_value, add_required_fields(fields))
+
+
+def get_entity_ids(entity: Any) -> List[str]:
+    """Get an entity's ID and deprecated IDs, whether it's been parsed or not."""
+
+    if isinstance(entity, dict):
+        return [entity["id"], *(entity.get("deprecated_ids") or [])]
+
+    return [entity.id, *(getattr(entity, "deprecated_ids", None) or [])]
+
+
+def parse_products(
+    products: List[Any],
+    schema_class: Optional[ProductSchemaName],
+    alias_map: AliasMap,
+) -> List[Any]:
+    """Record products' IDs in the alias map, and parse them by the schema, if it has a
+    parser."""
+
+    alias_map.observe(products)
+
+    Product = (  # pylint: disable=invalid-name
+        schema_to_product.get(schema_class) if schema_class else None
+    )
+
+    if Product:
+        return [Product(**data) for data in products]
+
+    return products
+
+
+def parse_products_response(
+    res_json: Any, schema_class: Optional[ProductSchemaName], alias_map: AliasMap
+) -> Any:
+    """Parse the products of a `/products/` response (see `parse_products`)."""
+
+    res_data = res_json and res_json.get("data")
+
+    if isinstance(res_data, list):
+        res_json["data"] = parse_products(res_data, schema_class, alias_map)
+
+    return res_json
+
+
+def split_outcomes(
+    outcomes: Iterable[Tuple[List[R], List[T]]]
+) -> Tuple[List[R], List[T]]:
+    """Flatten the outcomes of batches sent through `bisect_batch`: the results of every request
+    that succeeded, and the items that failed on their own."""
+
+    results: List[R] = []
+    poison: List[T] = []
+
+    for batch_results, batch_poison in outcomes:
+        results.extend(batch_results)
+        poison.extend(batch_poison)
+
+    return results, poison
+
+
+def raise_incomplete(results: Any, unfinished: List[Any], poison: List[Any]):
+    """Raise `PartialResultsError` if some inputs didn't finish before the deadline (listing
+    poison inputs as unfinished too), or `PoisonItemsError` if some failed on their own."""
+
+    if unfinished:
+        raise PartialResultsError(results=results, unfinished=[*unfinished, *poison])
+
+    if poison:
+        raise PoisonItemsError(results=results, poison=poison)
+
+
+def merge_search_results(
+    outcomes: List[Tuple[List[Dict[str, List[Any]]], List[str]]],
+    unfinished_batches: Sequence[Sequence[str]],
+) -> Dict[str, List[Any]]:
+    """Merge the results of a search's batches, as returned by `get_search_results`."""
+
+    batches, poison = split_outcomes(outcomes)
+    query_to_products = {
+        query: products for batch in batches for query, products in batch.items()
+    }
+
+    raise_incomplete(
+        query_to_products, unfinished=list(flatten(unfinished_batches)), poison=poison
+    )
+
+    return query_to_products
+
+
+def merge_by_ids(
+    responses: List[Dict[str, Any]],
+    ids: List[str],
+    unfinished_batches: Sequence[Sequence[str]],
+) -> Dict[str, Any]:
+    """Map each requested ID to its entity, from the responses to ID-filtered batch requests."""
+
+    id_to_entity = {
+        id_: entity
+        for res in responses
+        for entity in res["data"]
+        for id_ in get_entity_ids(entity)
+    }
+    results = {id_: id_to_entity[id_] for id_ in ids if id_ in id_to_entity}
+
+    raise_incomplete(results, unfinished=list(flatten(unfinished_batches)), poison=[])
+
+    return results
+
+
+def merge_canonical_ids(
+    ids: List[str], alias_map: AliasMap, unfinished_batches: Sequence[Sequence[str]]
+) -> Dict[str, Optional[str]]:
+    """Map each ID to its canonical ID, once the lookups of unknown IDs have recorded theirs in
+    the alias map."""
+
+    target_id_to_canonical_id = {id_: alias_map.resolve(id_) for id_ in ids}
+
+    raise_incomplete(
+        target_id_to_canonical_id,
+        unfinished=list(flatten(unfinished_batches)),
+        poison=[],
+    )
+
+    return target_id_to_canonical_id
+
+
+class IdLookup:
+    """A lookup of products by ID: the IDs to request and the parameters to request them with,
+    and how to match the products returned to the requested IDs.
+
+    Each product is requested once, by its canonical ID if the alias map knows it.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        alias_map: AliasMap,
+        schema: Union[ProductSchemaName, str],
+        fields: Optional[str],
+        method: IdLookupMethod,
+        external: Optional[bool] = True,
+        force_refresh: bool = False,
+        stale_delta: Optional[str] = None,
+    ):
+        self.alias_map = alias_map
+        self.schema = schema
+        self.schema_class, schema_value = resolve_schema(
+            schema, ProductSchemaName, fields
+        )
+        self.requested_fields = fields
+        self.method = method
+        self.id_to_lookup_id = alias_map.collapse(ids)
+        self.lookup_ids = list(dict.fromkeys(self.id_to_lookup_id.values()))
+        self.batch_key = get_products_batch_key(schema_value, fields)
+        self.query_params = {
+            "schema": schema_value,
+            "external": external,
+            "force_refresh": force_refresh,
+            "stale_delta": stale_delta,
+            "fields": add_required_fields(fields),
+        }
+
+    @classmethod
+    def of_unknown_ids(
+        cls, ids: List[str], alias_map: AliasMap, method: IdLookupMethod
+    ) -> "IdLookup":
+        """Get a lookup of the IDs the alias map doesn't know the canonical IDs of, for just
+        their IDs, from the cache."""
+
+        return cls(
+            [id_ for id_ in ids if alias_map.resolve(id_) is None],
+            alias_map=alias_map,
+            schema=ProductSchemaName.INTERNAL,
+            fields="id,deprecated_ids",
+            method=method,
+            external=False,
+        )
+
+    def chunk(self, batch_sizer: Optional[BatchSizer]) -> List[List[str]]:
+        """Split the IDs to request into batches, sized by a batch sizer if there is one."""
+
+        return chunk_ids(
+            batch_sizer,
+            self.lookup_ids,
+            key=self.batch_key,
+            max_size=get_id_lookup_size(self.method),
+            in_url=self.method is not IdLookupMethod.BATCH,
+        )
+
+    def get_products_kwargs(self, ids: List[str]) -> Dict[str, Any]:
+        """Get the arguments of a `get_products` call that looks up a batch of IDs."""
+
+        return {
+            **self.query_params,
+            "schema": self.schema,
+            "filtering": get_id_filter(ids),
+            "limit": MAX_BATCH_SIZE,
+        }
+
+    def get_batch(self, ids: List[str]) -> Dict[str, Any]:
+        """Get the body of a `/batch/products/` request that looks up a batch of IDs."""
+
+        return {
+            "batch": get_id_lookup_batch(
+                ids,
+                query_params={
+                    **self.query_params,
+                    "limit": MAX_SUB_BATCH_SIZE,
+                    "search_strategy": SearchStrategy.DEFAULT.value,
+                },
+            )
+        }
+
+    def parse_batch(self, res: httpx.Response) -> Dict[str, Any]:
+        """Get a `/batch/products/` response's products, parsed like `get_products` does."""
+
+        return {
+            "data": parse_products(
+                get_id_lookup_products(res), self.schema_class, self.alias_map
+            )
+        }
+
+    def merge(
+        self,
+        outcomes: List[Tuple[List[Dict[str, Any]], List[str]]],
+        unfinished_batches: Sequence[Sequence[str]],
+    ) -> Dict[str, Any]:
+        """Map each requested ID to its product, from the responses to the lookup's batches."""
+
+        responses, poison_ids = split_outcomes(outcomes)
+        id_to_product = {
+            id_: product
+            for res in responses
+            for product in res["data"]
+            for id_ in get_entity_ids(product)
+        }
+        target_id_to_product = {}
+
+        for id_, lookup_id in self.id_to_lookup_id.items():
+            product = id_to_product.get(id_) or id_to_product.get(lookup_id)
+
+            if product is not None:
+                target_id_to_product[id_] = product
+
+        for product in target_id_to_product.values():
+            drop_required_fields(product, self.requested_fields)
+
+        raise_incomplete(
+            target_id_to_product,
+            unfinished=unfinished_inputs(
+                self.id_to_lookup_id, list(flatten(unfinished_batches))
+            ),
+            poison=unfinished_inputs(self.id_to_lookup_id, poison_ids),
+        )
+
+        return target_id_to_product
+
+
+def get_id_to_requested_ids(
+    ids: List[str], alias_map: AliasMap
+) -> Dict[str, List[str]]:
+    """Map each ID a product may be returned under (a requested ID, or its canonical ID if known)
+    to the requested IDs it answers."""
+
+    id_to_requested_ids: Dict[str, List[str]] = {}
+
+    for id_, lookup_id in alias_map.collapse(ids).items():
+        for product_id in dict.fromkeys([id_, lookup_id]):
+            id_to_requested_ids.setdefault(product_id, []).append(id_)
+
+    return id_to_requested_ids
+
+
+def match_products(
+    products: List[Dict[str, Any]],
+    id_to_requested_ids: Dict[str, List[str]],
+    schema: Union[ProductSchemaName, str],
+    fields: Optional[str],
+    alias_map: AliasMap,
+) -> Iterator[Tuple[str, Any]]:
+    """Match products (from a response's data) to the requested IDs they answer (see
+    `get_id_to_requested_ids`), shaping each as `get_products_by_ids` does."""
+
+    schema_class, _ = resolve_schema(schema, ProductSchemaName, None)
+
+    for product in parse_products(products, schema_class, alias_map):
+        matched_ids = list(
+            dict.fromkeys(
+                requested_id
+                for id_ in get_entity_ids(product)
+                for requested_id in id_to_requested_ids.get(id_, [])
+            )
+        )
+
+        if not matched_ids:
+            continue
+
+        drop_required_fields(product, fields)
+
+        for id_ in matched_ids:
+            yield id_, product
+
+
+def get_fetch_key(
+    schema: Union[ProductSchemaName, str], fields: Optional[str], freshness: str
+) -> Hashable:
+    """Get the key a `FetchPlanner` keeps the latencies of inline fetches under."""
+
+    return (getattr(schema, "value", schema), fields, freshness)
+
+
+def plan_fetch(
+    fetch_planner: FetchPlanner,
+    ids: int,
+    schema: Union[ProductSchemaName, str],
+    fields: Optional[str],
+    external: Optional[bool],
+    force_refresh: bool,
+    stale_delta: Optional[str],
+    max_concurrency: int,
+) -> FetchPlan:
+    """Estimate how long fetching products by ID inline would take, and pick the strategy to
+    fetch them with. See `GraphAPI.plan_fetch`."""
+
+    freshness = get_freshness(
+        external=external, force_refresh=force_refresh, stale_delta=stale_delta
+    )
+
+    return fetch_planner.estimate(
+        ids,
+        key=get_fetch_key(schema, fields, freshness),
+        freshness=freshness,
+        batch_size=MAX_BATCH_SIZE,
+        max_concurrency=max_concurrency,
+    )
@@ -0,0 +1,140 @@
+"""Choosing between inline batch requests and the jobs API for fetching products by ID."""
+# Standard Modules
+from enum import Enum
+import math
+from threading import Lock
+from typing import Dict, Hashable, NamedTuple, Optional
+
+
+class FetchStrategy(str, Enum):
+    """How to fetch products by ID."""
+
+    # Concurrent `get_products_by_ids` batches, answered within the request.
+    INLINE = "inline"
+    # Jobs (see `create_get_products_by_ids_job`), processed by the server in the background.
+    JOBS = "jobs"
+
+
+class FetchPlan(NamedTuple):
+    """The strategy chosen for a fetch, and the estimate it was chosen by."""
+
+    strategy: FetchStrategy
+    requests: int
+    estimated_seconds: float
+
+
+def get_freshness(
+    external: Optional[bool], force_refresh: bool, stale_delta: Optional[str]
+) -> str:
+    """Get how much of a lookup may be answered from cached data: "cached" (all of it),
+    "external" (whatever isn't stale) or "refresh" (none of it)."""
+
+    if force_refresh:
+        return "refresh"
+
+    if not external or stale_delta in ("inf", "infinite"):
+        return "cached"
+
+    return "external"
+
+
+class FetchPlanner:
+    """Estimates how long fetching products by ID inline would take, and picks the jobs API when
+    it'd take longer than `max_inline_seconds`.
+
+    The estimate is the number of rounds of concurrent batch requests, times the time each takes:
+    a fixed overhead plus a time per ID. The time per ID starts from a default for the lookup's
+    freshness (see `get_freshness`), since external sources are far slower than the cache, and
+    then follows the latencies recorded for each kind of lookup (its "key": schema, fields and
+    freshness).
+
+    Thread-safe. A single instance may be shared by several clients.
+    """
+
+    DEFAULT_SECONDS_PER_ID = {"cached": 0.002, "external": 0.02, "refresh": 0.2}
+
+    def __init__(
+        self,
+        max_inline_seconds: float = 60.0,
+        request_overhead: float = 0.2,
+        smoothing: float = 0.3,
+    ):
+        """
+        Args:
+            max_inline_seconds: Longest a fetch is expected to take inline before it's sent to
+                the jobs API instead.
+            request_overhead: Time (in seconds) each request takes regardless of its IDs.
+            smoothing: Weight of each new observation in the running estimates, from 0 to 1.
+        """
+
+        if not 0 < smoothing <= 1:
+            raise ValueError("Expected a smoothing factor in (0, 1].")
+
+        self.max_inline_seconds = max_inline_seconds
+        self.request_overhead = request_overhead
+        self.smoothing = smoothing
+        self._seconds_per_id: Dict[Hashable, float] = {}
+        self._lock = Lock()
+
+    def get_seconds_per_id(self, key: Hashable, freshness: str) -> float:
+        """Get the estimated time (in seconds) per ID for a kind of lookup."""
+
+        with self._lock:
+            seconds_per_id = self._seconds_per_id.get(key)
+
+        if seconds_per_id is None:
+            return self.DEFAULT_SECONDS_PER_ID.get(
+                freshness, self.DEFAULT_SECONDS_PER_ID["external"]
+            )
+
+        return seconds_per_id
+
+    def estimate(
+        self,
+        ids: int,
+        key: Hashable,
+        freshness: str,
+        batch_size: int,
+        max_concurrency: int,
+    ) -> FetchPlan:
+        """Estimate how long fetching IDs inline would take, and pick a strategy by it.
+
+        Args:
+            ids: Number of IDs to fetch.
+            key: Kind of lookup.
+            freshness: See `get_freshness`.
+            batch_size: Most IDs per inline request.
+            max_concurrency: Most inline requests in flight at once.
+        """
+
+        requests = math.ceil(ids / batch_size)
+        rounds = math.ceil(requests / max(max_concurrency, 1))
+        per_request = self.request_overhead + min(
+            ids, batch_size
+        ) * self.get_seconds_per_id(key, freshness)
+        estimated_seconds = rounds * per_request
+        strategy = (
+            FetchStrategy.JOBS
+            if estimated_seconds > self.max_inline_seconds
+            else FetchStrategy.INLINE
+        )
+
+        return FetchPlan(
+            strategy=strategy, requests=requests, estimated_seconds=estimated_seconds
+        )
+
+    def record(self, key: Hashable, ids: int, seconds: float):
+        """Record how long an inline request for IDs took."""
+
+        if ids < 1:
+            return
+
+        seconds_per_id = max(seconds - self.request_overhead, 0.0) / ids
+
+        with self._lock:
+            previous = self._seconds_per_id.get(key)
+            self._seconds_per_id[key] = (
+                seconds_per_id
+                if previous is None
+                else (1 - self.smoothing) * previous + self.smoothing * seconds_per_id
+            )
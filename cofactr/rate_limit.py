@@ -0,0 +1,248 @@
+"""Client-side rate limiting."""
+# Standard Modules
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from threading import Lock
+import time
+from typing import Dict, Optional
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.deadline import apply_deadline, check_wait
+from cofactr.endpoints import EndpointFamily, get_endpoint_family
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a `Retry-After` header, given either in seconds or as an HTTP date.
+
+    Returns:
+        Seconds to wait, or `None` if the header is missing or malformed.
+    """
+
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TokenBucket:  # pylint: disable=too-many-instance-attributes
+    """A token bucket whose rate adapts to throttling (additive increase, multiplicative
+    decrease).
+
+    Safe to share between threads and event loops: the lock is only held to reserve a token, and
+    waiting for the token happens outside of it.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        decrease_factor: float = 0.5,
+        increase_step: Optional[float] = None,
+    ):
+        """
+        Args:
+            rate: Maximum (and initial) number of requests per second.
+            burst: Number of requests that can be sent at once after a quiet period. Defaults to
+                `rate`.
+            min_rate: Floor for the rate when throttled. Defaults to a tenth of `rate`.
+            decrease_factor: Factor the rate is multiplied by when throttled.
+            increase_step: Requests per second added back after each successful response.
+                Defaults to a hundredth of `rate`.
+        """
+
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(burst or rate, 1.0)
+        self.min_rate = min_rate or rate / 10
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step or rate / 100
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token.
+
+        Returns:
+            Seconds to wait before the token may be used.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self):
+        """Block until a request may be sent."""
+
+        wait = self.reserve()
+
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a request may be sent."""
+
+        wait = self.reserve()
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        """Slow down after the server throttled a request."""
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+
+            if retry_after is not None:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def on_success(self):
+        """Speed back up after the server accepted a request."""
+
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+
+class RateLimiter:
+    """Token buckets for each endpoint family.
+
+    A single instance may be shared by several `GraphAPI` and `AsyncGraphAPI` instances that use
+    the same API key.
+
+    Example:
+        `RateLimiter(rates={EndpointFamily.PRODUCTS: 20, EndpointFamily.BATCH: 2})`
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Dict[EndpointFamily, float]] = None,
+        default_rate: Optional[float] = None,
+    ):
+        """
+        Args:
+            rates: Maximum requests per second for each endpoint family.
+            default_rate: Maximum requests per second for each endpoint family without an explicit
+                rate. If not given, those families aren't limited.
+        """
+
+        self.buckets: Dict[EndpointFamily, TokenBucket] = {
+            family: TokenBucket(rate=rate) for family, rate in (rates or {}).items()
+        }
+
+        if default_rate:
+            for family in EndpointFamily:
+                self.buckets.setdefault(family, TokenBucket(rate=default_rate))
+
+    def get_bucket(self, request: httpx.Request) -> Optional[TokenBucket]:
+        """Get the bucket that limits the given request, if any."""
+
+        return self.buckets.get(get_endpoint_family(request.url.path))
+
+    @staticmethod
+    def observe(bucket: TokenBucket, response: httpx.Response):
+        """Adapt a bucket's rate to a response."""
+
+        if response.status_code == httpx.codes.TOO_MANY_REQUESTS:
+            bucket.on_throttled(
+                retry_after=parse_retry_after(response.headers.get("Retry-After"))
+            )
+        elif response.status_code < 500:
+            bucket.on_success()
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Transport that waits for a rate limiter before sending each request.
+
+    Waits are bounded by the current deadline (see `deadline_scope`): a request that would have to
+    wait past it raises `DeadlineExceeded` without waiting, and the timeouts of a request that did
+    wait are cut to the time remaining.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, rate_limiter: RateLimiter):
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        bucket = self.rate_limiter.get_bucket(request)
+
+        if not bucket:
+            return self.transport.handle_request(request)
+
+        wait = bucket.reserve()
+
+        if wait > 0:
+            check_wait(wait, request)
+            time.sleep(wait)
+            apply_deadline(request)
+
+        response = self.transport.handle_request(request)
+        self.rate_limiter.observe(bucket, response)
+
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async transport that waits for a rate limiter before sending each request. See
+    `RateLimitedTransport`."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, rate_limiter: RateLimiter):
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        bucket = self.rate_limiter.get_bucket(request)
+
+        if not bucket:
+            return await self.transport.handle_async_request(request)
+
+        wait = bucket.reserve()
+
+        if wait > 0:
+            check_wait(wait, request)
+            await asyncio.sleep(wait)
+            apply_deadline(request)
+
+        response = await self.transport.handle_async_request(request)
+        self.rate_limiter.observe(bucket, response)
+
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,309 @@
+"""Retry policy: which failures to retry, how long to wait and how many retries to allow."""
+# Standard Modules
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+import random
+from threading import Lock
+import time
+from typing import Deque, FrozenSet, Iterator, List, Optional, Tuple, Type
+
+# 3rd Party Modules
+import httpx
+from tenacity import RetryCallState
+
+# Local Modules
+from cofactr.deadline import get_current_deadline
+from cofactr.keepalive import is_warmup_request
+from cofactr.rate_limit import parse_retry_after
+
+RETRYABLE_STATUS_CODES = frozenset(
+    {
+        httpx.codes.TOO_MANY_REQUESTS,
+        httpx.codes.BAD_GATEWAY,
+        httpx.codes.SERVICE_UNAVAILABLE,
+        httpx.codes.GATEWAY_TIMEOUT,
+    }
+)
+# Failures that show the server never processed the request, so even a request that isn't safe to
+# repeat may be retried.
+UNPROCESSED_STATUS_CODES = frozenset({httpx.codes.TOO_MANY_REQUESTS})
+UNPROCESSED_EXCEPTIONS: Tuple[Type[BaseException], ...] = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+)
+
+
+class RetryBudget:
+    """Caps retries at a fraction of the requests sent over a sliding window.
+
+    During an outage every request fails, and unbounded retries multiply the load on a server
+    that's already struggling. A budget lets retries paper over sporadic failures, but stops them
+    once they would exceed `ratio` of recent traffic. So that a mostly idle process can still
+    retry, `min_retries` are allowed within the window regardless of traffic; once `ratio` of the
+    traffic exceeds that floor, retries never exceed `ratio`.
+
+    Thread-safe. A single instance may be shared by several clients, to cap their retries
+    together.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_retries: int = 3,
+        window: float = 10.0,
+    ):
+        """
+        Args:
+            ratio: Maximum retries as a fraction of requests sent within the window.
+            min_retries: Retries allowed within the window regardless of traffic. Set to 0 for
+                a strict cap.
+            window: Length (in seconds) of the sliding window.
+        """
+
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        # [second, requests, retries] for each second within the window.
+        self._buckets: Deque[List[int]] = deque()
+        self._lock = Lock()
+
+    def _current_bucket(self) -> List[int]:
+        """Get the bucket for the current second. Must be called with the lock held."""
+
+        now = int(time.monotonic())
+
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0])
+
+        return self._buckets[-1]
+
+    @property
+    def requests(self) -> int:
+        """Requests sent within the window."""
+
+        with self._lock:
+            self._current_bucket()
+
+            return sum(bucket[1] for bucket in self._buckets)
+
+    @property
+    def retries(self) -> int:
+        """Retries made within the window."""
+
+        with self._lock:
+            self._current_bucket()
+
+            return sum(bucket[2] for bucket in self._buckets)
+
+    def record_request(self):
+        """Record a request being sent."""
+
+        with self._lock:
+            self._current_bucket()[1] += 1
+
+    def try_retry(self) -> bool:
+        """Withdraw a retry from the budget.
+
+        Returns:
+            Whether the retry is allowed.
+        """
+
+        with self._lock:
+            current = self._current_bucket()
+            requests = sum(bucket[1] for bucket in self._buckets)
+            retries = sum(bucket[2] for bucket in self._buckets)
+            allowed = max(self.ratio * requests, self.min_retries)
+
+            if retries >= allowed:
+                return False
+
+            current[2] += 1
+
+            return True
+
+    def hook(self, request: httpx.Request):
+        """Request event hook for `httpx.Client`. Warmup and keep-alive health checks aren't
+        counted, so an idle client can't build up retries from its own pings."""
+
+        if not is_warmup_request(request):
+            self.record_request()
+
+    async def async_hook(self, request: httpx.Request):
+        """Request event hook for `httpx.AsyncClient`."""
+
+        self.hook(request)
+
+
+def _get_retry_after(exception: Optional[BaseException]) -> Optional[float]:
+    if isinstance(exception, httpx.HTTPStatusError):
+        return parse_retry_after(exception.response.headers.get("Retry-After"))
+
+    return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retry policy for GraphAPI methods.
+
+    Retries timeouts and responses with a retryable status code, waiting with exponential backoff
+    and decorrelated jitter (so that clients failing together don't retry in lockstep), or as
+    long as the server asks with `Retry-After`. If `budget` is given, retries are withdrawn from
+    it. Retries stop once the current deadline (see `cofactr.deadline`) has passed.
+
+    Requests that aren't safe to repeat (such as creating a product) follow
+    `for_non_idempotent()` instead.
+
+    The `retry`, `stop` and `wait` methods implement tenacity's strategy interface.
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 20.0
+    retry_status_codes: FrozenSet[int] = RETRYABLE_STATUS_CODES
+    retry_exceptions: Tuple[Type[BaseException], ...] = (
+        httpx.ConnectTimeout,
+        httpx.ReadTimeout,
+    )
+    respect_retry_after: bool = True
+    max_retry_after: float = 60.0
+    budget: Optional[RetryBudget] = field(default=None, compare=False)
+
+    def for_non_idempotent(self) -> "RetryPolicy":
+        """Get a policy for requests that aren't safe to repeat, which only retries failures that
+        show the server never processed the request (connection failures and `429`)."""
+
+        return replace(
+            self,
+            retry_status_codes=self.retry_status_codes & UNPROCESSED_STATUS_CODES,
+            retry_exceptions=tuple(
+                exception_type
+                for exception_type in self.retry_exceptions
+                if issubclass(exception_type, UNPROCESSED_EXCEPTIONS)
+            ),
+        )
+
+    def is_retryable(self, exception: Optional[BaseException]) -> bool:
+        """Whether a failure may succeed if retried."""
+
+        if isinstance(exception, httpx.HTTPStatusError):
+            status_code = exception.response.status_code
+
+            return (
+                status_code in self.retry_status_codes
+                and status_code not in _exhausted_status_codes.get()
+            )
+
+        return isinstance(exception, self.retry_exceptions)
+
+    def retry(self, retry_state: RetryCallState) -> bool:
+        """Whether to retry after an attempt."""
+
+        if not retry_state.outcome or not retry_state.outcome.failed:
+            return False
+
+        exception = retry_state.outcome.exception()
+
+        if not self.is_retryable(exception):
+            return False
+
+        if retry_state.attempt_number >= self.max_attempts:
+            return False
+
+        deadline = get_current_deadline()
+
+        if deadline and deadline.expired:
+            return False
+
+        retry_after = _get_retry_after(exception)
+
+        if (
+            self.respect_retry_after
+            and retry_after is not None
+            and retry_after > self.max_retry_after
+        ):
+            return False
+
+        return self.budget is None or self.budget.try_retry()
+
+    def stop(self, retry_state: RetryCallState) -> bool:
+        """Whether to give up after an attempt."""
+
+        return retry_state.attempt_number >= self.max_attempts
+
+    def wait(self, retry_state: RetryCallState) -> float:
+        """Seconds to wait before the next attempt."""
+
+        previous = getattr(retry_state, "previous_sleep", None) or self.base_delay
+        sleep = min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+        setattr(retry_state, "previous_sleep", sleep)
+
+        if self.respect_retry_after and retry_state.outcome:
+            retry_after = _get_retry_after(retry_state.outcome.exception())
+
+            if retry_after is not None:
+                sleep = max(sleep, retry_after)
+
+        deadline = get_current_deadline()
+
+        if deadline:
+            sleep = min(sleep, deadline.remaining)
+
+        return sleep
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+_exhausted_status_codes: ContextVar[FrozenSet[int]] = ContextVar(
+    "cofactr_exhausted_status_codes", default=frozenset()
+)
+
+
+@contextmanager
+def retries_exhausted(status_code: int) -> Iterator[None]:
+    """Don't retry responses with the given status code within the scope, e.g. because retrying
+    it already failed for a request that the scope's requests are part of."""
+
+    token = _exhausted_status_codes.set(_exhausted_status_codes.get() | {status_code})
+
+    try:
+        yield
+    finally:
+        _exhausted_status_codes.reset(token)
+
+
+def get_retry_policy(retry_state: RetryCallState) -> RetryPolicy:
+    """Get the retry policy of the GraphAPI instance whose method is being retried."""
+
+    instance = retry_state.args[0] if retry_state.args else None
+
+    return getattr(instance, "retry_policy", None) or DEFAULT_RETRY_POLICY
+
+
+def retry_by_policy(retry_state: RetryCallState) -> bool:
+    """Tenacity retry strategy that defers to the instance's retry policy."""
+
+    return get_retry_policy(retry_state).retry(retry_state)
+
+
+def retry_non_idempotent_by_policy(retry_state: RetryCallState) -> bool:
+    """Tenacity retry strategy that defers to the instance's retry policy, for requests that
+    aren't safe to repeat."""
+
+    return get_retry_policy(retry_state).for_non_idempotent().retry(retry_state)
+
+
+def stop_by_policy(retry_state: RetryCallState) -> bool:
+    """Tenacity stop strategy that defers to the instance's retry policy."""
+
+    return get_retry_policy(retry_state).stop(retry_state)
+
+
+def wait_by_policy(retry_state: RetryCallState) -> float:
+    """Tenacity wait strategy that defers to the instance's retry policy."""
+
+    return get_retry_policy(retry_state).wait(retry_state)
@@ -0,0 +1,204 @@
+"""Response compression and transfer accounting."""
+# Standard Modules
+from collections import deque
+from dataclasses import dataclass
+import gzip
+import json
+from threading import Lock
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.endpoints import EndpointFamily, get_endpoint_family
+from cofactr.keepalive import is_warmup_request
+
+try:
+    from httpx._decoders import SUPPORTED_DECODERS
+
+    SUPPORTED_ENCODINGS: Set[str] = set(SUPPORTED_DECODERS)
+except ImportError:  # pragma: no cover
+    SUPPORTED_ENCODINGS = {"gzip", "deflate"}
+
+# Most to least preferred. Brotli and Zstandard are only offered if httpx can decode them, which
+# depends on the optional `brotli` and `zstandard` packages (and, for Zstandard, the httpx
+# version).
+ACCEPT_ENCODING = ", ".join(
+    encoding
+    for encoding in ["zstd", "br", "gzip", "deflate"]
+    if encoding in SUPPORTED_ENCODINGS
+)
+
+
+class TransferRecord(NamedTuple):
+    """Bytes transferred by a single response."""
+
+    method: str
+    path: str
+    family: EndpointFamily
+    schema: Optional[str]
+    status_code: int
+    content_encoding: Optional[str]
+    compressed_bytes: int
+    decompressed_bytes: int
+
+
+@dataclass
+class TransferTotals:
+    """Bytes transferred across many responses."""
+
+    calls: int = 0
+    compressed_bytes: int = 0
+    decompressed_bytes: int = 0
+
+    @property
+    def saved_bytes(self) -> int:
+        """Bytes that compression kept off the wire."""
+
+        return self.decompressed_bytes - self.compressed_bytes
+
+    @property
+    def compression_ratio(self) -> float:
+        """Decompressed size over compressed size."""
+
+        return (
+            self.decompressed_bytes / self.compressed_bytes
+            if self.compressed_bytes
+            else 1.0
+        )
+
+
+def _get_schema(request: httpx.Request) -> Optional[str]:
+    """Get the response schema requested, including from `/batch/` sub-requests."""
+
+    schema = request.url.params.get("schema")
+
+    if schema or request.method != "POST":
+        return schema
+
+    try:
+        content = request.content
+
+        if request.headers.get("Content-Encoding") == "gzip":
+            content = gzip.decompress(content)
+
+        batch = json.loads(content)["batch"]
+        query = urlsplit(batch[0]["relative_url"]).query
+    except (
+        ValueError,
+        KeyError,
+        IndexError,
+        TypeError,
+        OSError,
+        httpx.RequestNotRead,
+    ):
+        return None
+
+    schemas = parse_qs(query).get("schema") or []
+
+    return schemas[0] if schemas else None
+
+
+class TransferStats:
+    """Thread-safe record of compressed and decompressed bytes per call.
+
+    Totals are kept per endpoint family and schema, so the heaviest schemas on the wire can be
+    found, while only the most recent individual records are kept.
+    """
+
+    def __init__(self, max_records: int = 1000):
+        self._lock = Lock()
+        self.records: Deque[TransferRecord] = deque(maxlen=max_records)
+        self.totals: Dict[Tuple[EndpointFamily, Optional[str]], TransferTotals] = {}
+
+    def record(self, response: httpx.Response) -> TransferRecord:
+        """Record a response whose body has been read."""
+
+        request = response.request
+        family = get_endpoint_family(request.url.path)
+        schema = _get_schema(request)
+        record = TransferRecord(
+            method=request.method,
+            path=request.url.path,
+            family=family,
+            schema=schema,
+            status_code=response.status_code,
+            content_encoding=response.headers.get("content-encoding"),
+            compressed_bytes=response.num_bytes_downloaded,
+            decompressed_bytes=len(response.content),
+        )
+
+        with self._lock:
+            self.records.append(record)
+            totals = self.totals.setdefault((family, schema), TransferTotals())
+            totals.calls += 1
+            totals.compressed_bytes += record.compressed_bytes
+            totals.decompressed_bytes += record.decompressed_bytes
+
+        return record
+
+    def hook(self, response: httpx.Response):
+        """Response event hook for `httpx.Client`. Warmup and keep-alive health checks aren't
+        recorded."""
+
+        if is_warmup_request(response.request):
+            return
+
+        response.read()
+        self.record(response)
+
+    async def async_hook(self, response: httpx.Response):
+        """Response event hook for `httpx.AsyncClient`. See `hook`."""
+
+        if is_warmup_request(response.request):
+            return
+
+        await response.aread()
+        self.record(response)
+
+    def by_schema(self) -> List[Tuple[Optional[str], TransferTotals]]:
+        """Totals per schema, heaviest on the wire first."""
+
+        schema_to_totals: Dict[Optional[str], TransferTotals] = {}
+
+        with self._lock:
+            for (_, schema), totals in self.totals.items():
+                combined = schema_to_totals.setdefault(schema, TransferTotals())
+                combined.calls += totals.calls
+                combined.compressed_bytes += totals.compressed_bytes
+                combined.decompressed_bytes += totals.decompressed_bytes
+
+        return sorted(
+            schema_to_totals.items(),
+            key=lambda item: item[1].compressed_bytes,
+            reverse=True,
+        )
+
+    def reset(self):
+        """Forget everything recorded so far."""
+
+        with self._lock:
+            self.records.clear()
+            self.totals.clear()
+
+
+def encode_json_body(
+    data: Any, headers: Dict[str, str], compression_threshold: Optional[int]
+) -> Dict[str, Any]:
+    """Encode a JSON request body, gzip-compressing it if it's at least `compression_threshold`
+    bytes.
+
+    Returns:
+        `content` and `headers` keyword arguments for an httpx request.
+    """
+
+    content = json.dumps(data).encode("utf-8")
+    headers = {**headers, "Content-Type": "application/json"}
+
+    if compression_threshold is not None and len(content) >= compression_threshold:
+        content = gzip.compress(content, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+
+    return {"content": content, "headers": headers}
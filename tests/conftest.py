@@ -0,0 +1,114 @@
+"""Helpers shared by the tests."""
+# Standard Modules
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# 3rd Party Modules
+import httpx
+
+
+class StandInGraph:
+    """Stands in for the graph API's product endpoints, both requested directly and through
+    `/batch/products/`.
+
+    Filtered lookups get one product per ID (under its canonical ID, if `merges` maps it to one),
+    searches get one product per query, and products and their offers can be read by ID. Lookups
+    of an item in `failing` get `status_code`, as the response to a direct request or as the
+    sub-response in a batch.
+
+    Subclasses may override `get_product`, `get_products` and `search` to serve other documents.
+
+    Attributes:
+        requests: Every request received.
+        batches: Sub-requests of each batch request.
+        lookups: Items (IDs or queries) of each lookup, direct or in a batch.
+    """
+
+    def __init__(
+        self,
+        merges: Optional[Mapping[str, str]] = None,
+        failing: Iterable[str] = (),
+        status_code: int = 500,
+    ):
+        self.merges = dict(merges or {})
+        self.failing = set(failing)
+        self.status_code = status_code
+        self.requests: List[httpx.Request] = []
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.lookups: List[List[str]] = []
+
+    def get_product(self, id_: str, params: Mapping[str, str]) -> Dict[str, Any]:
+        """Get the product with a canonical ID."""
+
+        return {
+            "id": id_,
+            "deprecated_ids": [old for old, new in self.merges.items() if new == id_],
+            "mpn": f"MPN-{id_}",
+        }
+
+    def get_products(
+        self, ids: List[str], params: Mapping[str, str]
+    ) -> List[Dict[str, Any]]:
+        """Get the products of a filtered lookup: one per canonical ID."""
+
+        canonical_ids = dict.fromkeys(self.merges.get(id_, id_) for id_ in ids)
+
+        return [self.get_product(id_, params) for id_ in canonical_ids]
+
+    def search(self, query: str, params: Mapping[str, str]) -> List[Dict[str, Any]]:
+        """Get the products matching a query."""
+
+        return self.get_products([query], params)
+
+    def respond(self, relative_url: str) -> Tuple[int, Any]:
+        """Get the status code and body of a sub-request, by its URL relative to `/products/`."""
+
+        url = urlsplit(relative_url)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        return self._respond(url.path, params)
+
+    def _respond(self, path: str, params: Mapping[str, str]) -> Tuple[int, Any]:
+        if "q" in params:
+            items = [params["q"]]
+        elif "filtering" in params:
+            items = json.loads(params["filtering"])[0]["value"]
+        else:
+            items = [path.split("/")[0]]
+
+        self.lookups.append(items)
+
+        if self.failing & set(items):
+            return self.status_code, {"detail": "Failed."}
+
+        if "q" in params:
+            return 200, {"data": self.search(params["q"], params)}
+
+        if "filtering" in params:
+            return 200, {"data": self.get_products(items, params)}
+
+        if path.endswith("/offers"):
+            return 200, {"data": [{"id": f"{items[0]}-OFFER"}]}
+
+        return 200, {"data": self.get_product(items[0], params)}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+
+        if request.url.path == "/batch/products/":
+            batch = json.loads(request.content)["batch"]
+            self.batches.append(batch)
+            responses = []
+
+            for sub_request in batch:
+                code, body = self.respond(sub_request["relative_url"])
+                responses.append({"code": code, "body": body})
+
+            return httpx.Response(200, json=responses)
+
+        # Drop the entity type (e.g. `/products/`), as every type is looked up alike.
+        _, _, path = request.url.path.strip("/").partition("/")
+        code, body = self._respond(path, dict(request.url.params))
+
+        return httpx.Response(code, json=body)
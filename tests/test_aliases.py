@@ -0,0 +1,183 @@
+"""Test mapping deprecated product IDs to canonical IDs."""
+# Standard Modules
+import asyncio
+import json
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.aliases import AliasMap
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI
+
+# Deprecated IDs, and the IDs they were merged into.
+MERGES = {"OLD0": "NEW0", "OLD1": "NEW1"}
+
+
+def make_products_handler():
+    """Make a handler that responds with one product per filtered ID (under its canonical ID, if
+    it's been merged), and records the IDs of each request."""
+
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/products/ID"):
+            id_ = request.url.path.split("/")[-1]
+
+            return httpx.Response(
+                200, json={"data": {"id": id_, "deprecated_ids": [f"{id_}-OLD"]}}
+            )
+
+        ids = json.loads(request.url.params["filtering"])[0]["value"]
+        requested.append(ids)
+        products = {}
+
+        for id_ in ids:
+            canonical_id = MERGES.get(id_, id_)
+            products[canonical_id] = {
+                "id": canonical_id,
+                "deprecated_ids": [
+                    old for old, new in MERGES.items() if new == canonical_id
+                ],
+            }
+
+        return httpx.Response(200, json={"data": list(products.values())})
+
+    return handler, requested
+
+
+class TestAliasMap:
+    """Test the alias map."""
+
+    def test_resolves_chained_merges(self):
+        """Test IDs resolve to the latest canonical ID."""
+
+        alias_map = AliasMap()
+        alias_map.record("B", ["A"])
+        alias_map.record("C", ["B"])
+
+        assert alias_map.resolve("A") == "C"
+        assert alias_map.resolve("C") == "C"
+        assert alias_map.resolve("D") is None
+        assert alias_map.collapse(["A", "B", "D"]) == {"A": "C", "B": "C", "D": "D"}
+
+    def test_stale_records_keep_merges(self):
+        """Test seeing a deprecated ID as its own `id` (e.g. in a stale record) keeps its merge."""
+
+        alias_map = AliasMap()
+        alias_map.record("C", ["X"])
+        alias_map.record("X")
+
+        assert alias_map.resolve("X") == "C"
+        assert alias_map.collapse(["X", "C"]) == {"X": "C", "C": "C"}
+
+        alias_map.observe([{"id": "X", "deprecated_ids": []}])
+
+        assert alias_map.resolve("X") == "C"
+
+    def test_collapses_duplicate_and_deprecated_ids(self):
+        """Test each product is requested once, by its canonical ID once that's known."""
+
+        handler, requested = make_products_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        first = graph.get_products_by_ids(
+            ids=["OLD0", "OLD0", "ID2"], schema="internal"
+        )
+        second = graph.get_products_by_ids(
+            ids=["OLD0", "NEW0", "ID2"], schema="internal"
+        )
+
+        assert requested == [["OLD0", "ID2"], ["NEW0", "ID2"]]
+        assert set(first) == {"OLD0", "ID2"}
+        assert set(second) == {"OLD0", "NEW0", "ID2"}
+        assert second["OLD0"] is second["NEW0"]
+
+    def test_canonical_ids_without_request(self):
+        """Test known IDs are answered from the map, and only unknown IDs are requested."""
+
+        handler, requested = make_products_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+        graph.get_product(id="ID5", schema="internal")
+
+        assert graph.get_canonical_product_ids(ids=["OLD1", "ID5", "ID5-OLD"]) == {
+            "OLD1": "NEW1",
+            "ID5": "ID5",
+            "ID5-OLD": "ID5",
+        }
+        assert requested == [["OLD1"]]
+
+        assert graph.get_canonical_product_ids(ids=["NEW1", "OLD1"]) == {
+            "NEW1": "NEW1",
+            "OLD1": "NEW1",
+        }
+        assert requested == [["OLD1"]]
+
+    def test_persists_to_file(self, tmp_path):
+        """Test the map is saved on close and loaded by the next instance."""
+
+        path = tmp_path / "aliases.json"
+        handler, requested = make_products_handler()
+
+        with GraphAPI(
+            transport=httpx.MockTransport(handler), alias_map=AliasMap(path)
+        ) as graph:
+            graph.get_canonical_product_ids(ids=["OLD0"])
+
+        with GraphAPI(
+            transport=httpx.MockTransport(handler), alias_map=AliasMap(path)
+        ) as graph:
+            assert graph.get_canonical_product_ids(ids=["OLD0"]) == {"OLD0": "NEW0"}
+
+        assert json.loads(path.read_text()) == {"NEW0": "NEW0", "OLD0": "NEW0"}
+        assert requested == [["OLD0"]]
+
+    @pytest.mark.parametrize("content", ['{"OLD0": ', "[]", "\x00\xff"])
+    def test_ignores_unreadable_file(self, tmp_path, content):
+        """Test a corrupt file is treated as an empty map, and replaced on save."""
+
+        path = tmp_path / "aliases.json"
+        path.write_text(content, encoding="latin-1")
+
+        with pytest.warns(UserWarning, match="alias map file"):
+            alias_map = AliasMap(path)
+
+        assert len(alias_map) == 0
+
+        alias_map.record("NEW0", ["OLD0"])
+        alias_map.save()
+
+        assert json.loads(path.read_text()) == {"NEW0": "NEW0", "OLD0": "NEW0"}
+
+    def test_max_size(self, tmp_path):
+        """Test the IDs recorded first are forgotten once the map is full."""
+
+        path = tmp_path / "aliases.json"
+        alias_map = AliasMap(path, max_size=3)
+
+        alias_map.record("NEW0", ["OLD0"])
+        alias_map.record("NEW1", ["OLD1"])
+
+        assert len(alias_map) == 3
+        assert alias_map.resolve("NEW0") is None
+        assert alias_map.resolve("OLD1") == "NEW1"
+
+        alias_map.save()
+
+        assert len(AliasMap(path, max_size=2)) == 2
+
+    def test_async(self):
+        """Test the alias map with `AsyncGraphAPI`."""
+
+        handler, requested = make_products_handler()
+
+        async def run():
+            async with AsyncGraphAPI(transport=httpx.MockTransport(handler)) as graph:
+                await graph.get_products_by_ids(ids=["OLD1"], schema="internal")
+
+                return await graph.get_canonical_product_ids(ids=["OLD1", "NEW1"])
+
+        assert asyncio.run(run()) == {"OLD1": "NEW1", "NEW1": "NEW1"}
+        assert requested == [["OLD1"]]
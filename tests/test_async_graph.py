@@ -0,0 +1,130 @@
+"""Test AsyncGraphAPI."""
+# Standard Modules
+import asyncio
+import json
+
+# 3rd Party Modules
+import httpx
+from tenacity import wait_none
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+
+
+def make_client(handler) -> httpx.AsyncClient:
+    """Make an async HTTP client that routes requests to the given handler."""
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def products_handler(request: httpx.Request) -> httpx.Response:
+    """Respond with one internal-schema product per filtered ID."""
+
+    filtering = json.loads(request.url.params["filtering"])
+    ids = filtering[0]["value"]
+
+    return httpx.Response(
+        200,
+        json={
+            "data": [
+                {"id": id_, "deprecated_ids": [], "mpn": f"MPN-{id_}"} for id_ in ids
+            ]
+        },
+    )
+
+
+class TestAsyncGraphAPI:
+    """Test AsyncGraphAPI."""
+
+    def test_get_products_by_ids(self):
+        """Test getting products by IDs across several batches."""
+
+        ids = [f"ID{i}" for i in range(600)]
+
+        async def main():
+            async with AsyncGraphAPI(client=make_client(products_handler)) as graph:
+                return await graph.get_products_by_ids(ids=ids, schema="internal")
+
+        id_to_product = asyncio.run(main())
+
+        assert list(id_to_product) == ids
+        assert id_to_product["ID42"] == {"mpn": "MPN-ID42"}
+
+    def test_many_requests_in_flight(self):
+        """Test many concurrent requests share one client."""
+
+        in_flight = 0
+        max_in_flight = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, max_in_flight
+
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+            return httpx.Response(200, json={"data": {"id": request.url.path}})
+
+        async def main():
+            async with AsyncGraphAPI(client=make_client(handler)) as graph:
+                return await asyncio.gather(
+                    *[
+                        graph.get_product(id=f"ID{i}", schema="internal")
+                        for i in range(200)
+                    ]
+                )
+
+        results = asyncio.run(main())
+
+        assert len(results) == 200
+        assert max_in_flight == 200
+
+    def test_retries_without_blocking(self):
+        """Test retried calls wait with the event loop rather than blocking it."""
+
+        responses = [httpx.ReadTimeout("Test"), httpx.Response(200, json={"data": []})]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            response = responses.pop(0)
+
+            if isinstance(response, Exception):
+                raise response
+
+            return response
+
+        async def main():
+            graph = AsyncGraphAPI(client=make_client(handler))
+            graph.get_orgs.retry.wait = wait_none()
+
+            return await graph.get_orgs(schema="internal")
+
+        assert asyncio.run(main()) == {"data": []}
+
+    def test_get_products_by_ids_concurrently(self):
+        """Test batches are fetched concurrently and merged in input order."""
+
+        ids = [f"ID{i}" for i in range(1_100)]
+        in_flight = 0
+        max_in_flight = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, max_in_flight
+
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+            return products_handler(request)
+
+        async def main():
+            async with AsyncGraphAPI(client=make_client(handler)) as graph:
+                return await graph.get_products_by_ids(
+                    ids=ids, schema="internal", max_concurrency=2
+                )
+
+        id_to_product = asyncio.run(main())
+
+        assert max_in_flight == 2
+        assert list(id_to_product) == ids
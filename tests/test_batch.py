@@ -0,0 +1,151 @@
+"""Test sending mixed reads in batches."""
+# Standard Modules
+import asyncio
+import json
+from types import SimpleNamespace
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI
+from cofactr.retry import RetryPolicy
+from cofactr.schema import ProductSchemaName, schema_to_product
+from tests.conftest import StandInGraph
+
+
+class EchoingStandIn(StandInGraph):
+    """Serves products and search results that echo the parameters they were read with."""
+
+    def get_product(self, id_, params):
+        return {"id": id_, "params": params}
+
+    def search(self, query, params):
+        return [self.get_product(query, params)]
+
+
+def make_batch_handler(status: int = 200):
+    """Make a handler for `/batch/products/` that records each batch it gets, and fails them all
+    with `status` if it isn't 200. Product `MISSING` isn't found."""
+
+    stand_in = EchoingStandIn(failing={"MISSING"}, status_code=404)
+    batches = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/batch/products/"
+
+        response = stand_in(request)
+        batches.append((request.url.params, stand_in.batches[-1]))
+
+        return response if status == httpx.codes.OK else httpx.Response(status)
+
+    return handler, batches
+
+
+class TestBatch:
+    """Test batching mixed reads."""
+
+    def test_mixed_reads(self):
+        """Test reads of different kinds and schemas share a request, and are parsed as their
+        own methods would."""
+
+        handler, batches = make_batch_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        with graph.batch(owner_id="OWNER") as batch:
+            product = batch.get_product(id="ID0", schema="internal")
+            offers = batch.get_offers(product_id="ID0", schema="internal")
+            search = batch.get_products(
+                query="esp32",
+                schema="internal",
+                filtering=[{"field": "mpn", "operator": "EQ", "value": "x"}],
+            )
+            missing = batch.get_product(id="MISSING", schema="internal")
+
+            with pytest.raises(RuntimeError):
+                product.result()
+
+        assert len(batches) == 1
+        assert batches[0][0]["owner_id"] == "OWNER"
+        assert product.result()["data"]["id"] == "ID0"
+        assert offers.result()["data"] == [{"id": "ID0-OFFER"}]
+        assert search.result()["data"][0]["id"] == "esp32"
+        assert json.loads(search.result()["data"][0]["params"]["filtering"]) == [
+            {"field": "mpn", "operator": "EQ", "value": "x"}
+        ]
+
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            missing.result()
+
+        assert error.value.response.status_code == 404
+
+    def test_parses_schema(self, monkeypatch):
+        """Test results are parsed into the requested schema's class."""
+
+        monkeypatch.setitem(
+            schema_to_product, ProductSchemaName.INTERNAL, SimpleNamespace
+        )
+        handler, _ = make_batch_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+        batch = graph.batch()
+        product = batch.get_product(id="ID0", schema=ProductSchemaName.INTERNAL)
+        batch.send()
+
+        assert isinstance(product.result()["data"], SimpleNamespace)
+        assert product.result()["data"].id == "ID0"
+
+    def test_packs_into_fewest_requests(self):
+        """Test reads are packed into requests of at most 250 reads, in order."""
+
+        handler, batches = make_batch_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+        batch = graph.batch(max_concurrency=2)
+
+        for i in range(600):
+            batch.get_product(id=f"ID{i}", schema="internal")
+
+        results = batch.send()
+
+        assert [len(sub_batch) for _, sub_batch in batches] == [250, 250, 100]
+        assert [result.result()["data"]["id"] for result in results] == [
+            f"ID{i}" for i in range(600)
+        ]
+        assert not batch.queued
+
+    def test_failed_request(self):
+        """Test a failed batch request fails each of its reads, after retries."""
+
+        handler, batches = make_batch_handler(status=503)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler),
+            retry_policy=RetryPolicy(base_delay=0, max_delay=0),
+        )
+
+        with graph.batch() as batch:
+            product = batch.get_product(id="ID0", schema="internal")
+
+        assert len(batches) == 3
+
+        with pytest.raises(httpx.HTTPStatusError):
+            product.result()
+
+    def test_async(self):
+        """Test batching reads with `AsyncGraphAPI`."""
+
+        handler, batches = make_batch_handler()
+
+        async def run():
+            async with AsyncGraphAPI(transport=httpx.MockTransport(handler)) as graph:
+                async with graph.batch() as batch:
+                    product = batch.get_product(id="ID0", schema="internal")
+                    offers = batch.get_offers(product_id="ID1", schema="internal")
+
+            return product.result(), offers.result()
+
+        product, offers = asyncio.run(run())
+
+        assert len(batches) == 1
+        assert product["data"]["id"] == "ID0"
+        assert offers["data"] == [{"id": "ID1-OFFER"}]
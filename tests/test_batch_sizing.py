@@ -0,0 +1,157 @@
+"""Test sizing ID batches from observed responses."""
+# Standard Modules
+import asyncio
+import json
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.batch_sizing import BatchSizer, get_encoded_filter_length
+from cofactr.graph import GraphAPI
+from tests.conftest import StandInGraph
+
+# Bytes of padding per product, for each schema.
+SCHEMA_TO_PADDING = {"heavy": 10_000, "internal": 10}
+
+
+class PaddedStandIn(StandInGraph):
+    """Serves products padded to the requested schema's size."""
+
+    def get_product(self, id_, params):
+        return {
+            **super().get_product(id_, params),
+            "padding": "x" * SCHEMA_TO_PADDING[params["schema"]],
+        }
+
+
+def make_products_handler():
+    """Make a handler that responds with one product per filtered ID, padded to the requested
+    schema's size, and records the IDs of each request (or the sub-requests of each job)."""
+
+    stand_in = PaddedStandIn()
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/jobs/"):
+            requested.append(json.loads(request.content)["batch"])
+
+            return httpx.Response(201, headers={"location": "/jobs/JOB0"})
+
+        response = stand_in(request)
+        requested.append(stand_in.lookups[-1])
+
+        return response
+
+    return handler, requested
+
+
+class TestBatchSizer:
+    """Test the batch sizer."""
+
+    def test_sizes_by_response_bytes(self):
+        """Test batches shrink to the target response size, within the given bounds."""
+
+        sizer = BatchSizer(target_response_bytes=100_000, target_latency=10, min_size=5)
+
+        assert sizer.get_size("key", max_size=250) == 250
+
+        sizer.record("key", items=100, response_bytes=1_000_000, latency=0.1)
+
+        assert sizer.get_size("key", max_size=250) == 10
+        assert sizer.get_size("other", max_size=250) == 250
+
+        sizer.record("key", items=10, response_bytes=10_000_000, latency=0.1)
+
+        assert sizer.get_size("key", max_size=250) == 5
+        assert sizer.get_size("key", max_size=3) == 3
+
+    def test_sizes_by_latency(self):
+        """Test batches shrink to the target latency, unless sized by response bytes alone."""
+
+        sizer = BatchSizer(target_latency=1.0)
+        sizer.record("key", items=250, response_bytes=1000, latency=5.0)
+
+        assert sizer.get_size("key", max_size=250) == 50
+        assert sizer.get_size("key", max_size=250, by_latency=False) == 250
+
+    def test_limits_filter_length(self):
+        """Test long IDs are split so that the encoded filter stays short enough."""
+
+        sizer = BatchSizer(max_filter_length=1000)
+        ids = [f"{i:0>100}" for i in range(30)]
+        chunks = sizer.chunk(ids, key="key", max_size=250)
+
+        assert [id_ for chunk in chunks for id_ in chunk] == ids
+        assert len(chunks) > 1
+        assert all(
+            sum(get_encoded_filter_length(id_) for id_ in chunk) <= 1000
+            for chunk in chunks
+        )
+        assert len(sizer.chunk(ids, key="key", max_size=250, in_url=False)) == 1
+
+
+class TestGraphBatchSizing:
+    """Test clients size their batches from observed responses."""
+
+    def test_sizes_per_schema(self):
+        """Test batches of a heavy schema shrink, while a light schema's are unaffected."""
+
+        handler, requested = make_products_handler()
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler),
+            batch_sizer=BatchSizer(target_response_bytes=100_000),
+        )
+        ids = [f"ID{i}" for i in range(100)]
+
+        for schema in ["heavy", "heavy", "internal", "internal"]:
+            products = graph.get_products_by_ids(ids=ids, schema=schema)
+
+            assert set(products) == set(ids)
+
+        assert [len(batch) for batch in requested[:2]] == [100, 10]
+        assert len(requested) == 1 + 10 + 2
+        assert [len(batch) for batch in requested[-2:]] == [100, 100]
+
+    def test_sizes_job_sub_requests(self):
+        """Test job sub-requests shrink for a heavy schema."""
+
+        handler, requested = make_products_handler()
+        sizer = BatchSizer(target_response_bytes=50_000, min_size=1)
+        graph = GraphAPI(transport=httpx.MockTransport(handler), batch_sizer=sizer)
+        ids = [f"ID{i}" for i in range(100)]
+
+        graph.create_get_products_by_ids_job(ids=ids, schema="heavy")
+        graph.get_products_by_ids(ids=ids[:10], schema="heavy")
+        graph.create_get_products_by_ids_job(ids=ids, schema="heavy")
+
+        assert len(requested[0]) == 4
+        assert len(requested[-1]) == 25
+
+        # Inline lookups add the fields needed to match products to IDs, but share observations
+        # with jobs for the fields as given.
+        sizer.reset()
+        graph.get_products_by_ids(ids=ids[:10], schema="heavy", fields="padding")
+        graph.create_get_products_by_ids_job(ids=ids, schema="heavy", fields="padding")
+
+        assert len(requested[-1]) == 25
+
+    def test_async(self):
+        """Test async clients size their batches too."""
+
+        handler, requested = make_products_handler()
+
+        async def run():
+            async with AsyncGraphAPI(
+                transport=httpx.MockTransport(handler),
+                batch_sizer=BatchSizer(target_response_bytes=100_000),
+            ) as graph:
+                ids = [f"ID{i}" for i in range(100)]
+                await graph.get_products_by_ids(ids=ids, schema="heavy")
+                await graph.get_products_by_ids(ids=ids, schema="heavy")
+
+        asyncio.run(run())
+
+        assert [len(batch) for batch in requested[:2]] == [100, 10]
+        assert len(requested) == 11
@@ -0,0 +1,228 @@
+"""Test batched GraphAPI methods."""
+# Standard Modules
+import json
+from threading import Lock
+import time
+
+# 3rd Party Modules
+import httpx
+import pytest
+from tenacity import wait_none
+
+# Local Modules
+from cofactr.graph import GraphAPI
+from cofactr.retry import RetryPolicy
+from tests.conftest import StandInGraph
+
+
+def make_graph(handler) -> GraphAPI:
+    """Make a GraphAPI whose requests are routed to the given handler."""
+
+    return GraphAPI(client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+
+class InFlightCounter:
+    """Track the peak number of concurrent requests."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def __exit__(self, *args):
+        with self.lock:
+            self.in_flight -= 1
+
+
+class MergingStandIn(StandInGraph):
+    """Serves one product per filtered ID, under its own MPN.
+
+    Every third product is returned under a new ID, with the requested ID deprecated.
+    """
+
+    def get_products(self, ids, params):
+        return [
+            {"id": f"NEW{id_}", "deprecated_ids": [id_], "mpn": id_}
+            if i % 3 == 0
+            else {"id": id_, "deprecated_ids": [], "mpn": id_}
+            for i, id_ in enumerate(ids)
+        ]
+
+
+def make_products_handler(counter: InFlightCounter, delay: float = 0.02):
+    """Make a handler that responds like `MergingStandIn`, after a delay."""
+
+    stand_in = MergingStandIn()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        with counter:
+            time.sleep(delay)
+
+        return stand_in(request)
+
+    return handler
+
+
+class TestConcurrentBatches:
+    """Test batches are fetched concurrently and merged deterministically."""
+
+    ids = [f"ID{i}" for i in range(1_100)]
+
+    def test_get_products_by_ids(self):
+        """Test getting products by IDs with several batches in flight."""
+
+        counter = InFlightCounter()
+        graph = make_graph(make_products_handler(counter))
+
+        id_to_product = graph.get_products_by_ids(
+            ids=self.ids, schema="internal", max_concurrency=3
+        )
+
+        assert counter.peak == 3
+        assert list(id_to_product) == self.ids
+        assert all(product["mpn"] == id_ for id_, product in id_to_product.items())
+
+    def test_get_canonical_product_ids(self):
+        """Test getting canonical product IDs with several batches in flight."""
+
+        counter = InFlightCounter()
+        graph = make_graph(make_products_handler(counter))
+
+        id_to_canonical_id = graph.get_canonical_product_ids(
+            ids=self.ids, max_concurrency=8
+        )
+
+        assert counter.peak == 5
+        assert list(id_to_canonical_id) == self.ids
+        assert id_to_canonical_id["ID0"] == "NEWID0"
+        assert id_to_canonical_id["ID1"] == "ID1"
+
+    def test_serial_by_default(self):
+        """Test batches are fetched one at a time by default."""
+
+        counter = InFlightCounter()
+        graph = make_graph(make_products_handler(counter, delay=0))
+
+        graph.get_products_by_ids(ids=self.ids, schema="internal")
+
+        assert counter.peak == 1
+
+
+class TestConcurrentSearches:
+    """Test search batches are posted concurrently."""
+
+    def test_get_products_by_searches(self):
+        """Test each query keeps its own results when batches are in flight together."""
+
+        counter = InFlightCounter()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            with counter:
+                time.sleep(0.02)
+
+            batch = json.loads(request.content)["batch"]
+            queries = [
+                httpx.QueryParams(sub_request["relative_url"][1:])["q"]
+                for sub_request in batch
+            ]
+
+            return httpx.Response(
+                200,
+                json=[
+                    {"code": 404, "body": None}
+                    if query.endswith("7")
+                    else {"code": 200, "body": {"data": [{"mpn": query}]}}
+                    for query in queries
+                ],
+            )
+
+        graph = make_graph(handler)
+        queries = [f"MPN {i}" for i in range(1_000)]
+
+        query_to_products = graph.get_products_by_searches(
+            queries=queries, schema="internal", max_concurrency=4
+        )
+
+        assert counter.peak == 4
+        assert list(query_to_products) == queries
+        assert query_to_products["MPN 17"] == []
+        assert query_to_products["MPN 18"] == [{"mpn": "MPN 18"}]
+
+
+class TestSubBatchRetries:
+    """Test only failed batches are retried."""
+
+    def test_get_products_by_ids(self, monkeypatch):
+        """Test a timed-out batch is retried without refetching the other batches."""
+
+        monkeypatch.setattr(GraphAPI.get_products.retry, "wait", wait_none())
+
+        filtered_ids = []
+        handler = make_products_handler(InFlightCounter(), delay=0)
+
+        def flaky_handler(request: httpx.Request) -> httpx.Response:
+            ids = json.loads(request.url.params["filtering"])[0]["value"]
+            filtered_ids.append(ids[0])
+
+            if filtered_ids.count("ID500") == 1 and ids[0] == "ID500":
+                raise httpx.ReadTimeout("Test", request=request)
+
+            return handler(request)
+
+        graph = make_graph(flaky_handler)
+        ids = [f"ID{i}" for i in range(1_000)]
+
+        id_to_product = graph.get_products_by_ids(ids=ids, schema="internal")
+
+        assert filtered_ids == ["ID0", "ID250", "ID500", "ID500", "ID750"]
+        assert list(id_to_product) == ids
+
+    def test_attempts_are_bounded(self, monkeypatch):
+        """Test a batch that keeps failing is attempted at most three times."""
+
+        monkeypatch.setattr(GraphAPI.get_suppliers.retry, "wait", wait_none())
+
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request)
+
+            raise httpx.ReadTimeout("Test", request=request)
+
+        graph = make_graph(handler)
+
+        with pytest.raises(httpx.ReadTimeout):
+            graph.get_suppliers_by_ids(ids=["ID0"], schema="internal")
+
+        assert len(attempts) == 3
+
+    def test_get_products_by_searches(self):
+        """Test a failed search batch is retried on its own."""
+
+        queries = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            batch = json.loads(request.content)["batch"]
+            queries.append(batch[0]["relative_url"].split("&")[0])
+
+            if len(queries) == 2:
+                return httpx.Response(502, request=request)
+
+            return httpx.Response(
+                200, json=[{"code": 200, "body": {"data": []}} for _ in batch]
+            )
+
+        graph = make_graph(handler)
+        graph.retry_policy = RetryPolicy(base_delay=0, max_delay=0)
+
+        query_to_products = graph.get_products_by_searches(
+            queries=[f"MPN{i}" for i in range(500)], schema="internal"
+        )
+
+        assert queries == ["?q=MPN0", "?q=MPN250", "?q=MPN250"]
+        assert len(query_to_products) == 500
@@ -0,0 +1,196 @@
+"""Test splitting failing batches to isolate the items that make them fail."""
+# Standard Modules
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.bisection import PoisonItemsError, bisect_batch, get_max_requests
+from cofactr.graph import GraphAPI, IdLookupMethod
+from cofactr.retry import RetryPolicy
+from tests.conftest import StandInGraph
+
+POISON = {"ID7", "ID123"}
+
+
+def make_handler(status_code=500):
+    """Make a handler that fails any product lookup containing a poison item, and any search batch
+    containing a poison query as a whole. Records the items of each lookup."""
+
+    stand_in = StandInGraph(failing=POISON, status_code=status_code)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        response = stand_in(request)
+
+        if request.url.path == "/batch/products/" and "q" in parse_qs(
+            urlsplit(stand_in.batches[-1][0]["relative_url"]).query
+        ):
+            if any(sub_response["code"] != 200 for sub_response in response.json()):
+                return httpx.Response(status_code)
+
+        return response
+
+    return handler, stand_in.lookups
+
+
+def make_graph(handler, **kwargs):
+    """Make a client that doesn't retry."""
+
+    return GraphAPI(
+        transport=httpx.MockTransport(handler),
+        retry_policy=RetryPolicy(max_attempts=1),
+        **kwargs,
+    )
+
+
+class TestBisectBatch:
+    """Test splitting a failing batch."""
+
+    def test_isolates_failing_items(self):
+        """Test halves are tried until each failing item is alone."""
+
+        calls = []
+
+        def func(items):
+            calls.append(items)
+
+            if 3 in items:
+                response = httpx.Response(413, request=httpx.Request("GET", "/"))
+                response.raise_for_status()
+
+            return sum(items)
+
+        results, poison = bisect_batch(func, range(8))
+
+        assert poison == [3]
+        assert sum(results) == sum(range(8)) - 3
+        assert len(calls) == 7
+
+    def test_outage_stops_splitting(self):
+        """Test a batch whose every item fails isn't split into single items, and raises its
+        error once the request limit is reached."""
+
+        calls = []
+
+        def func(items):
+            calls.append(items)
+            response = httpx.Response(500, request=httpx.Request("GET", "/"))
+            response.raise_for_status()
+
+        with pytest.raises(httpx.HTTPStatusError):
+            bisect_batch(func, range(250))
+
+        assert len(calls) == 1 + get_max_requests(250, max_poison_items=4)
+        assert len(calls) < 100
+
+    def test_other_errors(self):
+        """Test errors that smaller batches won't fix are raised as they are."""
+
+        def func(_):
+            response = httpx.Response(401, request=httpx.Request("GET", "/"))
+            response.raise_for_status()
+
+        with pytest.raises(httpx.HTTPStatusError):
+            bisect_batch(func, range(8))
+
+
+class TestSplitOnFailure:
+    """Test `split_on_failure` on batch product methods."""
+
+    def test_disabled(self):
+        """Test a failing batch fails the call by default."""
+
+        handler, _ = make_handler()
+        graph = make_graph(handler)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            graph.get_products_by_ids(
+                ids=[f"ID{i}" for i in range(300)], schema="internal"
+            )
+
+    def test_get_products_by_ids(self):
+        """Test poison IDs are reported, and every other ID's product returned."""
+
+        for status_code in (413, 414, 500, 504):
+            handler, lookups = make_handler(status_code)
+            graph = make_graph(handler)
+            ids = [f"ID{i}" for i in range(300)]
+
+            with pytest.raises(PoisonItemsError) as error:
+                graph.get_products_by_ids(
+                    ids=ids, schema="internal", split_on_failure=True
+                )
+
+            assert sorted(error.value.poison) == sorted(POISON)
+            assert set(error.value.results) == set(ids) - POISON
+            assert [len(ids) for ids in lookups].count(1) == 4
+
+    def test_retries_run_out_once(self):
+        """Test a retryable failure is retried for the whole batch, but not for its halves."""
+
+        handler, lookups = make_handler(504)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler),
+            retry_policy=RetryPolicy(max_attempts=2, base_delay=0, max_delay=0),
+        )
+        ids = [f"ID{i}" for i in range(300)]
+
+        with pytest.raises(PoisonItemsError) as error:
+            graph.get_products_by_ids(ids=ids, schema="internal", split_on_failure=True)
+
+        assert sorted(error.value.poison) == sorted(POISON)
+        assert [len(ids) for ids in lookups].count(250) == 2
+        assert [len(ids) for ids in lookups].count(1) == 4
+
+    def test_batch_lookup_method(self):
+        """Test failing sub-requests of ID lookups over POST are split too."""
+
+        handler, _ = make_handler()
+        graph = make_graph(handler, id_lookup_method=IdLookupMethod.BATCH)
+        ids = [f"ID{i}" for i in range(300)]
+
+        with pytest.raises(PoisonItemsError) as error:
+            graph.get_products_by_ids(ids=ids, schema="internal", split_on_failure=True)
+
+        assert sorted(error.value.poison) == sorted(POISON)
+        assert set(error.value.results) == set(ids) - POISON
+
+    def test_get_products_by_searches(self):
+        """Test poison queries are reported, and every other query's results returned."""
+
+        handler, _ = make_handler()
+        graph = make_graph(handler)
+        queries = [f"ID{i}" for i in range(300)]
+
+        with pytest.raises(PoisonItemsError) as error:
+            graph.get_products_by_searches(
+                queries=queries, schema="internal", split_on_failure=True
+            )
+
+        assert sorted(error.value.poison) == sorted(POISON)
+        assert set(error.value.results) == set(queries) - POISON
+
+    def test_async(self):
+        """Test async clients split failing batches too."""
+
+        handler, _ = make_handler()
+        ids = [f"ID{i}" for i in range(300)]
+
+        async def run():
+            async with AsyncGraphAPI(
+                transport=httpx.MockTransport(handler),
+                retry_policy=RetryPolicy(max_attempts=1),
+            ) as graph:
+                return await graph.get_products_by_ids(
+                    ids=ids, schema="internal", split_on_failure=True
+                )
+
+        with pytest.raises(PoisonItemsError) as error:
+            asyncio.run(run())
+
+        assert sorted(error.value.poison) == sorted(POISON)
+        assert set(error.value.results) == set(ids) - POISON
@@ -0,0 +1,210 @@
+"""Test client-side circuit breaking."""
+# Standard Modules
+import asyncio
+import time
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from cofactr.deadline import deadline_scope
+from cofactr.endpoints import HEALTH_CHECK_TIMEOUT, EndpointFamily
+from cofactr.graph import GraphAPI
+from cofactr.retry import RetryPolicy
+
+
+class Backend:
+    """Mock backend whose products endpoints can be made to fail."""
+
+    def __init__(self):
+        self.paths = []
+        self.products_status = 503
+        self.health_status = 200
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.paths.append(request.url.path)
+
+        if request.url.path == "/":
+            return httpx.Response(self.health_status, json={})
+
+        if request.url.path.startswith("/products"):
+            return httpx.Response(self.products_status, json={"data": []})
+
+        return httpx.Response(200, json={"data": []})
+
+
+def make_graph(backend: Backend, circuit_breaker: CircuitBreaker) -> GraphAPI:
+    """Make a GraphAPI that sends requests to the backend without retrying."""
+
+    return GraphAPI(
+        transport=httpx.MockTransport(backend),
+        circuit_breaker=circuit_breaker,
+        retry_policy=RetryPolicy(max_attempts=1, budget=None),
+    )
+
+
+def trip(graph: GraphAPI, calls: int):
+    """Send failing product requests."""
+
+    for _ in range(calls):
+        with pytest.raises(httpx.HTTPStatusError):
+            graph.get_products(query="esp32", schema="internal")
+
+
+class TestCircuitBreaker:
+    """Test circuits open, fail fast and close again."""
+
+    def test_opens_and_fails_fast(self):
+        """Test a circuit opens at the failure rate, after which requests aren't sent."""
+
+        backend = Backend()
+        circuit_breaker = CircuitBreaker(min_calls=4, failure_rate_threshold=0.5)
+        graph = make_graph(backend, circuit_breaker)
+
+        trip(graph, calls=4)
+
+        assert (
+            circuit_breaker.circuits[EndpointFamily.PRODUCTS].state is CircuitState.OPEN
+        )
+
+        with pytest.raises(CircuitOpenError) as exc_info:
+            graph.get_products(query="esp32", schema="internal")
+
+        assert exc_info.value.family is EndpointFamily.PRODUCTS
+        assert len(backend.paths) == 4
+
+        # Other endpoint families are unaffected.
+        graph.get_orgs(query="digikey", schema="internal")
+
+    def test_timeouts_count_as_failures(self):
+        """Test transport errors count towards the failure rate."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ReadTimeout("Test", request=request)
+
+        circuit_breaker = CircuitBreaker(min_calls=2)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler),
+            circuit_breaker=circuit_breaker,
+            retry_policy=RetryPolicy(max_attempts=1, budget=None),
+        )
+
+        for _ in range(2):
+            with pytest.raises(httpx.ReadTimeout):
+                graph.get_product(id="ID0", schema="internal")
+
+        with pytest.raises(CircuitOpenError):
+            graph.get_product(id="ID0", schema="internal")
+
+    def test_half_open_probe_closes(self):
+        """Test a successful probe after the open duration closes the circuit."""
+
+        backend = Backend()
+        circuit_breaker = CircuitBreaker(min_calls=2, open_duration=0.05)
+        graph = make_graph(backend, circuit_breaker)
+
+        trip(graph, calls=2)
+        time.sleep(0.06)
+        backend.products_status = 200
+
+        graph.get_products(query="esp32", schema="internal")
+
+        assert (
+            circuit_breaker.circuits[EndpointFamily.PRODUCTS].state
+            is CircuitState.CLOSED
+        )
+
+    def test_half_open_probe_reopens(self):
+        """Test a failed probe opens the circuit again."""
+
+        backend = Backend()
+        circuit_breaker = CircuitBreaker(min_calls=2, open_duration=0.05)
+        graph = make_graph(backend, circuit_breaker)
+
+        trip(graph, calls=2)
+        time.sleep(0.06)
+        trip(graph, calls=1)
+
+        with pytest.raises(CircuitOpenError):
+            graph.get_products(query="esp32", schema="internal")
+
+    def test_health_check_probes(self):
+        """Test an open circuit is probed with a health check before letting requests through."""
+
+        backend = Backend()
+        circuit_breaker = CircuitBreaker(
+            min_calls=2, open_duration=0.05, health_check=True
+        )
+        graph = make_graph(backend, circuit_breaker)
+
+        trip(graph, calls=2)
+        time.sleep(0.06)
+        backend.health_status = 503
+
+        with pytest.raises(CircuitOpenError):
+            graph.get_products(query="esp32", schema="internal")
+
+        assert backend.paths[-1] == "/"
+
+        time.sleep(0.06)
+        backend.health_status = 200
+        backend.products_status = 200
+        backend.paths.clear()
+
+        graph.get_products(query="esp32", schema="internal")
+
+        assert backend.paths == ["/", "/products/"]
+        assert (
+            circuit_breaker.circuits[EndpointFamily.PRODUCTS].state
+            is CircuitState.CLOSED
+        )
+
+    def test_health_check_timeout(self):
+        """Test health checks time out with the request they're sent for, within the deadline
+        and `HEALTH_CHECK_TIMEOUT`."""
+
+        request = httpx.Request(
+            "GET",
+            "https://graph.cofactr.com/products/",
+            extensions={
+                "timeout": {"connect": 1.0, "read": None, "write": 60.0, "pool": None}
+            },
+        )
+
+        assert CircuitBreaker.get_health_check(request).extensions["timeout"] == {
+            "connect": 1.0,
+            "read": HEALTH_CHECK_TIMEOUT,
+            "write": HEALTH_CHECK_TIMEOUT,
+            "pool": HEALTH_CHECK_TIMEOUT,
+        }
+
+        with deadline_scope(0.5):
+            timeout = CircuitBreaker.get_health_check(request).extensions["timeout"]
+
+        assert all(value <= 0.5 for value in timeout.values())
+
+    def test_async(self):
+        """Test async requests fail fast while the circuit is open."""
+
+        backend = Backend()
+        circuit_breaker = CircuitBreaker(min_calls=2)
+
+        async def run():
+            async with AsyncGraphAPI(
+                transport=httpx.MockTransport(backend),
+                circuit_breaker=circuit_breaker,
+                retry_policy=RetryPolicy(max_attempts=1, budget=None),
+            ) as graph:
+                for _ in range(2):
+                    with pytest.raises(httpx.HTTPStatusError):
+                        await graph.get_products(query="esp32", schema="internal")
+
+                with pytest.raises(CircuitOpenError):
+                    await graph.get_products(query="esp32", schema="internal")
+
+        asyncio.run(run())
+
+        assert len(backend.paths) == 2
@@ -0,0 +1,131 @@
+"""Test the pooled HTTP client owned by GraphAPI."""
+
+# Standard Modules
+import asyncio
+import functools
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from benchmarks.standin import StandInServer
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI
+from cofactr.retry import RetryBudget, RetryPolicy
+
+
+def make_client(handler) -> httpx.Client:
+    """Make an HTTP client that routes requests to the given handler."""
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+class TestClient:
+    """Test the pooled HTTP client owned by GraphAPI."""
+
+    def test_requests_share_client(self):
+        """Test every endpoint is routed through the same client."""
+
+        paths = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            paths.append(request.url.path)
+
+            return httpx.Response(200, json={"data": []})
+
+        graph = GraphAPI(client_id="id", api_key="key", client=make_client(handler))
+
+        graph.get_products(query="esp32", schema="internal")
+        graph.get_orgs(query="digikey", schema="internal")
+        graph.get_offers(product_id="CCCQSA3G9SMR", schema="internal")
+
+        assert paths == ["/products/", "/orgs", "/products/CCCQSA3G9SMR/offers"]
+
+    def test_sends_credentials(self):
+        """Test credentials are sent as headers."""
+
+        headers = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            headers.append(request.headers)
+
+            return httpx.Response(200, json={"data": None})
+
+        graph = GraphAPI(client_id="id", api_key="key", client=make_client(handler))
+
+        graph.get_org(id="622fb450e4c292d8287b0af5", schema="internal")
+
+        assert headers[0]["X-CLIENT-ID"] == "id"
+        assert headers[0]["X-API-KEY"] == "key"
+
+    def test_context_manager_closes_owned_client(self):
+        """Test the context manager closes a client created by GraphAPI."""
+
+        with GraphAPI() as graph:
+            client = graph.client
+
+        assert client.is_closed
+
+    def test_close_leaves_external_client_open(self):
+        """Test a client passed in by the caller is not closed."""
+
+        client = make_client(lambda request: httpx.Response(200))
+
+        with GraphAPI(client=client):
+            pass
+
+        assert not client.is_closed
+
+    def test_http2(self):
+        """Test HTTP/2 is negotiated when requested."""
+
+        pytest.importorskip("h2")
+        graph = AsyncGraphAPI(http2=True)
+        transport = graph.client._transport  # pylint: disable=protected-access
+
+        assert transport._pool._http2  # pylint: disable=protected-access
+
+    def test_http2_concurrent_requests(self, mocker):
+        """Test concurrent batches are multiplexed over one HTTP/2 connection."""
+
+        pytest.importorskip("h2")
+        # The stand-in server is cleartext, so skip HTTP/1.1 and negotiate HTTP/2 directly.
+        mocker.patch(
+            "cofactr.async_graph.httpx.AsyncHTTPTransport",
+            functools.partial(httpx.AsyncHTTPTransport, http1=False),
+        )
+        ids = [f"CC{i:010}" for i in range(8000)]
+
+        async def run(host: str):
+            async with AsyncGraphAPI(protocol="http", host=host, http2=True) as graph:
+                return await graph.get_products_by_ids(
+                    ids=ids, schema="internal", max_concurrency=32
+                )
+
+        with StandInServer() as server:
+            id_to_product = asyncio.run(run(server.host))
+
+        assert list(id_to_product) == ids
+        assert server.protocols == ["HTTP/2"]
+
+    def test_http2_falls_back_without_h2(self, mocker):
+        """Test HTTP/1.1 is used if the h2 package isn't installed."""
+
+        mocker.patch("cofactr.async_graph.find_spec", return_value=None)
+
+        with pytest.warns(UserWarning, match="Falling back to HTTP/1.1"):
+            graph = AsyncGraphAPI(http2=True)
+
+        transport = graph.client._transport  # pylint: disable=protected-access
+
+        assert not transport._pool._http2  # pylint: disable=protected-access
+
+    def test_leaves_external_client_hooks(self):
+        """Test a client passed in by the caller doesn't get GraphAPI's event hooks."""
+
+        client = make_client(lambda request: httpx.Response(200, json={}))
+
+        GraphAPI(client=client, retry_policy=RetryPolicy(budget=RetryBudget()))
+
+        assert client.event_hooks == {"request": [], "response": []}
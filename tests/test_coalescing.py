@@ -0,0 +1,210 @@
+"""Test coalescing concurrent identical requests."""
+# Standard Modules
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import time
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI
+from cofactr.retry import RetryPolicy
+
+
+def make_slow_handler(delay: float, status: int = 200):
+    """Make a handler that responds after a delay and records the requests it gets."""
+
+    lock = Lock()
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        with lock:
+            calls.append(request)
+
+        time.sleep(delay)
+
+        return httpx.Response(status, json={"data": {"id": request.url.path}})
+
+    return handler, calls
+
+
+def make_async_slow_handler(delay: float):
+    """Make an async handler that responds after a delay and records the requests it gets."""
+
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(delay)
+
+        return httpx.Response(200, json={"data": {"id": request.url.path}})
+
+    return handler, calls
+
+
+class TestSingleFlight:
+    """Test coalescing in `GraphAPI`."""
+
+    def test_shares_in_flight_request(self):
+        """Test concurrent identical calls share one request and its result."""
+
+        handler, calls = make_slow_handler(delay=0.1)
+        graph = GraphAPI(transport=httpx.MockTransport(handler), coalesce_requests=True)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(
+                    graph.get_product, id="ID0", schema="internal", timeout=10 + i
+                )
+                for i in range(8)
+            ]
+            results = [future.result() for future in futures]
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert (graph.single_flight.calls, graph.single_flight.shared) == (1, 7)
+
+    def test_distinguishes_arguments(self):
+        """Test calls with different endpoints or arguments aren't coalesced."""
+
+        handler, calls = make_slow_handler(delay=0.1)
+        graph = GraphAPI(transport=httpx.MockTransport(handler), coalesce_requests=True)
+        calls_to_make = [
+            (graph.get_product, {"id": "ID0", "schema": "internal"}),
+            (graph.get_product, {"id": "ID1", "schema": "internal"}),
+            (graph.get_product, {"id": "ID0", "schema": "flagship"}),
+            (graph.get_product, {"id": "ID0", "schema": "internal", "owner_id": "O"}),
+            (graph.get_offers, {"product_id": "ID0", "schema": "internal"}),
+        ]
+
+        with ThreadPoolExecutor(max_workers=len(calls_to_make)) as executor:
+            for future in [
+                executor.submit(method, **kwargs) for method, kwargs in calls_to_make
+            ]:
+                future.result()
+
+        assert len(calls) == len(calls_to_make)
+
+    def test_only_coalesces_overlapping_calls(self):
+        """Test a call made after another finished sends a new request."""
+
+        handler, calls = make_slow_handler(delay=0)
+        graph = GraphAPI(transport=httpx.MockTransport(handler), coalesce_requests=True)
+
+        graph.get_supplier(id="ID0", schema="internal")
+        graph.get_supplier(id="ID0", schema="internal")
+
+        assert len(calls) == 2
+
+    def test_shares_errors(self):
+        """Test an error is raised to every caller that shared the request."""
+
+        handler, calls = make_slow_handler(delay=0.1, status=404)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler),
+            coalesce_requests=True,
+            retry_policy=RetryPolicy(max_attempts=1),
+        )
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(graph.get_org, id="ID0", schema="internal")
+                for _ in range(4)
+            ]
+
+            for future in futures:
+                with pytest.raises(httpx.HTTPStatusError):
+                    future.result()
+
+        assert len(calls) == 1
+
+    def test_follower_timeout(self):
+        """Test a call that joins one in flight gives up after its own timeout."""
+
+        handler, calls = make_slow_handler(delay=0.2)
+        graph = GraphAPI(transport=httpx.MockTransport(handler), coalesce_requests=True)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(graph.get_product, id="ID0", schema="internal")
+            time.sleep(0.05)
+            follower = executor.submit(
+                graph.get_product, id="ID0", schema="internal", timeout=0.05
+            )
+
+            with pytest.raises(httpx.ReadTimeout):
+                follower.result()
+
+            assert not leader.done()
+            assert leader.result()["data"]["id"] == "/products/ID0"
+
+        assert len(calls) == 1
+
+    def test_disabled_by_default(self):
+        """Test calls aren't coalesced unless enabled."""
+
+        handler, calls = make_slow_handler(delay=0.05)
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for future in [
+                executor.submit(graph.get_product, id="ID0", schema="internal")
+                for _ in range(4)
+            ]:
+                future.result()
+
+        assert len(calls) == 4
+
+    def test_async(self):
+        """Test concurrent identical coroutines share one request, even if a caller is
+        cancelled."""
+
+        handler, calls = make_async_slow_handler(delay=0.1)
+
+        async def run():
+            async with AsyncGraphAPI(
+                transport=httpx.MockTransport(handler), coalesce_requests=True
+            ) as graph:
+                first = asyncio.ensure_future(
+                    graph.get_product(id="ID0", schema="internal")
+                )
+                await asyncio.sleep(0.01)
+                rest = asyncio.gather(
+                    *[graph.get_product(id="ID0", schema="internal") for _ in range(4)]
+                )
+                first.cancel()
+
+                return await rest, graph.single_flight
+
+        results, single_flight = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert (single_flight.calls, single_flight.shared) == (1, 4)
+
+    def test_async_follower_timeout(self):
+        """Test a coroutine that joins a call in flight gives up after its own timeout."""
+
+        handler, calls = make_async_slow_handler(delay=0.2)
+
+        async def run():
+            async with AsyncGraphAPI(
+                transport=httpx.MockTransport(handler), coalesce_requests=True
+            ) as graph:
+                leader = asyncio.ensure_future(
+                    graph.get_product(id="ID0", schema="internal")
+                )
+                await asyncio.sleep(0.05)
+
+                with pytest.raises(httpx.ReadTimeout):
+                    await graph.get_product(id="ID0", schema="internal", timeout=0.05)
+
+                assert not leader.done()
+
+                return await leader
+
+        assert asyncio.run(run())["data"]["id"] == "/products/ID0"
+        assert len(calls) == 1
@@ -0,0 +1,145 @@
+"""Test adaptive concurrency limiting."""
+# Standard Modules
+import asyncio
+import json
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.concurrency import AdaptiveConcurrencyLimit
+from tests.test_batching import InFlightCounter, make_graph, make_products_handler
+
+
+def sample(limit: AdaptiveConcurrencyLimit, rtt: float, dropped: bool = False):
+    """Record a latency sample as if a request had completed."""
+
+    with limit._condition:  # pylint: disable=protected-access
+        limit._update(rtt=rtt, dropped=dropped)  # pylint: disable=protected-access
+
+
+class TestAdaptiveConcurrencyLimit:
+    """Test the limit adapts to latency."""
+
+    def test_grows_while_latency_is_flat(self):
+        """Test the limit grows up to its maximum while latency doesn't change."""
+
+        limit = AdaptiveConcurrencyLimit(initial_limit=4, max_limit=16)
+
+        for _ in range(100):
+            sample(limit, rtt=0.1)
+
+        assert limit.limit == 16
+
+    def test_shrinks_when_latency_rises(self):
+        """Test the limit shrinks once requests start queueing."""
+
+        limit = AdaptiveConcurrencyLimit(initial_limit=16, max_limit=16)
+
+        for _ in range(50):
+            sample(limit, rtt=0.1)
+
+        for _ in range(20):
+            sample(limit, rtt=1.0)
+
+        assert limit.limit < 8
+
+    def test_shrinks_on_failure(self):
+        """Test failed requests shrink the limit multiplicatively."""
+
+        limit = AdaptiveConcurrencyLimit(initial_limit=10, backoff_ratio=0.5)
+
+        sample(limit, rtt=0.1, dropped=True)
+
+        assert limit.limit == 5
+
+    def test_rejects_invalid_bounds(self):
+        """Test inconsistent bounds are rejected."""
+
+        with pytest.raises(ValueError):
+            AdaptiveConcurrencyLimit(initial_limit=100, max_limit=10)
+
+
+class TestAdaptiveBatches:
+    """Test batched methods follow an adaptive limit."""
+
+    def test_get_products_by_ids(self):
+        """Test in-flight batches never exceed the limit, and results are unchanged."""
+
+        counter = InFlightCounter()
+        graph = make_graph(make_products_handler(counter))
+        limit = AdaptiveConcurrencyLimit(initial_limit=2, max_limit=4)
+        ids = [f"ID{i}" for i in range(2_500)]
+
+        id_to_product = graph.get_products_by_ids(
+            ids=ids, schema="internal", max_concurrency=limit
+        )
+
+        assert 1 < counter.peak <= 4
+        assert list(id_to_product) == ids
+        assert limit.in_flight == 0
+
+    def test_failure_releases_slot(self):
+        """Test a failing batch releases its slot and shrinks the limit."""
+
+        graph = make_graph(lambda request: httpx.Response(404))
+        limit = AdaptiveConcurrencyLimit(initial_limit=4)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            graph.get_suppliers_by_ids(
+                ids=[f"ID{i}" for i in range(500)],
+                schema="internal",
+                max_concurrency=limit,
+            )
+
+        assert limit.in_flight == 0
+        assert limit.limit < 4
+
+    def test_async_get_orders_by_ids(self):
+        """Test async batches follow the limit."""
+
+        in_flight = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+            ids = json.loads(request.url.params["filtering"])[0]["value"]
+
+            return httpx.Response(
+                200, json={"data": [{"id": id_, "deprecated_ids": []} for id_ in ids]}
+            )
+
+        limit = AdaptiveConcurrencyLimit(initial_limit=3, max_limit=3)
+        ids = [f"ID{i}" for i in range(2_500)]
+
+        async def run():
+            async with AsyncGraphAPI(
+                client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            ) as graph:
+                return await graph.get_orders_by_ids(
+                    ids=ids, schema="internal", max_concurrency=limit
+                )
+
+        id_to_order = asyncio.run(run())
+
+        assert peak == 3
+        assert list(id_to_order) == ids
+
+    def test_shared_between_calls(self):
+        """Test latency learned in one call carries over to the next."""
+
+        graph = make_graph(make_products_handler(InFlightCounter(), delay=0))
+        limit = AdaptiveConcurrencyLimit()
+
+        graph.get_products_by_ids(ids=["ID1"], schema="internal", max_concurrency=limit)
+        graph.get_products_by_ids(ids=["ID2"], schema="internal", max_concurrency=limit)
+
+        assert limit.long_rtt is not None
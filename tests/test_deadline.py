@@ -0,0 +1,214 @@
+"""Test end-to-end deadlines."""
+# Standard Modules
+import asyncio
+import json
+import time
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.deadline import (
+    DeadlineExceeded,
+    PartialResultsError,
+    apply_deadline,
+    deadline_scope,
+)
+from cofactr.endpoints import EndpointFamily
+from cofactr.graph import GraphAPI
+from cofactr.rate_limit import RateLimiter, TokenBucket
+from cofactr.retry import RetryPolicy
+from tests.test_batching import InFlightCounter, make_products_handler
+
+
+class TestDeadlineScope:
+    """Test deadlines are applied to requests."""
+
+    def test_cuts_request_timeouts(self):
+        """Test request timeouts are cut to the time remaining."""
+
+        request = httpx.Request("GET", "https://graph.cofactr.com/products/")
+        request.extensions["timeout"] = {
+            "connect": 5.0,
+            "read": 0.1,
+            "write": None,
+            "pool": 5.0,
+        }
+
+        with deadline_scope(1):
+            apply_deadline(request)
+
+        timeout = request.extensions["timeout"]
+
+        assert timeout["read"] == 0.1
+        assert 0.9 < timeout["connect"] <= 1
+        assert 0.9 < timeout["write"] <= 1
+
+    def test_nested_scopes_only_shorten(self):
+        """Test a nested scope can't extend the deadline."""
+
+        with deadline_scope(1) as outer:
+            with deadline_scope(10) as inner:
+                assert inner is outer
+
+    def test_expired(self):
+        """Test requests aren't sent once the deadline has passed."""
+
+        request = httpx.Request("GET", "https://graph.cofactr.com/products/")
+
+        with deadline_scope(0):
+            with pytest.raises(DeadlineExceeded):
+                apply_deadline(request)
+
+
+class TestTransportWaits:
+    """Test waits within the transport stack are bounded by the deadline."""
+
+    def test_rate_limit_wait_past_deadline(self):
+        """Test a request that would wait for the rate limiter past the deadline isn't sent."""
+
+        paths = []
+        rate_limiter = RateLimiter(rates={EndpointFamily.PRODUCTS: 10})
+        rate_limiter.buckets[EndpointFamily.PRODUCTS].on_throttled(retry_after=5)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(
+                lambda request: paths.append(request.url.path)
+                or httpx.Response(200, json={"data": []})
+            ),
+            rate_limiter=rate_limiter,
+        )
+
+        start = time.monotonic()
+
+        with pytest.raises(PartialResultsError):
+            graph.get_products_by_ids(ids=["ID0"], schema="internal", deadline=0.5)
+
+        assert time.monotonic() - start < 0.3
+        assert not paths
+
+    def test_rate_limit_wait_cuts_timeout(self):
+        """Test a request that waited for the rate limiter gets only the time then remaining."""
+
+        read_timeouts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            read_timeouts.append(request.extensions["timeout"]["read"])
+
+            return httpx.Response(200, json={"data": []})
+
+        rate_limiter = RateLimiter()
+        rate_limiter.buckets[EndpointFamily.PRODUCTS] = TokenBucket(rate=4, burst=1)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler), rate_limiter=rate_limiter
+        )
+
+        with deadline_scope(1):
+            graph.get_products(query="esp32", schema="internal", timeout=10)
+            graph.get_products(query="esp32", schema="internal", timeout=10)
+
+        assert 0.9 < read_timeouts[0] <= 1
+        assert read_timeouts[1] < 0.8
+
+
+class TestPartialResults:
+    """Test multi-request methods return what finished before the deadline."""
+
+    ids = [f"ID{i}" for i in range(1_250)]
+
+    def test_get_products_by_ids(self):
+        """Test results of finished batches are returned, along with unfinished IDs."""
+
+        graph = GraphAPI(
+            transport=httpx.MockTransport(
+                make_products_handler(InFlightCounter(), delay=0.1)
+            )
+        )
+
+        start = time.monotonic()
+
+        with pytest.raises(PartialResultsError) as exc_info:
+            graph.get_products_by_ids(ids=self.ids, schema="internal", deadline=0.25)
+
+        assert time.monotonic() - start < 0.45
+
+        error = exc_info.value
+
+        assert 0 < len(error.results) < len(self.ids)
+        assert list(error.results) + error.unfinished == self.ids
+
+    def test_stops_retrying(self):
+        """Test retries stop once the deadline has passed."""
+
+        graph = GraphAPI(
+            transport=httpx.MockTransport(lambda request: httpx.Response(503)),
+            retry_policy=RetryPolicy(max_attempts=10, base_delay=1, budget=None),
+        )
+
+        start = time.monotonic()
+
+        with pytest.raises(PartialResultsError) as exc_info:
+            graph.get_suppliers_by_ids(
+                ids=self.ids, schema="internal", max_concurrency=5, deadline=0.2
+            )
+
+        assert time.monotonic() - start < 0.4
+        assert exc_info.value.results == {}
+        assert exc_info.value.unfinished == self.ids
+
+    def test_create_get_products_by_ids_job(self):
+        """Test IDs of created jobs are returned, along with IDs that weren't submitted."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            time.sleep(0.1)
+
+            return httpx.Response(201, headers={"location": "/jobs/JOB"})
+
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        with pytest.raises(PartialResultsError) as exc_info:
+            graph.create_get_products_by_ids_job(
+                ids=self.ids, schema="internal", deadline=0.15
+            )
+
+        assert exc_info.value.results == ["JOB", "JOB"]
+        assert exc_info.value.unfinished == self.ids[500:]
+
+    def test_async_get_products_by_searches(self):
+        """Test async searches return what finished before the deadline."""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            batch = json.loads(request.content)["batch"]
+
+            if "MPN0" not in batch[0]["relative_url"]:
+                # Time out the way a real transport would.
+                read_timeout = request.extensions["timeout"]["read"]
+                await asyncio.sleep(min(read_timeout, 1))
+
+                raise httpx.ReadTimeout("Test", request=request)
+
+            return httpx.Response(
+                200, json=[{"code": 200, "body": {"data": []}} for _ in batch]
+            )
+
+        queries = [f"MPN{i}" for i in range(500)]
+
+        async def run():
+            async with AsyncGraphAPI(transport=httpx.MockTransport(handler)) as graph:
+                return await graph.get_products_by_searches(
+                    queries=queries,
+                    schema="internal",
+                    max_concurrency=2,
+                    deadline=0.1,
+                )
+
+        start = time.monotonic()
+
+        with pytest.raises(PartialResultsError) as exc_info:
+            asyncio.run(run())
+
+        assert time.monotonic() - start < 0.3
+
+        assert list(exc_info.value.results) == queries[:250]
+        assert exc_info.value.unfinished == queries[250:]
@@ -0,0 +1,200 @@
+"""Test spreading requests across several hosts."""
+# Standard Modules
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import socket
+from threading import Thread
+import time
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.deadline import DeadlineExceeded, deadline_scope
+from cofactr.failover import EndpointPool
+from cofactr.graph import GraphAPI
+from cofactr.retry import RetryPolicy
+
+
+class LocalServer:
+    """A local stand-in API host with configurable latency and status."""
+
+    def __init__(self, delay: float = 0.0, status: int = 200):
+        self.delay = delay
+        self.status = status
+        self.paths = []
+        self.clients = set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Respond to every request with an empty product list."""
+
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Handle a GET request."""
+
+                server.paths.append(self.path.split("?")[0])
+                server.clients.add(self.client_address)
+                time.sleep(server.delay)
+                body = json.dumps({"data": []}).encode()
+                self.send_response(server.status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self) -> "LocalServer":
+        Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class HangingServer:
+    """A local host that accepts connections but never responds."""
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}"
+
+    def __enter__(self) -> "HangingServer":
+        return self
+
+    def __exit__(self, *args):
+        self.sock.close()
+
+
+def get_unused_url() -> str:
+    """Get the URL of a local port nothing is listening on."""
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    return f"http://127.0.0.1:{port}"
+
+
+class TestEndpointPool:
+    """Test routing requests across several hosts."""
+
+    def test_prefers_lower_latency(self):
+        """Test most requests go to the host with the lowest latency."""
+
+        with LocalServer(delay=0.05) as slow, LocalServer() as fast:
+            with GraphAPI(urls=[slow.url, fast.url]) as graph:
+                for _ in range(20):
+                    graph.get_products(query="esp32", schema="internal")
+
+        assert len(fast.paths) >= 17
+        assert len(slow.paths) <= 3
+
+    def test_fails_over_on_connection_error(self):
+        """Test requests to an unreachable host are sent elsewhere, and the host is ejected."""
+
+        with LocalServer() as server:
+            with GraphAPI(urls=[get_unused_url(), server.url]) as graph:
+                graph.endpoint_pool.max_failures = 1
+
+                for _ in range(5):
+                    graph.get_products(query="esp32", schema="internal")
+
+                dead, _ = graph.endpoint_pool.endpoints
+
+                assert dead.ejected
+
+        assert server.paths == ["/products/"] * 5
+
+    def test_health_check_readmits(self):
+        """Test an ejected host is health checked before it's let back in."""
+
+        with LocalServer(status=503) as flaky, LocalServer(delay=0.02) as steady:
+            graph = GraphAPI(
+                urls=[flaky.url, steady.url],
+                retry_policy=RetryPolicy(max_attempts=1, budget=None),
+            )
+            graph.endpoint_pool.max_failures = 1
+            graph.endpoint_pool.ejection_duration = 0.05
+
+            try:
+                graph.get_products(query="esp32", schema="internal")
+            except httpx.HTTPStatusError:
+                pass
+
+            flaky.status = 200
+            graph.get_products(query="esp32", schema="internal")
+            time.sleep(0.06)
+            graph.get_products(query="esp32", schema="internal")
+            graph.close()
+
+        assert flaky.paths == ["/products/", "/", "/products/"]
+        assert steady.paths == ["/products/"]
+
+    def test_health_check_times_out(self):
+        """Test a health check of a host that never responds times out with the request, and the
+        request is sent elsewhere, or with the deadline."""
+
+        with HangingServer() as hanging, LocalServer() as server:
+            with GraphAPI(urls=[hanging.url, server.url]) as graph:
+                hanging_endpoint = graph.endpoint_pool.endpoints[0]
+                hanging_endpoint.ejected_until = time.monotonic()
+                start = time.monotonic()
+
+                graph.get_products(query="esp32", schema="internal", timeout=0.2)
+
+                assert time.monotonic() - start < 1
+                assert hanging_endpoint.ejected
+
+                hanging_endpoint.ejected_until = time.monotonic()
+                start = time.monotonic()
+
+                with deadline_scope(0.5), pytest.raises(DeadlineExceeded):
+                    graph.get_products(query="esp32", schema="internal", timeout=None)
+
+                assert time.monotonic() - start < 1
+                assert hanging_endpoint.ejected
+
+        assert server.paths == ["/products/"]
+
+    def test_routes_path_prefixes(self):
+        """Test requests keep their path relative to each host's base URL."""
+
+        pool = EndpointPool(["https://a.example/graph", "https://b.example/api/"])
+        url = httpx.URL("https://a.example/graph/products/ID0?schema=internal")
+        request = httpx.Request("GET", url)
+
+        pool.route(request, url=url, endpoint=pool.endpoints[1])
+
+        assert str(request.url) == "https://b.example/api/products/ID0?schema=internal"
+        assert request.headers["Host"] == "b.example"
+
+    def test_async(self):
+        """Test async requests are routed across hosts."""
+
+        async def run(urls):
+            async with AsyncGraphAPI(urls=urls) as graph:
+                await asyncio.gather(
+                    *[
+                        graph.get_products(query="esp32", schema="internal")
+                        for _ in range(10)
+                    ]
+                )
+
+        with LocalServer(delay=0.02) as first, LocalServer(delay=0.02) as second:
+            asyncio.run(run([get_unused_url(), first.url, second.url]))
+
+        assert len(first.paths) + len(second.paths) == 10
+        assert first.paths and second.paths
@@ -0,0 +1,174 @@
+"""Test hedged requests."""
+# Standard Modules
+import asyncio
+from threading import Lock, current_thread
+import time
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI
+from cofactr.hedging import HedgePolicy
+
+
+def make_slow_first_handler(slow_delay: float):
+    """Make a handler whose first response is slow, and every other response is immediate."""
+
+    lock = Lock()
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        with lock:
+            calls.append(request)
+            first = len(calls) == 1
+
+        if first:
+            time.sleep(slow_delay)
+
+        return httpx.Response(200, json={"data": {"id": "ID0", "first": first}})
+
+    return handler, calls
+
+
+class TestHedgePolicy:
+    """Test the hedge policy."""
+
+    def test_delay_follows_percentile(self):
+        """Test the hedge delay is the configured percentile of recent latencies."""
+
+        policy = HedgePolicy(percentile=90, initial_delay=1, min_samples=10)
+
+        assert policy.delay == 1
+
+        for i in range(100):
+            policy._record_latency(i / 100)  # pylint: disable=protected-access
+
+        assert policy.delay == pytest.approx(0.9)
+
+    def test_hedges_slow_request(self):
+        """Test a slow request is hedged and the faster response is used."""
+
+        handler, calls = make_slow_first_handler(slow_delay=0.5)
+        policy = HedgePolicy(initial_delay=0.05, max_hedge_ratio=1)
+        graph = GraphAPI(transport=httpx.MockTransport(handler), hedge_policy=policy)
+
+        start = time.monotonic()
+        res = graph.get_product(id="ID0", schema="internal")
+
+        assert time.monotonic() - start < 0.4
+        assert res["data"]["first"] is False
+        assert len(calls) == 2
+        assert (policy.hedges, policy.hedge_wins) == (1, 1)
+
+    def test_fast_request_isnt_hedged(self):
+        """Test requests that respond within the delay aren't duplicated."""
+
+        handler, calls = make_slow_first_handler(slow_delay=0)
+        policy = HedgePolicy(initial_delay=0.5, max_hedge_ratio=1)
+        graph = GraphAPI(transport=httpx.MockTransport(handler), hedge_policy=policy)
+
+        graph.get_org(id="ID0", schema="internal")
+        graph.get_supplier(id="ID0", schema="internal")
+
+        assert len(calls) == 2
+        assert policy.hedges == 0
+
+    def test_hedges_are_capped(self):
+        """Test hedges never exceed the configured fraction of requests."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            time.sleep(0.02)
+
+            return httpx.Response(200, json={"data": []})
+
+        policy = HedgePolicy(
+            initial_delay=0.001, min_samples=1000, max_hedge_ratio=0.25
+        )
+        graph = GraphAPI(transport=httpx.MockTransport(handler), hedge_policy=policy)
+
+        for _ in range(20):
+            graph.get_offers(product_id="ID0", schema="internal")
+
+        assert policy.requests == 20
+        assert policy.hedges == 5
+
+    def test_unhedgeable_request_stays_on_caller_thread(self):
+        """Test a request that can't be hedged is sent on the caller's thread, without a pool."""
+
+        threads = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            threads.append(current_thread())
+
+            return httpx.Response(200, json={"data": {"id": "ID0"}})
+
+        policy = HedgePolicy(initial_delay=0.001, max_hedge_ratio=0.5)
+        graph = GraphAPI(transport=httpx.MockTransport(handler), hedge_policy=policy)
+
+        graph.get_product(id="ID0", schema="internal")
+
+        assert threads == [current_thread()]
+        assert policy._executor is None  # pylint: disable=protected-access
+
+    def test_close_shuts_down_pool(self):
+        """Test closing the client shuts down the policy's threads, and a later request starts
+        new ones."""
+
+        handler, calls = make_slow_first_handler(slow_delay=0.2)
+        policy = HedgePolicy(initial_delay=0.05, max_hedge_ratio=1)
+
+        with GraphAPI(
+            transport=httpx.MockTransport(handler), hedge_policy=policy
+        ) as graph:
+            graph.get_product(id="ID0", schema="internal")
+            executor = policy._executor  # pylint: disable=protected-access
+
+        assert (
+            executor is not None and executor._shutdown
+        )  # pylint: disable=protected-access
+        assert policy._executor is None  # pylint: disable=protected-access
+
+        graph = GraphAPI(transport=httpx.MockTransport(handler), hedge_policy=policy)
+        graph.get_product(id="ID0", schema="internal")
+
+        assert len(calls) == 3
+
+    def test_async_cancels_loser(self):
+        """Test the slower async request is cancelled once the hedge responds."""
+
+        calls = []
+        cancelled = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(request)
+                    raise
+
+            return httpx.Response(200, json={"data": {"id": "ID0"}})
+
+        policy = HedgePolicy(initial_delay=0.05, max_hedge_ratio=1)
+
+        async def run():
+            async with AsyncGraphAPI(
+                transport=httpx.MockTransport(handler), hedge_policy=policy
+            ) as graph:
+                res = await graph.get_product(id="ID0", schema="internal")
+                await asyncio.sleep(0)
+
+                return res
+
+        start = time.monotonic()
+        res = asyncio.run(run())
+
+        assert time.monotonic() - start < 1
+        assert res["data"]["id"] == "ID0"
+        assert len(cancelled) == 1
+        assert policy.hedge_wins == 1
@@ -0,0 +1,121 @@
+"""Test looking up products by ID through `/batch/products/`."""
+# Standard Modules
+import asyncio
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI, IdLookupMethod
+from cofactr.retry import RetryPolicy
+from cofactr.schema import ProductSchemaName
+from tests.conftest import StandInGraph
+
+# Deprecated IDs, and the IDs they were merged into.
+MERGES = {"OLD0": "NEW0"}
+
+
+class TestIdLookupMethod:
+    """Test ID lookups sent through `/batch/products/`."""
+
+    def test_same_results(self):
+        """Test both lookup methods return the same products."""
+
+        ids = ["OLD0", *[f"ID{i}" for i in range(299)]]
+        results = {}
+
+        for method in IdLookupMethod:
+            graph = GraphAPI(
+                transport=httpx.MockTransport(StandInGraph(merges=MERGES)),
+                id_lookup_method=method,
+            )
+            results[method] = graph.get_products_by_ids(
+                ids=ids, schema="internal", fields="mpn"
+            )
+
+        assert results[IdLookupMethod.BATCH] == results[IdLookupMethod.FILTER]
+        assert results[IdLookupMethod.BATCH]["OLD0"]["mpn"] == "MPN-NEW0"
+
+    def test_unparsed_schema_member(self):
+        """Test products of a schema member without a parser are matched as dictionaries."""
+
+        for method in IdLookupMethod:
+            graph = GraphAPI(
+                transport=httpx.MockTransport(StandInGraph(merges=MERGES)),
+                id_lookup_method=method,
+            )
+
+            products = graph.get_products_by_ids(
+                ids=["OLD0", "ID1"], schema=ProductSchemaName.INTERNAL, fields="mpn"
+            )
+
+            assert products == {"OLD0": {"mpn": "MPN-NEW0"}, "ID1": {"mpn": "MPN-ID1"}}
+
+    def test_packs_ids_into_one_request(self):
+        """Test many IDs are sent in one short-URL request, 25 IDs per sub-request."""
+
+        stand_in = StandInGraph()
+        graph = GraphAPI(transport=httpx.MockTransport(stand_in))
+        ids = [f"ID{i}" for i in range(1000)]
+
+        products = graph.get_products_by_ids(
+            ids=ids, schema="internal", lookup_method=IdLookupMethod.BATCH
+        )
+
+        assert set(products) == set(ids)
+        assert len(stand_in.requests) == 1
+        assert len(str(stand_in.requests[0].url)) < 200
+        assert len(stand_in.batches[0]) == 40
+
+    def test_canonical_ids(self):
+        """Test canonical IDs can be looked up through a batch."""
+
+        stand_in = StandInGraph(merges=MERGES)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(stand_in),
+            id_lookup_method=IdLookupMethod.BATCH,
+        )
+
+        assert graph.get_canonical_product_ids(ids=["OLD0", "ID1"]) == {
+            "OLD0": "NEW0",
+            "ID1": "ID1",
+        }
+        assert stand_in.batches
+
+    def test_failed_sub_request(self):
+        """Test a failed sub-request fails the lookup, rather than leaving products out."""
+
+        graph = GraphAPI(
+            transport=httpx.MockTransport(StandInGraph(failing={"ID30"})),
+            retry_policy=RetryPolicy(max_attempts=1),
+            id_lookup_method=IdLookupMethod.BATCH,
+        )
+
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            graph.get_products_by_ids(
+                ids=[f"ID{i}" for i in range(50)], schema="internal"
+            )
+
+        assert error.value.response.status_code == 500
+
+    def test_async(self):
+        """Test async clients look up IDs through a batch too."""
+
+        stand_in = StandInGraph()
+
+        async def run():
+            async with AsyncGraphAPI(
+                transport=httpx.MockTransport(stand_in),
+                id_lookup_method=IdLookupMethod.BATCH,
+            ) as graph:
+                return await graph.get_products_by_ids(
+                    ids=[f"ID{i}" for i in range(100)], schema="internal"
+                )
+
+        products = asyncio.run(run())
+
+        assert len(products) == 100
+        assert len(stand_in.requests) == 1
+        assert len(stand_in.batches[0]) == 4
@@ -0,0 +1,160 @@
+"""Test polling jobs and streaming their results."""
+# Standard Modules
+import asyncio
+from threading import Lock
+import time
+from types import SimpleNamespace
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI
+from cofactr.jobs import JobFailedError, JobTimeoutError, PollingPolicy
+from cofactr.schema import ProductSchemaName, schema_to_product
+
+POLLING = PollingPolicy(initial_interval=0.01, max_interval=0.01, jitter=0)
+
+
+def make_handler(job_to_polls, failed=(), delay=0.0):
+    """Make a handler for job status checks, where each job completes after it's been checked a
+    given number of times. Records the most checks in flight at once."""
+
+    polls = {job_id: 0 for job_id in job_to_polls}
+    stats = {"in_flight": 0, "max_in_flight": 0}
+    lock = Lock()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        job_id = request.url.path.split("/")[-1]
+
+        with lock:
+            polls[job_id] += 1
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+        time.sleep(delay)
+
+        with lock:
+            stats["in_flight"] -= 1
+
+        if polls[job_id] < job_to_polls[job_id]:
+            return httpx.Response(200, json={"id": job_id, "status": "pending"})
+
+        if job_id in failed:
+            return httpx.Response(200, json={"id": job_id, "status": "failed"})
+
+        results = [
+            {"code": 200, "body": {"data": [{"id": f"{job_id}-P", "mpn": job_id}]}}
+        ]
+
+        return httpx.Response(
+            200, json={"id": job_id, "status": "completed", "results": results}
+        )
+
+    return handler, polls, stats
+
+
+class TestPollingPolicy:
+    """Test the polling policy."""
+
+    def test_backs_off(self):
+        """Test intervals grow up to the maximum."""
+
+        policy = PollingPolicy(
+            initial_interval=1, max_interval=5, multiplier=2, jitter=0
+        )
+
+        assert [policy.get_interval(polls) for polls in range(1, 6)] == [1, 2, 4, 5, 5]
+
+
+class TestIterJobResults:
+    """Test streaming job results."""
+
+    def test_as_completed(self, monkeypatch):
+        """Test results arrive in the order jobs finish, parsed by schema."""
+
+        monkeypatch.setitem(
+            schema_to_product, ProductSchemaName.INTERNAL, SimpleNamespace
+        )
+        handler, polls, _ = make_handler({"JOB0": 4, "JOB1": 1, "JOB2": 2})
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        results = list(
+            graph.iter_job_results(
+                ["JOB0", "JOB1", "JOB2"],
+                schema=ProductSchemaName.INTERNAL,
+                polling=POLLING,
+            )
+        )
+
+        assert [result.job_id for result in results] == ["JOB1", "JOB2", "JOB0"]
+        assert results[0].products[0].mpn == "JOB1"
+        assert polls == {"JOB0": 4, "JOB1": 1, "JOB2": 2}
+        assert graph.alias_map.resolve("JOB0-P") == "JOB0-P"
+
+    def test_polls_concurrently(self):
+        """Test many jobs' statuses are checked at once."""
+
+        job_ids = [f"JOB{i}" for i in range(8)]
+        handler, _, stats = make_handler({job_id: 2 for job_id in job_ids}, delay=0.02)
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        results = list(
+            graph.iter_job_results(
+                job_ids, schema="internal", polling=POLLING, max_concurrency=4
+            )
+        )
+
+        assert len(results) == 8
+        assert stats["max_in_flight"] > 1
+
+    def test_failed_job(self):
+        """Test a failed job raises, after the jobs that finished before it."""
+
+        handler, _, _ = make_handler({"JOB0": 1, "JOB1": 2}, failed={"JOB1"})
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+        results = graph.iter_job_results(
+            ["JOB0", "JOB1"], schema="internal", polling=POLLING
+        )
+
+        assert next(results).job_id == "JOB0"
+
+        with pytest.raises(JobFailedError) as error:
+            next(results)
+
+        assert error.value.job_id == "JOB1"
+
+    def test_timeout(self):
+        """Test polling gives up on jobs that don't finish in time."""
+
+        handler, _, _ = make_handler({"JOB0": 1, "JOB1": 1000})
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        with pytest.raises(JobTimeoutError) as error:
+            list(
+                graph.iter_job_results(
+                    ["JOB0", "JOB1"],
+                    schema="internal",
+                    polling=PollingPolicy(initial_interval=0.01, timeout=0.1),
+                )
+            )
+
+        assert error.value.unfinished == ["JOB1"]
+
+    def test_async(self):
+        """Test async clients stream job results in the order jobs finish."""
+
+        handler, _, _ = make_handler({"JOB0": 3, "JOB1": 1})
+
+        async def run():
+            async with AsyncGraphAPI(transport=httpx.MockTransport(handler)) as graph:
+                return [
+                    result.job_id
+                    async for result in graph.iter_job_results(
+                        ["JOB0", "JOB1"], schema="internal", polling=POLLING
+                    )
+                ]
+
+        assert asyncio.run(run()) == ["JOB1", "JOB0"]
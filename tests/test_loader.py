@@ -0,0 +1,172 @@
+"""Test batching single-ID lookups."""
+# Standard Modules
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+from threading import Lock
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI
+from cofactr.retry import RetryPolicy
+
+
+def make_entities_handler(status: int = 200):
+    """Make a handler that responds with one entity per filtered ID, except IDs starting with
+    "MISSING", and records the requests it gets.
+
+    Entities whose ID starts with "OLD" are returned under a new ID, with the requested ID
+    deprecated.
+    """
+
+    lock = Lock()
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        with lock:
+            calls.append(request)
+
+        ids = json.loads(request.url.params["filtering"])[0]["value"]
+        data = [
+            {"id": f"NEW{id_}", "deprecated_ids": [id_], "name": id_}
+            if id_.startswith("OLD")
+            else {"id": id_, "deprecated_ids": [], "name": id_}
+            for id_ in ids
+            if not id_.startswith("MISSING")
+        ]
+
+        return httpx.Response(status, json={"data": data})
+
+    return handler, calls
+
+
+def load_concurrently(load, ids, **kwargs):
+    """Look up each ID from its own thread."""
+
+    with ThreadPoolExecutor(max_workers=len(ids)) as executor:
+        futures = [executor.submit(load, id=id_, **kwargs) for id_ in ids]
+
+        return [future.result() for future in futures]
+
+
+class TestBatchLoader:
+    """Test batching lookups made from several threads."""
+
+    def test_batches_lookups(self):
+        """Test concurrent lookups are sent as one request, and each gets its own entity."""
+
+        handler, calls = make_entities_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler), batch_window=0.05)
+        ids = ["ID0", "OLD1", "MISSING2", "ID3", "ID0"]
+
+        products = load_concurrently(graph.load_product, ids, schema="internal")
+
+        assert len(calls) == 1
+        assert sorted(json.loads(calls[0].url.params["filtering"])[0]["value"]) == [
+            "ID0",
+            "ID3",
+            "MISSING2",
+            "OLD1",
+        ]
+        assert [product and product["name"] for product in products] == [
+            "ID0",
+            "OLD1",
+            None,
+            "ID3",
+            "ID0",
+        ]
+        assert products[0] is products[4]
+
+    def test_separates_options(self):
+        """Test lookups with different arguments are sent in separate batches."""
+
+        handler, calls = make_entities_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler), batch_window=0.05)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(graph.load_product, id="ID0", schema="internal"),
+                executor.submit(graph.load_product, id="ID1", schema="internal"),
+                executor.submit(
+                    graph.load_product, id="ID2", schema="internal", owner_id="O"
+                ),
+                executor.submit(graph.load_supplier, id="ID3", schema="internal"),
+            ]
+
+            for future in futures:
+                future.result()
+
+        assert sorted(call.url.path for call in calls) == [
+            "/orgs/suppliers",
+            "/products/",
+            "/products/",
+        ]
+
+    def test_caps_batch_size(self):
+        """Test a full batch is sent without waiting for the window to pass."""
+
+        handler, calls = make_entities_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler), batch_window=10)
+        graph.org_loader.max_batch_size = 3
+
+        orgs = load_concurrently(
+            graph.load_org, [f"ID{i}" for i in range(6)], schema="internal"
+        )
+
+        assert [org["name"] for org in orgs] == [f"ID{i}" for i in range(6)]
+        assert len(calls) == 2
+        assert graph.org_loader.batches == 2
+
+    def test_shares_errors(self):
+        """Test a failed batch raises for every lookup in it."""
+
+        handler, calls = make_entities_handler(status=400)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler),
+            batch_window=0.05,
+            retry_policy=RetryPolicy(max_attempts=1),
+        )
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(graph.load_supplier, id=f"ID{i}", schema="internal")
+                for i in range(3)
+            ]
+
+            for future in futures:
+                with pytest.raises(httpx.HTTPStatusError):
+                    future.result()
+
+        assert len(calls) == 1
+
+    def test_async(self):
+        """Test lookups made within one event loop iteration are sent as one request."""
+
+        handler, calls = make_entities_handler()
+
+        async def run():
+            async with AsyncGraphAPI(transport=httpx.MockTransport(handler)) as graph:
+                products = await asyncio.gather(
+                    *[
+                        graph.load_product(id=id_, schema="internal")
+                        for id_ in ["ID0", "OLD1", "MISSING2"]
+                    ]
+                )
+                orgs = await asyncio.gather(
+                    graph.load_org(id="ID0", schema="internal"),
+                    graph.load_org(id="ID1", schema="internal"),
+                )
+
+            return products, orgs
+
+        products, orgs = asyncio.run(run())
+
+        assert [call.url.path for call in calls] == ["/products/", "/orgs"]
+        assert products[0]["name"] == "ID0"
+        assert products[1]["name"] == "OLD1"
+        assert products[2] is None
+        assert [org["name"] for org in orgs] == ["ID0", "ID1"]
@@ -0,0 +1,251 @@
+"""Test choosing between inline batches and the jobs API for fetching products."""
+# Standard Modules
+import asyncio
+import json
+from threading import Event
+import time
+
+# 3rd Party Modules
+import httpx
+import pytest
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI
+from cofactr.jobs import JobFailedError, PollingPolicy
+from cofactr.planner import FetchPlanner, FetchStrategy, get_freshness
+from tests.conftest import StandInGraph
+
+
+def make_handler(polls_until_done=1, fail_jobs=False):
+    """Make a handler that serves product lookups and jobs, which complete after being polled a
+    given number of times. Records the path of each request."""
+
+    stand_in = StandInGraph()
+    paths = []
+    job_batches = {}
+    job_polls = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+
+        if request.url.path == "/jobs/batch-products-requests/":
+            job_id = f"JOB{len(job_batches)}"
+            job_batches[job_id] = json.loads(request.content)["batch"]
+            job_polls[job_id] = 0
+
+            return httpx.Response(201, headers={"location": f"/jobs/{job_id}"})
+
+        if request.url.path.startswith("/jobs/"):
+            job_id = request.url.path.split("/")[-1]
+            job_polls[job_id] += 1
+
+            if job_polls[job_id] <= polls_until_done:
+                return httpx.Response(200, json={"id": job_id, "status": "running"})
+
+            if fail_jobs:
+                return httpx.Response(200, json={"id": job_id, "status": "failed"})
+
+            results = []
+
+            for sub_request in job_batches[job_id]:
+                code, body = stand_in.respond(sub_request["relative_url"])
+                results.append({"code": code, "body": body})
+
+            return httpx.Response(
+                200, json={"id": job_id, "status": "completed", "results": results}
+            )
+
+        return stand_in(request)
+
+    return handler, paths
+
+
+class TestFetchPlanner:
+    """Test the fetch planner."""
+
+    def test_freshness(self):
+        """Test lookups are classed by how much may come from the cache."""
+
+        cases = [
+            (False, False, None, "cached"),
+            (True, False, "inf", "cached"),
+            (True, False, "1d", "external"),
+            (False, True, None, "refresh"),
+        ]
+
+        for external, force_refresh, stale_delta, freshness in cases:
+            assert (
+                get_freshness(
+                    external=external,
+                    force_refresh=force_refresh,
+                    stale_delta=stale_delta,
+                )
+                == freshness
+            )
+
+    def test_plans_by_size_and_freshness(self):
+        """Test small and cached fetches run inline, while large or slow ones become jobs."""
+
+        planner = FetchPlanner(max_inline_seconds=60)
+
+        def plan(ids, freshness):
+            return planner.estimate(
+                ids, key="key", freshness=freshness, batch_size=250, max_concurrency=4
+            ).strategy
+
+        assert plan(50, "external") is FetchStrategy.INLINE
+        assert plan(200_000, "cached") is FetchStrategy.JOBS
+        assert plan(5000, "cached") is FetchStrategy.INLINE
+        assert plan(5000, "refresh") is FetchStrategy.JOBS
+
+    def test_follows_recorded_latency(self):
+        """Test recorded latencies replace the default estimate."""
+
+        planner = FetchPlanner(max_inline_seconds=60, request_overhead=0)
+
+        def estimate():
+            return planner.estimate(
+                5000, key="key", freshness="cached", batch_size=250, max_concurrency=4
+            )
+
+        assert estimate().strategy is FetchStrategy.INLINE
+
+        planner.record("key", ids=250, seconds=25.0)
+
+        assert estimate().estimated_seconds == pytest.approx(5 * 25.0)
+        assert estimate().strategy is FetchStrategy.JOBS
+
+
+class TestFetchProducts:
+    """Test fetching products with the planned strategy."""
+
+    def test_inline(self):
+        """Test a small fetch runs inline, and records its latency."""
+
+        handler, paths = make_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+        ids = [f"ID{i}" for i in range(600)]
+
+        products = dict(
+            graph.fetch_products(ids=ids, schema="internal", external=False)
+        )
+
+        assert set(products) == set(ids)
+        assert products["ID0"] == {"mpn": "MPN-ID0"}
+        assert paths == ["/products/"] * 3
+        assert graph.fetch_planner.get_seconds_per_id(
+            ("internal", None, "cached"), "cached"
+        ) < (FetchPlanner.DEFAULT_SECONDS_PER_ID["cached"])
+
+    def test_inline_stops_early(self):
+        """Test a caller that stops iterating isn't held up by batches still in flight."""
+
+        release = Event()
+        handler, _ = make_handler()
+
+        def slow_handler(request: httpx.Request) -> httpx.Response:
+            if "ID0" not in request.url.params["filtering"]:
+                release.wait(timeout=5)
+
+            return handler(request)
+
+        graph = GraphAPI(transport=httpx.MockTransport(slow_handler))
+        ids = [f"ID{i}" for i in range(600)]
+
+        try:
+            products = graph.fetch_products(
+                ids=ids, schema="internal", external=False, max_concurrency=2
+            )
+            start = time.monotonic()
+            next(products)
+            products.close()
+
+            assert time.monotonic() - start < 1
+        finally:
+            release.set()
+
+    def test_jobs(self):
+        """Test a large fetch is sent as jobs, whose results are streamed."""
+
+        handler, paths = make_handler(polls_until_done=2)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler),
+            fetch_planner=FetchPlanner(max_inline_seconds=0),
+        )
+        ids = [f"ID{i}" for i in range(300)]
+
+        products = dict(
+            graph.fetch_products(
+                ids=ids,
+                schema="internal",
+                fields="mpn",
+                polling=PollingPolicy(initial_interval=0),
+            )
+        )
+
+        assert set(products) == set(ids)
+        assert products["ID299"] == {"mpn": "MPN-ID299"}
+        assert paths.count("/jobs/batch-products-requests/") == 2
+        assert paths.count("/jobs/JOB0") == 3
+
+    def test_jobs_match_known_aliases(self, monkeypatch):
+        """Test job results under a requested ID's known canonical ID answer the requested ID."""
+
+        monkeypatch.setitem(
+            globals(),
+            "get_products",
+            lambda ids: [{"id": "NEW0", "deprecated_ids": [], "mpn": "MPN-NEW0"}],
+        )
+        handler, _ = make_handler()
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+        graph.alias_map.record("NEW0", ["OLD0"])
+
+        products = dict(
+            graph.fetch_products(
+                ids=["OLD0", "NEW0"],
+                schema="internal",
+                strategy=FetchStrategy.JOBS,
+                polling=PollingPolicy(initial_interval=0),
+            )
+        )
+
+        assert products == {"OLD0": {"mpn": "MPN-NEW0"}, "NEW0": {"mpn": "MPN-NEW0"}}
+
+    def test_failed_job(self):
+        """Test a failed job raises."""
+
+        handler, _ = make_handler(fail_jobs=True)
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        with pytest.raises(JobFailedError):
+            list(
+                graph.fetch_products(
+                    ids=["ID0"],
+                    strategy=FetchStrategy.JOBS,
+                    polling=PollingPolicy(initial_interval=0),
+                )
+            )
+
+    def test_async(self):
+        """Test async clients fetch inline and through jobs too."""
+
+        handler, paths = make_handler()
+        ids = [f"ID{i}" for i in range(300)]
+
+        async def run(strategy):
+            async with AsyncGraphAPI(transport=httpx.MockTransport(handler)) as graph:
+                return {
+                    id_: product
+                    async for id_, product in graph.fetch_products(
+                        ids=ids,
+                        schema="internal",
+                        strategy=strategy,
+                        polling=PollingPolicy(initial_interval=0),
+                    )
+                }
+
+        for strategy in FetchStrategy:
+            assert set(asyncio.run(run(strategy))) == set(ids)
+
+        assert "/jobs/batch-products-requests/" in paths
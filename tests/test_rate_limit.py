@@ -0,0 +1,160 @@
+"""Test client-side rate limiting."""
+# Standard Modules
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+# 3rd Party Modules
+import httpx
+import pytest
+from tenacity import wait_none
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.endpoints import EndpointFamily
+from cofactr.graph import GraphAPI
+from cofactr.rate_limit import RateLimiter, TokenBucket, parse_retry_after
+
+
+class TestParseRetryAfter:
+    """Test parsing `Retry-After` headers."""
+
+    def test_seconds(self):
+        """Test delays given in seconds."""
+
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("-1") == 0.0
+
+    def test_http_date(self):
+        """Test delays given as an HTTP date."""
+
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+        assert 25 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+
+    def test_malformed(self):
+        """Test missing and malformed headers are ignored."""
+
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+class TestTokenBucket:
+    """Test the adaptive token bucket."""
+
+    def test_waits_once_burst_is_spent(self):
+        """Test requests beyond the burst wait for tokens to refill."""
+
+        bucket = TokenBucket(rate=10, burst=2)
+
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+        assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+    def test_throttling_halves_rate_and_honors_retry_after(self):
+        """Test a 429 slows the bucket down and blocks it until `Retry-After`."""
+
+        bucket = TokenBucket(rate=10)
+        bucket.on_throttled(retry_after=2)
+
+        assert bucket.rate == 5
+        assert bucket.reserve() == pytest.approx(2, abs=0.01)
+
+        for _ in range(10):
+            bucket.on_throttled()
+
+        assert bucket.rate == 1
+
+    def test_recovers_after_success(self):
+        """Test the rate increases back up to its maximum."""
+
+        bucket = TokenBucket(rate=10, increase_step=2)
+        bucket.on_throttled()
+
+        for _ in range(5):
+            bucket.on_success()
+
+        assert bucket.rate == 10
+
+
+class TestRateLimitedTransport:
+    """Test rate limiting requests sent by GraphAPI."""
+
+    def test_limits_configured_families_only(self):
+        """Test only requests to endpoint families with a rate wait for tokens."""
+
+        rate_limiter = RateLimiter(rates={EndpointFamily.ORGS: 1})
+        graph = GraphAPI(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, json={"data": []})
+            ),
+            rate_limiter=rate_limiter,
+        )
+
+        with mock.patch("cofactr.rate_limit.time.sleep") as sleep:
+            graph.get_products(query="esp32", schema="internal")
+            graph.get_products(query="esp32", schema="internal")
+            graph.get_orgs(query="digikey", schema="internal")
+            graph.get_orgs(query="digikey", schema="internal")
+
+        [call] = sleep.call_args_list
+
+        assert call.args[0] == pytest.approx(1, abs=0.01)
+
+    def test_retries_throttled_requests(self):
+        """Test a 429 is retried after slowing down and waiting out `Retry-After`."""
+
+        responses = [
+            httpx.Response(429, headers={"Retry-After": "7"}),
+            httpx.Response(200, json={"data": []}),
+        ]
+        rate_limiter = RateLimiter(rates={EndpointFamily.PRODUCTS: 10})
+        graph = GraphAPI(
+            transport=httpx.MockTransport(lambda request: responses.pop(0)),
+            rate_limiter=rate_limiter,
+        )
+
+        with mock.patch("cofactr.rate_limit.time.sleep") as sleep:
+            res = graph.get_products.retry_with(wait=wait_none())(
+                graph, query="esp32", schema="internal"
+            )
+
+        assert res == {"data": []}
+        assert sleep.call_args.args[0] == pytest.approx(7, abs=0.01)
+        assert rate_limiter.buckets[EndpointFamily.PRODUCTS].rate < 10
+
+    def test_async(self):
+        """Test async requests wait for tokens without blocking the event loop."""
+
+        rate_limiter = RateLimiter(default_rate=10)
+        waits = []
+
+        async def sleep(delay):
+            waits.append(delay)
+
+        async def run():
+            async with AsyncGraphAPI(
+                transport=httpx.MockTransport(
+                    lambda request: httpx.Response(200, json={"data": []})
+                ),
+                rate_limiter=rate_limiter,
+            ) as graph:
+                with mock.patch("cofactr.rate_limit.asyncio.sleep", sleep):
+                    await asyncio.gather(
+                        *[
+                            graph.get_products(query="esp32", schema="internal")
+                            for _ in range(12)
+                        ]
+                    )
+
+        asyncio.run(run())
+
+        assert len(waits) == 2
+
+    def test_rejects_custom_client(self):
+        """Test a rate limiter can't be added to a custom client."""
+
+        with pytest.raises(ValueError):
+            GraphAPI(client=httpx.Client(), rate_limiter=RateLimiter(default_rate=1))
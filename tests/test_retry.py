@@ -3,10 +3,11 @@
 # 3rd Party Modules
 import httpx
 import pytest
-from tenacity import retry, wait_none
+from tenacity import RetryCallState, retry, wait_none
 
 # Local Modules
-from cofactr.graph import RetrySettings
+from cofactr.graph import GraphAPI, RetrySettings
+from cofactr.retry import RetryBudget, RetryPolicy
 
 
 class TestRetry:
@@ -97,3 +98,212 @@ class TestRetry:
             fails()
 
         assert fails.retry.statistics["attempt_number"] == 3
+
+
+def make_status_error(status_code: int, headers=None) -> httpx.HTTPStatusError:
+    """Make the error raised for a response with the given status."""
+
+    request = httpx.Request("GET", "https://graph.cofactr.com/products/")
+    response = httpx.Response(status_code, headers=headers, request=request)
+
+    return httpx.HTTPStatusError("Test", request=request, response=response)
+
+
+class TestRetryPolicy:
+    """Test the retry policy."""
+
+    def test_retries_by_status_class(self):
+        """Test retryable statuses and timeouts are retried, and nothing else."""
+
+        policy = RetryPolicy(budget=None)
+
+        assert policy.is_retryable(make_status_error(429))
+        assert policy.is_retryable(make_status_error(502))
+        assert policy.is_retryable(make_status_error(503))
+        assert policy.is_retryable(make_status_error(504))
+        assert policy.is_retryable(httpx.ReadTimeout("Test"))
+        assert not policy.is_retryable(make_status_error(404))
+        assert not policy.is_retryable(make_status_error(500))
+        assert not policy.is_retryable(ValueError())
+
+    def test_decorrelated_jitter(self):
+        """Test waits grow from the base delay with jitter, up to the maximum delay."""
+
+        policy = RetryPolicy(base_delay=1, max_delay=5, budget=None)
+
+        waits = []
+
+        for _ in range(100):
+            retry_state = RetryCallState(retry_object=None, fn=None, args=(), kwargs={})
+
+            for _ in range(5):
+                waits.append(policy.wait(retry_state))
+
+        assert all(1 <= wait <= 5 for wait in waits)
+        assert len({round(wait, 3) for wait in waits}) > 100
+
+    def test_honors_retry_after(self, mocker):
+        """Test `Retry-After` sets the minimum wait, and too long a wait isn't retried."""
+
+        mock = mocker.MagicMock(
+            side_effect=[make_status_error(503, headers={"Retry-After": "4"}), True]
+        )
+        sleep = mocker.patch("tenacity.nap.time.sleep")
+        policy = RetryPolicy(base_delay=0.1, max_delay=0.1, budget=None)
+
+        @retry(reraise=True, retry=policy.retry, stop=policy.stop, wait=policy.wait)
+        def throttled():
+            return mock()
+
+        assert throttled()
+        sleep.assert_called_once_with(4)
+
+        mock.side_effect = [make_status_error(503, headers={"Retry-After": "3600"})]
+
+        with pytest.raises(httpx.HTTPStatusError):
+            throttled()
+
+    def test_instance_policy(self, mocker):
+        """Test GraphAPI methods follow the instance's retry policy."""
+
+        mocker.patch("tenacity.nap.time.sleep")
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request)
+
+            return httpx.Response(503)
+
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler),
+            retry_policy=RetryPolicy(max_attempts=5, budget=None),
+        )
+
+        with pytest.raises(httpx.HTTPStatusError):
+            graph.get_products(query="esp32", schema="internal")
+
+        assert len(attempts) == 5
+
+    @pytest.mark.parametrize(
+        "error, attempt_count",
+        [
+            (httpx.ReadTimeout("Timed out."), 1),
+            (httpx.ConnectError("Connection refused."), 3),
+        ],
+    )
+    def test_non_idempotent(self, mocker, error, attempt_count):
+        """Test requests that aren't safe to repeat are only retried if they never reached the
+        server."""
+
+        mocker.patch("tenacity.nap.time.sleep")
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request)
+
+            raise error
+
+        graph = GraphAPI(
+            transport=httpx.MockTransport(handler),
+            retry_policy=RetryPolicy(
+                retry_exceptions=(httpx.ConnectError, httpx.ReadTimeout)
+            ),
+        )
+
+        with pytest.raises(type(error)):
+            graph.set_custom_product_ids({"CCV1F7A8UIYH": "custom-1"})
+
+        assert len(attempts) == attempt_count
+
+    def test_non_idempotent_status(self, mocker):
+        """Test requests that aren't safe to repeat aren't retried after a server error."""
+
+        mocker.patch("tenacity.nap.time.sleep")
+        statuses = iter([503, 429, 200])
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request)
+
+            return httpx.Response(next(statuses))
+
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            graph.set_custom_product_ids({"CCV1F7A8UIYH": "custom-1"})
+
+        assert len(attempts) == 1
+
+        statuses = iter([429, 200])
+        graph.set_custom_product_ids({"CCV1F7A8UIYH": "custom-1"})
+
+        assert len(attempts) == 3
+
+
+class TestRetryBudget:
+    """Test the retry budget."""
+
+    def test_caps_retries_at_fraction_of_traffic(self):
+        """Test retries stop once they exceed the budgeted fraction of requests."""
+
+        budget = RetryBudget(ratio=0.1, min_retries=0)
+
+        for _ in range(100):
+            budget.record_request()
+
+        assert sum(budget.try_retry() for _ in range(50)) == 10
+        assert budget.retries == 10
+
+    def test_floor(self):
+        """Test a few retries are allowed without traffic, but not on top of the fraction once
+        traffic is above the floor."""
+
+        budget = RetryBudget(ratio=0.1, min_retries=3)
+
+        assert sum(budget.try_retry() for _ in range(10)) == 3
+
+        for _ in range(100):
+            budget.record_request()
+
+        assert sum(budget.try_retry() for _ in range(50)) == 7
+        assert budget.retries == 10
+        assert budget.retries <= budget.ratio * budget.requests
+
+    def test_counts_requests_sent(self, mocker):
+        """Test requests sent by GraphAPI are counted, and spending the budget stops retries."""
+
+        mocker.patch("tenacity.nap.time.sleep")
+        budget = RetryBudget(ratio=0.2, min_retries=0)
+        graph = GraphAPI(
+            transport=httpx.MockTransport(lambda request: httpx.Response(503)),
+            retry_policy=RetryPolicy(max_attempts=10, budget=budget),
+        )
+
+        with pytest.raises(httpx.HTTPStatusError):
+            graph.get_products(query="esp32", schema="internal")
+
+        assert (budget.requests, budget.retries) == (2, 1)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            graph.get_products(query="esp32", schema="internal")
+
+        assert (budget.requests, budget.retries) == (3, 1)
+
+    def test_not_shared_by_default(self, mocker):
+        """Test a client's failures don't spend the retries of clients without a budget."""
+
+        mocker.patch("tenacity.nap.time.sleep")
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request)
+
+            return httpx.Response(503)
+
+        for _ in range(5):
+            graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+            with pytest.raises(httpx.HTTPStatusError):
+                graph.get_products(query="esp32", schema="internal")
+
+        assert len(attempts) == 15
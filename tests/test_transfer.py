@@ -0,0 +1,131 @@
+"""Test response compression and transfer accounting."""
+# Standard Modules
+import gzip
+import json
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.endpoints import EndpointFamily
+from cofactr.graph import GraphAPI
+
+
+def gzipped_handler(request: httpx.Request) -> httpx.Response:
+    """Respond with a gzip-compressed, highly repetitive product list."""
+
+    content = json.dumps(
+        {"data": [{"id": f"ID{i}", "offers": ["x" * 100] * 10} for i in range(50)]}
+    ).encode()
+
+    return httpx.Response(
+        200,
+        headers={"Content-Encoding": "gzip"},
+        content=gzip.compress(content),
+    )
+
+
+class TestTransferStats:
+    """Test response compression and transfer accounting."""
+
+    def test_negotiates_compression(self):
+        """Test compression is negotiated on requests."""
+
+        with GraphAPI() as graph:
+            assert "gzip" in graph.client.headers["Accept-Encoding"]
+
+    def test_records_bytes_per_call(self):
+        """Test compressed and decompressed sizes are recorded for each call."""
+
+        graph = GraphAPI(transport=httpx.MockTransport(gzipped_handler))
+
+        res = graph.get_products(query="esp32", schema="price-solver-v11")
+
+        assert len(res["data"]) == 50
+
+        record = graph.transfer_stats.records[-1]
+
+        assert record.family is EndpointFamily.PRODUCTS
+        assert record.schema == "price-solver-v11"
+        assert record.content_encoding == "gzip"
+        assert record.compressed_bytes < record.decompressed_bytes
+
+        totals = graph.transfer_stats.totals[
+            (EndpointFamily.PRODUCTS, "price-solver-v11")
+        ]
+
+        assert totals.calls == 1
+        assert totals.saved_bytes == record.decompressed_bytes - record.compressed_bytes
+
+    def test_records_schema_of_batch_requests(self):
+        """Test the schema of `/batch/` sub-requests is recorded."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            batch = json.loads(request.content)["batch"]
+
+            return httpx.Response(
+                200, json=[{"code": 200, "body": {"data": []}} for _ in batch]
+            )
+
+        graph = GraphAPI(transport=httpx.MockTransport(handler))
+
+        graph.get_products_by_searches(queries=["esp32"], schema="flagship-cache-v6")
+        graph.get_products_by_searches(
+            queries=["lm358", "ne555"], schema="flagship-cache-v6"
+        )
+
+        [(schema, totals)] = graph.transfer_stats.by_schema()
+
+        assert schema == "flagship-cache-v6"
+        assert totals.calls == 2
+
+
+class TestRequestCompression:
+    """Test gzip-compressed request bodies."""
+
+    def test_round_trip(self):
+        """Test large bodies are compressed and decode to the original payload."""
+
+        bodies = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            content = request.content
+
+            if request.headers.get("Content-Encoding") == "gzip":
+                content = gzip.decompress(content)
+
+            bodies.append(
+                (request.headers.get("Content-Encoding"), json.loads(content))
+            )
+
+            return httpx.Response(200)
+
+        graph = GraphAPI(
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+            request_compression_threshold=1024,
+        )
+        id_to_custom_id = {f"ID{i}": f"CUSTOM{i}" for i in range(10_000)}
+
+        graph.set_custom_product_ids(id_to_custom_id={"ID0": "CUSTOM0"})
+        graph.set_custom_product_ids(id_to_custom_id=id_to_custom_id)
+
+        assert bodies == [
+            (None, {"owner_id": None, "id_to_custom_id": {"ID0": "CUSTOM0"}}),
+            ("gzip", {"owner_id": None, "id_to_custom_id": id_to_custom_id}),
+        ]
+
+    def test_uncompressed_by_default(self):
+        """Test bodies are sent as-is unless a threshold is configured."""
+
+        encodings = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            encodings.append(request.headers.get("Content-Encoding"))
+
+            return httpx.Response(200, json=[])
+
+        graph = GraphAPI(client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+        graph.get_products_by_searches(queries=[f"MPN {i}" for i in range(250)])
+
+        assert encodings == [None]
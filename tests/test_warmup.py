@@ -0,0 +1,122 @@
+"""Test opening pooled connections ahead of time and keeping them alive."""
+# Standard Modules
+import asyncio
+import time
+
+# 3rd Party Modules
+import httpx
+
+# Local Modules
+from cofactr.async_graph import AsyncGraphAPI
+from cofactr.graph import GraphAPI
+from cofactr.retry import RetryBudget, RetryPolicy
+from tests.test_failover import LocalServer
+
+
+def make_health_handler(paths: list):
+    """Make a handler that answers health checks and records the paths requested."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+
+        return httpx.Response(200, json={"status": "ok"})
+
+    return handler
+
+
+class TestWarmup:
+    """Test prewarming pooled connections."""
+
+    def test_opens_connections(self):
+        """Test each concurrent health check opens a connection that later requests reuse."""
+
+        with LocalServer(delay=0.05) as server:
+            with GraphAPI(urls=[server.url]) as graph:
+                assert graph.warmup(connections=4) == 4
+
+                warm = set(server.clients)
+
+                for _ in range(4):
+                    graph.get_products(query="esp32", schema="internal")
+
+        assert len(warm) == 4
+        assert server.clients == warm
+
+    def test_counts_failures(self):
+        """Test failed health checks aren't counted."""
+
+        transport = httpx.MockTransport(lambda request: httpx.Response(503))
+
+        with GraphAPI(transport=transport) as graph:
+            assert graph.warmup(connections=3) == 0
+
+    def test_prewarm(self):
+        """Test `prewarm` opens connections in the background on construction."""
+
+        with LocalServer(delay=0.05) as server:
+            graph = GraphAPI(urls=[server.url], prewarm=3)
+            graph.close()
+
+        assert server.paths == ["/"] * 3
+        assert len(server.clients) == 3
+
+    def test_keepalive(self):
+        """Test health checks are sent periodically until the client is closed."""
+
+        paths = []
+        graph = GraphAPI(
+            transport=httpx.MockTransport(make_health_handler(paths)),
+            keepalive_interval=0.02,
+        )
+        time.sleep(0.15)
+        graph.close()
+        pings = graph.keepalive.pings
+        time.sleep(0.05)
+
+        assert pings >= 3
+        assert graph.keepalive.pings == pings
+        assert paths == ["/"] * pings
+
+    def test_not_counted_as_traffic(self):
+        """Test warmup and keep-alive health checks aren't counted towards the retry budget or
+        recorded in transfer stats."""
+
+        paths = []
+        budget = RetryBudget()
+        graph = GraphAPI(
+            transport=httpx.MockTransport(make_health_handler(paths)),
+            retry_policy=RetryPolicy(budget=budget),
+            keepalive_interval=0.02,
+        )
+
+        assert graph.warmup(connections=3) == 3
+
+        time.sleep(0.1)
+        graph.get_products(query="esp32", schema="internal")
+        graph.close()
+
+        assert len(paths) > 4
+        assert budget.requests == 1
+        assert len(graph.transfer_stats.records) == 1
+
+    def test_async(self):
+        """Test async prewarming and keep-alive start on entering the context manager."""
+
+        paths = []
+
+        async def run():
+            graph = AsyncGraphAPI(
+                transport=httpx.MockTransport(make_health_handler(paths)),
+                prewarm=2,
+                keepalive_interval=0.02,
+            )
+
+            async with graph:
+                await asyncio.sleep(0.15)
+
+            return graph.keepalive.pings
+
+        pings = asyncio.run(run())
+
+        assert pings >= 3
+        assert len(paths) == 2 * (1 + pings)